@@ -8,8 +8,11 @@ import threading
 import logging
 from datetime import datetime
 from app import app, db
-from models_etf import AdminTradeSignal, KotakNeoQuote
-from trading_functions import TradingFunctions
+from market_calendar import market_calendar
+from models_etf import AdminTradeSignal
+from quote_cache import latest_quote_cache, upsert_latest_quotes, QuoteRecord, SOURCE_KOTAK_NEO
+from realtime_quotes_manager import realtime_quotes_manager
+from signal_repricer import SignalRepricer
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +20,18 @@ class AdminSignalsScheduler:
     """Scheduler for updating admin trade signals with Kotak Neo quotes data"""
     
     def __init__(self):
+        self.scheduler = schedule.Scheduler()
         self.scheduler_thread = None
         self.is_running = False
         self.trading_functions = None
+        self.repricer = SignalRepricer()
         
     def initialize_trading_client(self):
-        """Initialize trading functions client"""
+        """Initialize trading functions client (shared with the realtime quotes manager)"""
         try:
-            self.trading_functions = TradingFunctions()
+            if not realtime_quotes_manager.initialize_trading_functions():
+                return False
+            self.trading_functions = realtime_quotes_manager.trading_functions
             logger.info("✅ Trading functions initialized for admin signals scheduler")
             return True
         except Exception as e:
@@ -32,92 +39,49 @@ class AdminSignalsScheduler:
             return False
     
     def update_admin_signals_with_quotes(self):
-        """Update admin trade signals with latest Kotak Neo quotes data"""
+        """Reprice active admin trade signals: one quote per symbol, writes only for symbols whose LTP moved"""
         try:
             with app.app_context():
-                # Get all active admin trade signals
-                active_signals = AdminTradeSignal.query.filter_by(status='ACTIVE').all()
+                # Signals grouped by symbol: one row per symbol instead of every ACTIVE signal
+                symbols = [row[0] for row in db.session.query(AdminTradeSignal.symbol).filter(
+                    AdminTradeSignal.status == 'ACTIVE'
+                ).distinct()]
                 
-                if not active_signals:
+                if not symbols:
                     logger.info("📊 No active admin trade signals found")
                     return
                 
-                logger.info(f"🔄 Updating {len(active_signals)} admin trade signals with Kotak Neo data")
+                if not self.trading_functions and not self.initialize_trading_client():
+                    logger.error("❌ Cannot update admin signals - trading client not initialized")
+                    return
+                
+                quotes = {quote_data['symbol']: quote_data for quote_data in realtime_quotes_manager.fetch_quotes_batch(symbols)}
+                missing = [symbol for symbol in symbols if symbol not in quotes]
+                if missing:
+                    logger.warning(f"⚠️ No quote data received for {', '.join(missing)}")
                 
-                updated_count = 0
-                symbols_processed = []
+                moved = self.repricer.changed_prices(
+                    {symbol: quote_data['current_price'] for symbol, quote_data in quotes.items()}
+                )
+                if not moved:
+                    logger.info(f"📊 No price changes across {len(quotes)} symbols, nothing to write")
+                    return
                 
-                for signal in active_signals:
-                    try:
-                        # Get live quote for this symbol
-                        if self.trading_functions:
-                            quote_data = self.trading_functions.get_live_quotes([signal.symbol])
-                            
-                            if quote_data and len(quote_data) > 0:
-                                quote = quote_data[0]
-                                
-                                # Update signal with live market data
-                                signal.current_price = float(quote.get('ltp', signal.current_price or signal.entry_price))
-                                signal.last_update_time = datetime.now()
-                                
-                                # Store comprehensive quote data in KotakNeoQuote table
-                                kotak_quote = KotakNeoQuote(
-                                    symbol=signal.symbol,
-                                    trading_symbol=signal.trading_symbol or signal.symbol,
-                                    token=quote.get('token'),
-                                    exchange=signal.exchange or 'NSE',
-                                    ltp=float(quote.get('ltp', 0)),
-                                    open_price=float(quote.get('open', 0)),
-                                    high_price=float(quote.get('high', 0)),
-                                    low_price=float(quote.get('low', 0)),
-                                    close_price=float(quote.get('close', 0)),
-                                    net_change=float(quote.get('netChng', 0)),
-                                    percentage_change=float(quote.get('prcntChng', 0)),
-                                    volume=int(quote.get('vol', 0)),
-                                    bid_price=float(quote.get('bid', 0)),
-                                    ask_price=float(quote.get('ask', 0)),
-                                    timestamp=datetime.now()
-                                )
-                                
-                                # Check if quote already exists for this symbol today
-                                existing_quote = KotakNeoQuote.query.filter_by(
-                                    symbol=signal.symbol
-                                ).filter(
-                                    KotakNeoQuote.timestamp >= datetime.now().date()
-                                ).order_by(KotakNeoQuote.timestamp.desc()).first()
-                                
-                                if existing_quote:
-                                    # Update existing quote
-                                    existing_quote.ltp = kotak_quote.ltp
-                                    existing_quote.open_price = kotak_quote.open_price
-                                    existing_quote.high_price = kotak_quote.high_price
-                                    existing_quote.low_price = kotak_quote.low_price
-                                    existing_quote.net_change = kotak_quote.net_change
-                                    existing_quote.percentage_change = kotak_quote.percentage_change
-                                    existing_quote.volume = kotak_quote.volume
-                                    existing_quote.bid_price = kotak_quote.bid_price
-                                    existing_quote.ask_price = kotak_quote.ask_price
-                                    existing_quote.timestamp = datetime.now()
-                                else:
-                                    # Add new quote
-                                    db.session.add(kotak_quote)
-                                
-                                updated_count += 1
-                                symbols_processed.append(signal.symbol)
-                                
-                                logger.debug(f"✅ Updated {signal.symbol}: ₹{signal.current_price:.2f}")
-                            else:
-                                logger.warning(f"⚠️ No quote data received for {signal.symbol}")
-                    
-                    except Exception as e:
-                        logger.error(f"❌ Error updating signal {signal.symbol}: {str(e)}")
-                        continue
+                timestamp = datetime.utcnow()
+                moved_quotes = [quotes[symbol] for symbol in moved]
+                updated_count = self.repricer.reprice_admin_signals(moved, timestamp)
+                realtime_quotes_manager.store_kotak_quotes_bulk(moved_quotes, timestamp)
                 
-                # Commit all updates
+                # Keep latest_quotes in step with the history rows, then commit all updates
+                cached_records = [QuoteRecord.from_quote_data(quote_data, timestamp, SOURCE_KOTAK_NEO) for quote_data in moved_quotes]
+                upsert_latest_quotes(cached_records)
                 db.session.commit()
+                self.repricer.mark_applied(moved)
+                latest_quote_cache.put_many(cached_records)
                 
-                logger.info(f"✅ Admin signals update completed: {updated_count}/{len(active_signals)} signals updated")
-                logger.info(f"📈 Symbols processed: {', '.join(symbols_processed)}")
+                logger.info(f"✅ Admin signals update completed: {updated_count} signals repriced "
+                            f"on {len(moved)}/{len(quotes)} moved symbols")
+                logger.info(f"📈 Symbols moved: {', '.join(sorted(moved))}")
                 
         except Exception as e:
             logger.error(f"❌ Error in admin signals scheduler: {str(e)}")
@@ -125,6 +89,10 @@ class AdminSignalsScheduler:
     
     def scheduled_update_job(self):
         """Job function to be run by scheduler"""
+        if not market_calendar.should_refresh():
+            logger.debug(f"Market {market_calendar.phase()}, skipping admin signals update")
+            return
+
         logger.info("🕐 Starting scheduled admin signals update...")
         start_time = datetime.now()
         
@@ -146,7 +114,7 @@ class AdminSignalsScheduler:
             return
         
         # Schedule the job every 5 minutes
-        schedule.every(5).minutes.do(self.scheduled_update_job)
+        self.scheduler.every(5).minutes.do(self.scheduled_update_job)
         
         # Run initial update
         logger.info("🚀 Running initial admin signals update...")
@@ -159,7 +127,7 @@ class AdminSignalsScheduler:
             
             while self.is_running:
                 try:
-                    schedule.run_pending()
+                    self.scheduler.run_pending()
                     time.sleep(10)  # Check every 10 seconds
                 except Exception as e:
                     logger.error(f"❌ Scheduler error: {str(e)}")
@@ -178,7 +146,7 @@ class AdminSignalsScheduler:
             return
         
         self.is_running = False
-        schedule.clear()
+        self.scheduler.clear()
         
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             self.scheduler_thread.join(timeout=5)
@@ -201,7 +169,8 @@ def get_scheduler_status():
     return {
         'is_running': admin_signals_scheduler.is_running,
         'thread_alive': admin_signals_scheduler.scheduler_thread.is_alive() if admin_signals_scheduler.scheduler_thread else False,
-        'trading_client_initialized': admin_signals_scheduler.trading_functions is not None
+        'trading_client_initialized': admin_signals_scheduler.trading_functions is not None,
+        'repricer': admin_signals_scheduler.repricer.get_stats()
     }
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ Admin API endpoints for trade signal management
 from flask import Blueprint, request, jsonify, session
 from models import db, User
 from models_etf import AdminTradeSignal, UserNotification, UserDeal, ETFSignalTrade
+from signal_fanout import signal_fanout
 from datetime import datetime, timedelta
 import logging
 
@@ -149,59 +150,17 @@ def send_bulk_trade_signals():
         if not target_user_ids:
             return jsonify({'success': False, 'message': 'No target users specified'}), 400
         
-        created_signals = []
-        created_notifications = []
-        
-        for signal_data in signals_data:
-            for user_id in target_user_ids:
-                # Create trade signal
-                signal = AdminTradeSignal(
-                    admin_user_id=admin_user.id,
-                    target_user_id=user_id,
-                    symbol=signal_data.get('symbol', '').upper(),
-                    trading_symbol=signal_data.get('symbol', '').upper(),
-                    token=f"TOKEN_{signal_data.get('symbol', '').upper()}",
-                    exchange=signal_data.get('exchange', 'NSE'),
-                    signal_type=signal_data.get('signal_type', 'BUY').upper(),
-                    entry_price=float(signal_data.get('entry_price', 0)),
-                    target_price=float(signal_data.get('target_price')) if signal_data.get('target_price') else None,
-                    stop_loss=float(signal_data.get('stop_loss')) if signal_data.get('stop_loss') else None,
-                    quantity=int(signal_data.get('quantity', 1)),
-                    signal_title=signal_data.get('signal_title', f"{signal_data.get('signal_type', 'BUY')} {signal_data.get('symbol', '')}"),
-                    signal_description=signal_data.get('signal_description', ''),
-                    priority=signal_data.get('priority', 'MEDIUM').upper(),
-                    current_price=float(signal_data.get('current_price')) if signal_data.get('current_price') else None,
-                    change_percent=float(signal_data.get('change_percent')) if signal_data.get('change_percent') else None,
-                    expires_at=datetime.utcnow() + timedelta(days=7)
-                )
-                
-                db.session.add(signal)
-                db.session.flush()
-                created_signals.append(signal)
-                
-                # Create notification
-                notification = UserNotification(
-                    user_id=user_id,
-                    title=f"New Trade Signal: {signal.signal_title}",
-                    message=f"{signal.signal_type} {signal.symbol} @ ₹{signal.entry_price} - {signal.signal_description or 'No description'}",
-                    notification_type='TRADE_SIGNAL',
-                    priority=signal.priority,
-                    related_signal_id=signal.id
-                )
-                
-                db.session.add(notification)
-                created_notifications.append(notification)
-        
+        # One INSERT ... RETURNING per batch instead of a flush per (signal x user)
+        result = signal_fanout.send_admin_signals(admin_user.id, signals_data, target_user_ids)
         db.session.commit()
         
-        logging.info(f"Bulk signals sent: {len(created_signals)} signals to {len(target_user_ids)} users")
+        logging.info(f"Bulk signals sent: {result.created} signals to {len(target_user_ids)} users, {len(result.failures)} failures")
         
-        return jsonify({
-            'success': True,
-            'message': f'Successfully sent {len(created_signals)} signals to {len(target_user_ids)} users',
-            'signals_created': len(created_signals),
-            'notifications_created': len(created_notifications)
-        })
+        return jsonify(dict(
+            result.to_dict(),
+            success=result.created > 0 or not result.failures,
+            message=f'Successfully sent {result.created} signals to {len(target_user_ids)} users'
+        ))
         
     except Exception as e:
         db.session.rollback()
@@ -414,69 +373,17 @@ def bulk_assign_etf_signals():
         if not target_user_ids:
             return jsonify({'success': False, 'message': 'No target users specified'}), 400
         
-        created_trades = []
-        created_notifications = []
-        
-        for trade_data in trades_data:
-            for user_id in target_user_ids:
-                # Calculate invested amount
-                invested_amount = float(trade_data.get('entry_price', 0)) * int(trade_data.get('quantity', 1))
-                
-                # Create ETF signal trade
-                trade = ETFSignalTrade(
-                    user_id=user_id,
-                    assigned_by_user_id=admin_user.id,
-                    symbol=trade_data.get('symbol', '').upper(),
-                    etf_name=trade_data.get('etf_name'),
-                    trading_symbol=trade_data.get('trading_symbol', f"{trade_data.get('symbol', '').upper()}-EQ"),
-                    token=trade_data.get('token', f"TOKEN_{trade_data.get('symbol', '').upper()}"),
-                    exchange=trade_data.get('exchange', 'NSE'),
-                    signal_type=trade_data.get('signal_type', 'BUY').upper(),
-                    quantity=int(trade_data.get('quantity', 1)),
-                    entry_price=float(trade_data.get('entry_price', 0)),
-                    current_price=float(trade_data.get('current_price', trade_data.get('entry_price', 0))),
-                    target_price=float(trade_data.get('target_price')) if trade_data.get('target_price') else None,
-                    stop_loss=float(trade_data.get('stop_loss')) if trade_data.get('stop_loss') else None,
-                    invested_amount=invested_amount,
-                    current_value=invested_amount,
-                    trade_title=trade_data.get('trade_title', f"{trade_data.get('signal_type', 'BUY')} {trade_data.get('symbol', '')}"),
-                    trade_description=trade_data.get('trade_description', ''),
-                    priority=trade_data.get('priority', 'MEDIUM').upper(),
-                    position_type=trade_data.get('position_type', 'LONG').upper(),
-                    change_pct=trade_data.get('change_pct', '0.00%'),
-                    tp_value=float(trade_data.get('tp_value')) if trade_data.get('tp_value') else None,
-                    tp_return=trade_data.get('tp_return')
-                )
-                
-                # Calculate initial P&L
-                trade.calculate_pnl()
-                
-                db.session.add(trade)
-                db.session.flush()
-                created_trades.append(trade)
-                
-                # Create notification
-                notification = UserNotification(
-                    user_id=user_id,
-                    title=f"New ETF Signal: {trade.trade_title}",
-                    message=f"{trade.signal_type} {trade.symbol} @ ₹{trade.entry_price} - {trade.trade_description or 'No description'}",
-                    notification_type='TRADE_SIGNAL',
-                    priority=trade.priority
-                )
-                
-                db.session.add(notification)
-                created_notifications.append(notification)
-        
+        # Row arrays inserted in batches; P&L is computed once per trade, not per user
+        result = signal_fanout.assign_etf_trades(admin_user.id, trades_data, target_user_ids)
         db.session.commit()
         
-        logging.info(f"Bulk ETF signals assigned: {len(created_trades)} trades to {len(target_user_ids)} users")
+        logging.info(f"Bulk ETF signals assigned: {result.created} trades to {len(target_user_ids)} users, {len(result.failures)} failures")
         
-        return jsonify({
-            'success': True,
-            'message': f'Successfully assigned {len(created_trades)} ETF signal trades to {len(target_user_ids)} users',
-            'trades_created': len(created_trades),
-            'notifications_created': len(created_notifications)
-        })
+        return jsonify(dict(
+            result.to_dict(),
+            success=result.created > 0 or not result.failures,
+            message=f'Successfully assigned {result.created} ETF signal trades to {len(target_user_ids)} users'
+        ))
         
     except Exception as e:
         db.session.rollback()
@@ -1,7 +1,9 @@
 """Admin Trade Signals API for ETF Signals page integration"""
 from flask import request, jsonify, session, Blueprint
-from app import db
-from models_etf import AdminTradeSignal, KotakNeoQuote, RealtimeQuote
+from models_etf import AdminTradeSignal
+from quote_cache import latest_quote_cache, SOURCE_KOTAK_NEO
+from portfolio_engine import compute_signal_metrics
+from signal_pagination import SignalPageRequest, SignalPageError, SignalPageForbidden, fetch_signal_page, signal_totals
 from models import User
 from datetime import datetime
 import logging
@@ -11,82 +13,73 @@ logger = logging.getLogger(__name__)
 
 @admin_signals_bp.route('/admin-trade-signals', methods=['GET'])
 def get_admin_trade_signals():
-    """Fetch admin trade signals with real-time market data for ETF signals page"""
+    """Fetch one page of admin trade signals with real-time market data for ETF signals page"""
     try:
-        # Get all active admin trade signals
-        signals = AdminTradeSignal.query.filter_by(status='ACTIVE').order_by(
-            AdminTradeSignal.created_at.desc()
-        ).all()
+        # Keyset page of the filtered signals, best performers first unless another sort is asked for;
+        # one user's signals only for that user or a signal admin
+        try:
+            page = SignalPageRequest.from_args(request.args, default_sort='pnl')
+            page.authorize(None, session)
+        except SignalPageForbidden as e:
+            return jsonify({'success': False, 'error': str(e), 'message': 'Forbidden'}), 403
+        except SignalPageError as e:
+            return jsonify({'success': False, 'error': str(e), 'message': 'Invalid page request'}), 400
+        
+        signals, next_cursor = fetch_signal_page(page)
+        totals = signal_totals(page)
         
         if not signals:
-            logger.info("No admin trade signals found, creating sample data...")
+            logger.info("No admin trade signals found for this page")
             return jsonify({
                 'success': True,
                 'data': [],
                 'message': 'No admin trade signals found',
-                'total_count': 0
+                'total_count': totals['total_count'] if totals else None,
+                'next_cursor': None,
+                'has_more': False,
+                'filters': page.applied()
             })
         
         # Get comprehensive market data for all signal symbols
         signal_symbols = [signal.symbol for signal in signals]
         
-        # Fetch from KotakNeoQuote first
-        kotak_quotes = {}
-        if signal_symbols:
-            kotak_data = db.session.query(KotakNeoQuote).filter(
-                KotakNeoQuote.symbol.in_(signal_symbols)
-            ).order_by(KotakNeoQuote.timestamp.desc()).all()
-            
-            for quote in kotak_data:
-                if quote.symbol not in kotak_quotes:
-                    kotak_quotes[quote.symbol] = quote
-        
-        # Fallback to RealtimeQuote for missing symbols
-        missing_symbols = [s for s in signal_symbols if s not in kotak_quotes]
-        realtime_quotes = {}
-        if missing_symbols:
-            realtime_data = db.session.query(RealtimeQuote).filter(
-                RealtimeQuote.symbol.in_(missing_symbols)
-            ).order_by(RealtimeQuote.timestamp.desc()).all()
-            
-            for quote in realtime_data:
-                if quote.symbol not in realtime_quotes:
-                    realtime_quotes[quote.symbol] = quote
+        # Latest quotes from the shared cache (Kotak Neo first, RealtimeQuote fallback)
+        latest_quotes = latest_quote_cache.get_many(signal_symbols)
         
-        signals_data = []
-        total_investment = 0
-        total_current_value = 0
-        total_pnl = 0
+        # Admin and target users for the whole page in one query
+        user_ids = {signal.admin_user_id for signal in signals} | {signal.target_user_id for signal in signals}
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
         
+        market_data = []
+        signal_prices = {}
         for signal in signals:
             # Get comprehensive market data
-            kotak_quote = kotak_quotes.get(signal.symbol)
-            realtime_quote = realtime_quotes.get(signal.symbol)
+            quote = latest_quotes.get(signal.symbol)
             
             # Determine current price and market data
-            if kotak_quote:
-                current_price = float(kotak_quote.ltp)
-                open_price = float(kotak_quote.open_price) if kotak_quote.open_price else current_price
-                high_price = float(kotak_quote.high_price) if kotak_quote.high_price else current_price
-                low_price = float(kotak_quote.low_price) if kotak_quote.low_price else current_price
-                change_percent = float(kotak_quote.percentage_change) if kotak_quote.percentage_change else 0
-                volume = kotak_quote.volume or 0
-                bid_price = float(kotak_quote.bid_price) if kotak_quote.bid_price else 0
-                ask_price = float(kotak_quote.ask_price) if kotak_quote.ask_price else 0
-                week_52_high = float(kotak_quote.week_52_high) if kotak_quote.week_52_high else 0
-                week_52_low = float(kotak_quote.week_52_low) if kotak_quote.week_52_low else 0
+            if quote and quote.data_source == SOURCE_KOTAK_NEO:
+                current_price = float(quote.current_price)
+                open_price = float(quote.open_price) if quote.open_price else current_price
+                high_price = float(quote.high_price) if quote.high_price else current_price
+                low_price = float(quote.low_price) if quote.low_price else current_price
+                change_percent = float(quote.change_percent) if quote.change_percent else 0
+                volume = quote.volume or 0
+                bid_price = float(quote.bid_price) if quote.bid_price else 0
+                ask_price = float(quote.ask_price) if quote.ask_price else 0
+                week_52_high = float(quote.week_52_high) if quote.week_52_high else 0
+                week_52_low = float(quote.week_52_low) if quote.week_52_low else 0
                 data_source = 'KOTAK_NEO_API'
-                last_update = kotak_quote.timestamp
-            elif realtime_quote:
-                current_price = float(realtime_quote.current_price)
-                open_price = float(realtime_quote.open_price) if realtime_quote.open_price else current_price
-                high_price = float(realtime_quote.high_price) if realtime_quote.high_price else current_price
-                low_price = float(realtime_quote.low_price) if realtime_quote.low_price else current_price
-                change_percent = float(realtime_quote.change_percent) if realtime_quote.change_percent else 0
-                volume = realtime_quote.volume or 0
+                last_update = quote.timestamp
+            elif quote:
+                current_price = float(quote.current_price)
+                open_price = float(quote.open_price) if quote.open_price else current_price
+                high_price = float(quote.high_price) if quote.high_price else current_price
+                low_price = float(quote.low_price) if quote.low_price else current_price
+                change_percent = float(quote.change_percent) if quote.change_percent else 0
+                volume = quote.volume or 0
                 bid_price = ask_price = week_52_high = week_52_low = 0
                 data_source = 'REALTIME_QUOTES'
-                last_update = realtime_quote.timestamp
+                last_update = quote.timestamp
             else:
                 # Fallback to signal data
                 current_price = float(signal.current_price) if signal.current_price else float(signal.entry_price)
@@ -96,30 +89,36 @@ def get_admin_trade_signals():
                 data_source = 'SIGNAL_DATA'
                 last_update = signal.last_update_time or signal.updated_at
             
-            # Calculate financial metrics
+            signal_prices[signal.id] = current_price
+            market_data.append((
+                current_price, open_price, high_price, low_price, change_percent, volume,
+                bid_price, ask_price, week_52_high, week_52_low, data_source, last_update
+            ))
+        
+        # Financial metrics for every signal in one vectorized pass
+        metrics = compute_signal_metrics(signals, signal_prices)
+        
+        signals_data = []
+        for signal, market, row in zip(signals, market_data, metrics.rows()):
+            (current_price, open_price, high_price, low_price, change_percent, volume,
+             bid_price, ask_price, week_52_high, week_52_low, data_source, last_update) = market
+            
             entry_price = float(signal.entry_price) if signal.entry_price else 0
             target_price = float(signal.target_price) if signal.target_price else 0
             stop_loss = float(signal.stop_loss) if signal.stop_loss else 0
             quantity = signal.quantity
-            
-            investment = entry_price * quantity
-            current_value = current_price * quantity
-            
-            # Calculate P&L based on signal type
-            if signal.signal_type == 'BUY':
-                pnl = (current_price - entry_price) * quantity
-            else:  # SELL
-                pnl = (entry_price - current_price) * quantity
-            
-            pnl_percent = (pnl / investment * 100) if investment > 0 else 0
+            investment = row['invested']
+            current_value = row['current_value']
+            pnl = row['pnl']
+            pnl_percent = row['pnl_percent']
             
             # Day performance
             day_change = current_price - open_price
             day_change_percent = (day_change / open_price * 100) if open_price > 0 else 0
             
             # Get user information
-            admin_user = User.query.get(signal.admin_user_id) if signal.admin_user_id else None
-            target_user = User.query.get(signal.target_user_id) if signal.target_user_id else None
+            admin_user = users.get(signal.admin_user_id)
+            target_user = users.get(signal.target_user_id)
             
             signal_data = {
                 'id': signal.id,
@@ -188,24 +187,22 @@ def get_admin_trade_signals():
             }
             
             signals_data.append(signal_data)
-            total_investment += investment
-            total_current_value += current_value
-            total_pnl += pnl
         
-        # Portfolio summary
+        # Page counts always; totals over every matching signal (stored P&L) on the first page only
         portfolio_summary = {
-            'total_signals': len(signals_data),
-            'total_investment': round(total_investment, 2),
-            'total_current_value': round(total_current_value, 2),
-            'total_pnl': round(total_pnl, 2),
-            'total_pnl_percent': round((total_pnl / total_investment * 100) if total_investment > 0 else 0, 2),
+            'page_pnl': round(metrics.totals['total_pnl'], 2),
             'active_signals': len([s for s in signals_data if s['status'] == 'ACTIVE']),
             'buy_signals': len([s for s in signals_data if s['signal_type'] == 'BUY']),
             'sell_signals': len([s for s in signals_data if s['signal_type'] == 'SELL'])
         }
-        
-        # Sort by P&L descending (best performers first)
-        signals_data.sort(key=lambda x: x['pnl'], reverse=True)
+        if totals:
+            portfolio_summary.update({
+                'total_signals': totals['total_count'],
+                'total_investment': round(totals['total_investment'], 2),
+                'total_current_value': round(totals['total_current_value'], 2),
+                'total_pnl': round(totals['total_pnl'], 2),
+                'total_pnl_percent': round(totals['total_pnl_percent'], 2)
+            })
         
         return jsonify({
             'success': True,
@@ -216,7 +213,11 @@ def get_admin_trade_signals():
                 'realtime_quotes': len([s for s in signals_data if s['data_source'] == 'REALTIME_QUOTES']),
                 'signal_data': len([s for s in signals_data if s['data_source'] == 'SIGNAL_DATA'])
             },
-            'total_count': len(signals_data),
+            'total_count': totals['total_count'] if totals else None,
+            'page_count': len(signals_data),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'filters': page.applied(),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -235,21 +236,13 @@ def get_admin_signal_detail(signal_id):
         signal = AdminTradeSignal.query.get_or_404(signal_id)
         
         # Get latest market data
-        kotak_quote = KotakNeoQuote.query.filter_by(symbol=signal.symbol).order_by(
-            KotakNeoQuote.timestamp.desc()
-        ).first()
-        
-        realtime_quote = RealtimeQuote.query.filter_by(symbol=signal.symbol).order_by(
-            RealtimeQuote.timestamp.desc()
-        ).first()
+        quote = latest_quote_cache.get(signal.symbol)
         
         # Build detailed response
         detail_data = signal.to_dict()
         
-        if kotak_quote:
-            detail_data['market_data'] = kotak_quote.to_dict()
-        elif realtime_quote:
-            detail_data['market_data'] = realtime_quote.to_dict()
+        if quote:
+            detail_data['market_data'] = quote.to_dict()
         
         return jsonify({
             'success': True,
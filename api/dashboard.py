@@ -1,9 +1,10 @@
 """Dashboard API endpoints"""
-from flask import Blueprint, jsonify, session
+from flask import Blueprint, jsonify
 import logging
 
 from utils.auth import login_required
 from trading_functions import TradingFunctions
+from client_registry import get_session_client
 
 dashboard_api = Blueprint('dashboard_api', __name__, url_prefix='/api')
 
@@ -15,7 +16,7 @@ trading_functions = TradingFunctions()
 def get_dashboard_data_api():
     """AJAX endpoint for dashboard data without page refresh"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'Session expired'}), 401
 
@@ -61,7 +62,7 @@ def get_dashboard_data_api():
 def get_positions_data_api():
     """AJAX endpoint for positions data without page refresh"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'Session expired'}), 401
 
@@ -84,7 +85,7 @@ def get_positions_data_api():
 def get_holdings_data_api():
     """AJAX endpoint for holdings data without page refresh"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'Session expired'}), 401
 
@@ -5,6 +5,7 @@ User Deals API endpoints
 from flask import Blueprint, request, jsonify, session
 from models import db, User
 from models_etf import AdminTradeSignal, UserDeal, UserNotification
+from portfolio_summary import get_user_portfolio_summary
 from datetime import datetime
 import logging
 
@@ -192,26 +193,8 @@ def get_deals_stats():
         if 'user_id' not in session:
             return jsonify({'success': False, 'message': 'Not authenticated'}), 401
         
-        user_id = session['user_id']
-        deals = UserDeal.query.filter_by(user_id=user_id).all()
-        
-        stats = {
-            'total_deals': len(deals),
-            'active_deals': len([d for d in deals if d.status == 'ACTIVE']),
-            'closed_deals': len([d for d in deals if d.status == 'CLOSED']),
-            'total_invested': sum([float(d.invested_amount or 0) for d in deals]),
-            'total_pnl': sum([float(d.pnl_amount or 0) for d in deals]),
-            'winning_deals': len([d for d in deals if (d.pnl_amount or 0) > 0]),
-            'losing_deals': len([d for d in deals if (d.pnl_amount or 0) < 0]),
-            'long_positions': len([d for d in deals if d.position_type == 'LONG']),
-            'short_positions': len([d for d in deals if d.position_type == 'SHORT'])
-        }
-        
-        # Calculate success rate
-        if stats['total_deals'] > 0:
-            stats['success_rate'] = (stats['winning_deals'] / stats['total_deals']) * 100
-        else:
-            stats['success_rate'] = 0
+        # Maintained incrementally on every deal write and price update
+        stats = get_user_portfolio_summary(session['user_id'])
         
         return jsonify({
             'success': True,
@@ -1,7 +1,9 @@
 """Enhanced ETF Signals API with comprehensive Kotak Neo quotes integration"""
 from flask import request, jsonify, session, Blueprint
 from app import db
-from models_etf import KotakNeoQuote, AdminTradeSignal, RealtimeQuote
+from models_etf import KotakNeoQuote, AdminTradeSignal
+from portfolio_engine import compute_signal_metrics
+from quote_cache import latest_quote_cache, SOURCE_REALTIME
 from models import User
 from trading_functions import TradingFunctions
 from datetime import datetime
@@ -22,37 +24,24 @@ def get_enhanced_etf_signals():
             'ICICIB22', 'ICICIPRUH', 'ICICINXT50', 'AXISBNK'
         ]
         
-        # Get comprehensive quotes from KotakNeoQuote table
+        # Get comprehensive quotes from the shared latest-quote cache
         comprehensive_quotes = {}
-        kotak_quotes = db.session.query(KotakNeoQuote).filter(
-            KotakNeoQuote.symbol.in_(etf_symbols)
-        ).order_by(KotakNeoQuote.timestamp.desc()).all()
-        
-        # Group by symbol and get latest
-        for quote in kotak_quotes:
-            if quote.symbol not in comprehensive_quotes:
-                comprehensive_quotes[quote.symbol] = quote.to_dict()
-        
-        # Fallback to RealtimeQuote for missing symbols
-        missing_symbols = [s for s in etf_symbols if s not in comprehensive_quotes]
-        if missing_symbols:
-            realtime_quotes = db.session.query(RealtimeQuote).filter(
-                RealtimeQuote.symbol.in_(missing_symbols)
-            ).order_by(RealtimeQuote.timestamp.desc()).all()
-            
-            for quote in realtime_quotes:
-                if quote.symbol not in comprehensive_quotes:
-                    comprehensive_quotes[quote.symbol] = {
-                        'symbol': quote.symbol,
-                        'ltp': float(quote.current_price),
-                        'open_price': float(quote.open_price) if quote.open_price else float(quote.current_price),
-                        'high_price': float(quote.high_price) if quote.high_price else float(quote.current_price),
-                        'low_price': float(quote.low_price) if quote.low_price else float(quote.current_price),
-                        'percentage_change': float(quote.change_percent) if quote.change_percent else 0,
-                        'volume': quote.volume or 0,
-                        'data_source': 'REALTIME_QUOTES',
-                        'timestamp': quote.timestamp.isoformat() if quote.timestamp else None
-                    }
+        for symbol, quote in latest_quote_cache.get_many(etf_symbols).items():
+            quote_dict = quote.to_dict()
+            if quote.data_source == SOURCE_REALTIME:
+                # Keep the reduced RealtimeQuote payload with price fallbacks
+                quote_dict = {
+                    'symbol': quote.symbol,
+                    'ltp': float(quote.current_price),
+                    'open_price': float(quote.open_price) if quote.open_price else float(quote.current_price),
+                    'high_price': float(quote.high_price) if quote.high_price else float(quote.current_price),
+                    'low_price': float(quote.low_price) if quote.low_price else float(quote.current_price),
+                    'percentage_change': float(quote.change_percent) if quote.change_percent else 0,
+                    'volume': quote.volume or 0,
+                    'data_source': 'REALTIME_QUOTES',
+                    'timestamp': quote.timestamp.isoformat() if quote.timestamp else None
+                }
+            comprehensive_quotes[symbol] = quote_dict
         
         # Get admin trade signals
         admin_signals = AdminTradeSignal.query.filter_by(status='ACTIVE').limit(50).all()
@@ -62,20 +51,28 @@ def get_enhanced_etf_signals():
         total_current_value = 0
         total_pnl = 0
         
-        # Process each admin signal with comprehensive market data
+        # Position metrics for every signal in one pass, priced from the comprehensive quotes
+        signal_prices = {}
         for signal in admin_signals:
+            ltp = comprehensive_quotes.get(signal.symbol, {}).get('ltp')
+            if ltp:
+                signal_prices[signal.id] = float(ltp)
+        metrics = compute_signal_metrics(admin_signals, signal_prices)
+        
+        # Process each admin signal with comprehensive market data
+        for signal, row in zip(admin_signals, metrics.rows()):
             quote_data = comprehensive_quotes.get(signal.symbol, {})
             
             # Current market price from comprehensive data
-            current_price = float(quote_data.get('ltp', signal.current_price or signal.entry_price))
+            current_price = float(signal_prices.get(signal.id, signal.current_price or signal.entry_price))
             entry_price = float(signal.entry_price) if signal.entry_price else 0
             quantity = signal.quantity
             
             # Calculate comprehensive metrics
-            investment = entry_price * quantity
-            current_value = current_price * quantity
-            pnl = (current_price - entry_price) * quantity if entry_price > 0 else 0
-            pnl_percent = ((current_price - entry_price) / entry_price * 100) if entry_price > 0 else 0
+            investment = row['invested']
+            current_value = row['current_value']
+            pnl = row['pnl']
+            pnl_percent = row['pnl_percent']
             
             # Day performance
             open_price = float(quote_data.get('open_price', current_price))
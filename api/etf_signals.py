@@ -3,6 +3,8 @@ from flask import request, jsonify, session, Blueprint
 from app import db
 from etf_trading_signals import ETFTradingSignals
 from user_manager import UserManager
+from portfolio_engine import compute_signal_metrics
+from signal_pagination import SignalPageRequest, SignalPageError, SignalPageForbidden, fetch_signal_page, signal_totals
 # ETFSignalTrade model removed
 import logging
 from datetime import datetime
@@ -15,7 +17,6 @@ def get_admin_signals():
     """Get ETF signals data from admin_trade_signals table with real-time CMP from Kotak Neo"""
     try:
         from models import User
-        from models_etf import AdminTradeSignal, KotakNeoQuote, RealtimeQuote
         from trading_functions import TradingFunctions
 
         # Get target user (zhz3j or fallback to any user)
@@ -39,17 +40,27 @@ def get_admin_signals():
 
         # No sample data creation - only show real admin_trade_signals data
 
-        # Get ONLY admin trade signals for the target user (zhz3j) - NO SAMPLE DATA
-        signals = AdminTradeSignal.query.filter_by(
-            target_user_id=target_user.id,
-            status='ACTIVE'  # Only active signals
-        ).order_by(AdminTradeSignal.created_at.desc()).limit(14).all()  # Limit to 14 records
+        # One keyset page of admin trade signals for the target user (zhz3j); other users only for themselves or signal admins
+        try:
+            page = SignalPageRequest.from_args(request.args, default_user_id=target_user.id)
+            page.authorize(target_user.id, session)
+        except SignalPageForbidden as e:
+            return jsonify({'success': False, 'message': str(e)}), 403
+        except SignalPageError as e:
+            return jsonify({'success': False, 'message': f'Invalid page request: {str(e)}'}), 400
+
+        signals, next_cursor = fetch_signal_page(page)
 
         if not signals:
             logger.info("No admin trade signals found in database - showing empty table")
+            totals = signal_totals(page)
             return jsonify({
                 'success': True,
                 'signals': [],
+                'next_cursor': None,
+                'has_more': False,
+                'total_count': totals['total_count'] if totals else None,
+                'filters': page.applied(),
                 'portfolio': {
                     'total_positions': 0,
                     'total_investment': 0,
@@ -62,38 +73,25 @@ def get_admin_signals():
                 'message': 'No admin trade signals found. Only real database records are displayed.'
             })
 
-        logger.info(f"📊 Found {len(signals)} admin trade signals in database (showing only these 14 records)")
+        logger.info(f"📊 Found {len(signals)} admin trade signals for this page (has more: {next_cursor is not None})")
 
         # Get comprehensive market data - PRIORITIZE Kotak Neo quotes for CMP
         latest_quotes = {}
         try:
-            from models_etf import KotakNeoQuote
-            from sqlalchemy import func
-            from trading_functions import TradingFunctions
+            from quote_cache import latest_quote_cache, SOURCE_KOTAK_NEO
 
             # Get unique symbols from signals
             signal_symbols = list(set([signal.symbol for signal in signals]))
 
-            # STEP 1: Get latest Kotak Neo quotes data (HIGHEST PRIORITY for CMP)
-            kotak_subquery = db.session.query(
-                KotakNeoQuote.symbol,
-                func.max(KotakNeoQuote.timestamp).label('max_timestamp')
-            ).group_by(KotakNeoQuote.symbol).subquery()
-
-            kotak_quotes = db.session.query(KotakNeoQuote).join(
-                kotak_subquery,
-                db.and_(
-                    KotakNeoQuote.symbol == kotak_subquery.c.symbol,
-                    KotakNeoQuote.timestamp == kotak_subquery.c.max_timestamp
-                )
-            ).filter(KotakNeoQuote.symbol.in_(signal_symbols)).all()
+            # STEP 1: Get latest quotes from the shared cache (Kotak Neo data has priority)
+            cached_quotes = latest_quote_cache.get_many(signal_symbols)
 
             # Process Kotak Neo quotes with PRIORITY
-            for quote in kotak_quotes:
-                if quote.ltp and float(quote.ltp) > 0:  # Only use if valid price exists
-                    latest_quotes[quote.symbol] = {
-                        'current_price': float(quote.ltp),  # KOTAK NEO CMP
-                        'change_percent': float(quote.percentage_change) if quote.percentage_change else 0,
+            for symbol, quote in cached_quotes.items():
+                if quote.data_source == SOURCE_KOTAK_NEO:
+                    latest_quotes[symbol] = {
+                        'current_price': float(quote.current_price),  # KOTAK NEO CMP
+                        'change_percent': float(quote.change_percent) if quote.change_percent else 0,
                         'open_price': float(quote.open_price) if quote.open_price else 0,
                         'high_price': float(quote.high_price) if quote.high_price else 0,
                         'low_price': float(quote.low_price) if quote.low_price else 0,
@@ -105,12 +103,13 @@ def get_admin_signals():
                         'last_update': quote.timestamp,
                         'data_source': 'KOTAK_NEO_DB'
                     }
-                    logger.info(f"🎯 Using Kotak Neo CMP for {quote.symbol}: ₹{float(quote.ltp)}")
+                    logger.info(f"🎯 Using Kotak Neo CMP for {symbol}: ₹{float(quote.current_price)}")
 
-            # STEP 2: Try to get fresh quotes from Kotak Neo API for missing symbols
-            missing_symbols = [s for s in signal_symbols if s not in latest_quotes]
+            # STEP 2: Fresh quotes from the Kotak Neo API only for symbols with no cached quote at all
+            missing_symbols = [s for s in signal_symbols if s not in cached_quotes]
             if missing_symbols:
                 trading_functions = TradingFunctions()
+                trading_functions.initialize_neo_client()
                 if hasattr(trading_functions, 'get_quotes_for_symbols'):
                     try:
                         fresh_quotes = trading_functions.get_quotes_for_symbols(missing_symbols)
@@ -137,22 +136,10 @@ def get_admin_signals():
 
             # STEP 3: Fallback to RealtimeQuote ONLY for symbols not found in Kotak Neo data
             still_missing_symbols = [s for s in signal_symbols if s not in latest_quotes]
-            if still_missing_symbols:
-                realtime_subquery = db.session.query(
-                    RealtimeQuote.symbol,
-                    func.max(RealtimeQuote.timestamp).label('max_timestamp')
-                ).group_by(RealtimeQuote.symbol).subquery()
-
-                realtime_quotes = db.session.query(RealtimeQuote).join(
-                    realtime_subquery,
-                    db.and_(
-                        RealtimeQuote.symbol == realtime_subquery.c.symbol,
-                        RealtimeQuote.timestamp == realtime_subquery.c.max_timestamp
-                    )
-                ).filter(RealtimeQuote.symbol.in_(still_missing_symbols)).all()
-
-                for quote in realtime_quotes:
-                    latest_quotes[quote.symbol] = {
+            for symbol in still_missing_symbols:
+                quote = cached_quotes.get(symbol)
+                if quote:
+                    latest_quotes[symbol] = {
                         'current_price': float(quote.current_price),
                         'change_percent': float(quote.change_percent) if quote.change_percent else 0,
                         'open_price': float(quote.open_price) if quote.open_price else 0,
@@ -166,25 +153,20 @@ def get_admin_signals():
                         'last_update': quote.timestamp,
                         'data_source': 'REALTIME_QUOTES_FALLBACK'
                     }
-                    logger.info(f"⚡ Using RealtimeQuote CMP for {quote.symbol}: ₹{float(quote.current_price)}")
+                    logger.info(f"⚡ Using RealtimeQuote CMP for {symbol}: ₹{float(quote.current_price)}")
 
             logger.info(f"📊 Total quotes retrieved: {len(latest_quotes)} | Kotak Neo priority enforced")
 
         except Exception as quote_error:
             logger.warning(f"⚠️ Could not fetch latest quotes: {quote_error}")
 
-        signals_data = []
-        total_invested = 0
-        total_current_value = 0
-        total_pnl = 0
+        signal_prices = {}
 
         # Process each admin trade signal with KOTAK NEO CMP PRIORITY
         for idx, signal in enumerate(signals):
             # Get entry price and basic details
             entry_price = float(signal.entry_price)
             current_price = float(signal.current_price) if signal.current_price else entry_price
-            quantity = signal.quantity
-            target_price = float(signal.target_price) if signal.target_price else 0
 
             # Default values
             change_percent = 0
@@ -242,38 +224,23 @@ def get_admin_signals():
             except Exception as update_error:
                 logger.warning(f"⚠️ Could not update signal {signal.symbol}: {update_error}")
 
-            # Investment and P&L calculations using calculated CMP
-            invested_amount = entry_price * quantity
-            current_value = current_price * quantity
-            target_value_amount = target_price * quantity if target_price > 0 else 0
-
-            # P&L calculations based on signal type
-            if signal.signal_type == 'BUY':  # Long position
-                pnl_amount = (current_price - entry_price) * quantity
-                pnl_percentage = ((current_price - entry_price) / entry_price) * 100 if entry_price > 0 else 0
-            else:  # Short position
-                pnl_amount = (entry_price - current_price) * quantity
-                pnl_percentage = ((entry_price - current_price) / entry_price) * 100 if entry_price > 0 else 0
+            signal_prices[signal.id] = (current_price, change_percent, data_source)
 
-            # Target profit return calculation
-            target_profit_return = ((target_price - entry_price) / entry_price) * 100 if target_price > 0 and entry_price > 0 else 0
+        # Investment and P&L for every signal in one vectorized pass using the calculated CMPs
+        metrics = compute_signal_metrics(signals, {signal_id: price[0] for signal_id, price in signal_prices.items()})
 
-            # Calculate days held
-            days_held = (datetime.now() - signal.created_at).days if signal.created_at else 0
+        signals_data = []
+        for signal, row in zip(signals, metrics.rows()):
+            current_price, change_percent, data_source = signal_prices[signal.id]
+            entry_price = float(signal.entry_price)
+            invested_amount = row['invested']
+            pnl_amount = row['pnl']
 
             # Update signal with calculated values in database
             signal.investment_amount = invested_amount
-            signal.current_value = current_value
+            signal.current_value = row['current_value']
             signal.pnl = pnl_amount
-            signal.pnl_percentage = pnl_percentage
-
-            # Use calculated values for response
-            qty = quantity
-            ep = entry_price
-            cmp = current_price  # Use our calculated CMP
-            inv = invested_amount
-            pl = pnl_amount
-            chg = pnl_percentage
+            signal.pnl_percentage = row['pnl_percent']
 
             signal_data = {
                 'id': signal.id,
@@ -281,8 +248,8 @@ def get_admin_signals():
                 'symbol': signal.symbol,
                 'date': signal.signal_date.strftime('%d-%b-%Y') if signal.signal_date else datetime.now().strftime('%d-%b-%Y'),
                 'pos': 1 if signal.signal_type == 'BUY' else 0,  # 1 for LONG, 0 for SHORT
-                'qty': qty,
-                'ep': round(ep, 2),
+                'qty': signal.quantity,
+                'ep': round(entry_price, 2),
                 'cmp': round(current_price, 2),  # Use processed current_price
                 'pl': round(pnl_amount, 2),
                 'chg': round(change_percent, 2),
@@ -300,11 +267,6 @@ def get_admin_signals():
 
             signals_data.append(signal_data)
 
-            # Update totals for portfolio summary
-            total_invested += invested_amount
-            total_current_value += current_value
-            total_pnl += pnl_amount
-
         logger.info(f"✅ Processed {len(signals_data)} admin trade signals with real-time CMP from Kotak Neo")
 
         # Commit any price updates to database
@@ -315,29 +277,33 @@ def get_admin_signals():
             logger.warning(f"⚠️ Could not commit price updates: {commit_error}")
             db.session.rollback()
 
-        # Calculate portfolio summary from processed signals only
-        active_signals = len([s for s in signals_data if s.get('status') == 'ACTIVE'])
-        profit_signals = len([s for s in signals_data if s.get('pl', 0) > 0])
-        loss_signals = len([s for s in signals_data if s.get('pl', 0) < 0])
+        # Portfolio totals and position counts over every matching signal (stored P&L, including this page's update),
+        # first page only
+        totals = signal_totals(page)
+        portfolio_summary = None
+        if totals:
+            total_invested = totals['total_investment']
+            total_current_value = totals['total_current_value']
+            total_pnl = totals['total_pnl']
 
-        portfolio_summary = {
-            'total_trades': len(signals_data),
-            'active_trades': active_signals,
-            'profit_trades': profit_signals,
-            'loss_trades': loss_signals,
-            'total_invested': total_invested,
-            'total_investment': total_invested,
-            'total_current_value': total_current_value,
-            'total_pnl': total_pnl,
-            'total_pnl_percent': (total_pnl / total_invested * 100) if total_invested > 0 else 0,
-            'total_positions': len(signals_data),
-            'current_value': total_current_value,
-            'return_percent': (total_pnl / total_invested * 100) if total_invested > 0 else 0,
-            'active_positions': active_signals,
-            'closed_positions': 0
-        }
+            portfolio_summary = {
+                'total_trades': totals['total_count'],
+                'active_trades': totals['active_count'],
+                'profit_trades': totals['profit_count'],
+                'loss_trades': totals['loss_count'],
+                'total_invested': total_invested,
+                'total_investment': total_invested,
+                'total_current_value': total_current_value,
+                'total_pnl': total_pnl,
+                'total_pnl_percent': totals['total_pnl_percent'],
+                'total_positions': totals['total_count'],
+                'current_value': total_current_value,
+                'return_percent': totals['total_pnl_percent'],
+                'active_positions': totals['active_count'],
+                'closed_positions': totals['closed_count']
+            }
 
-        logger.info(f"📊 Portfolio Summary: Investment=₹{total_invested:,.2f}, Current=₹{total_current_value:,.2f}, P&L=₹{total_pnl:,.2f}")
+            logger.info(f"📊 Portfolio Summary: Investment=₹{total_invested:,.2f}, Current=₹{total_current_value:,.2f}, P&L=₹{total_pnl:,.2f}")
 
         return jsonify({
             'success': True,
@@ -345,7 +311,11 @@ def get_admin_signals():
             'portfolio': portfolio_summary,
             'last_update': datetime.utcnow().isoformat(),
             'quotes_fetched': len(latest_quotes),
-            'message': f'Showing {len(signals_data)} ETF positions from CSV data with real-time CMP calculations'
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'total_count': totals['total_count'] if totals else None,
+            'filters': page.applied(),
+            'message': f'Showing {len(signals_data)} ETF positions with real-time CMP calculations'
         })
 
     except Exception as e:
@@ -708,8 +678,9 @@ def bulk_update_positions():
 def get_etf_signals_data():
     """API endpoint to get ETF signals data from database (admin_trade_signals for user zhz3j)"""
     try:
-        from models_etf import AdminTradeSignal, RealtimeQuote
+        from models_etf import AdminTradeSignal
         from models import User
+        from quote_cache import latest_quote_cache, write_back_quote_prices
         from datetime import datetime
 
         # Initialize default response
@@ -753,39 +724,40 @@ def get_etf_signals_data():
                 'message': 'No signals found'
             })
 
-        signals_data = []
-        for signal in signals:
-            try:
-                # Get latest quote for real-time current price
-                latest_quote = RealtimeQuote.query.filter_by(
-                    symbol=signal.symbol
-                ).order_by(RealtimeQuote.timestamp.desc()).first()
-
-                # Calculate real-time values based on current database structure
-                current_price = float(signal.current_price) if signal.current_price else float(signal.entry_price)
-                if latest_quote:
-                    current_price = float(latest_quote.current_price)
-                    try:
-                        signal.current_price = latest_quote.current_price
-                        signal.last_update_time = datetime.utcnow()
-                        db.session.commit()
-                    except Exception as db_error:
-                        logging.warning(f"Could not update signal {signal.id}: {db_error}")
+        # Latest quotes for all signal symbols from the shared quote cache
+        latest_quotes = latest_quote_cache.get_many([signal.symbol for signal in signals])
 
-                entry_price = float(signal.entry_price) if signal.entry_price else 0
-                quantity = int(signal.quantity) if signal.quantity else 0
+        price_updates = []
+        valid_signals = []
+        for signal in signals:
+            # Get latest quote for real-time current price
+            latest_quote = latest_quotes.get(signal.symbol)
+            if latest_quote:
+                signal.current_price = latest_quote.current_price
+                signal.last_update_time = datetime.utcnow()
+                price_updates.append((signal, {
+                    'current_price': signal.current_price,
+                    'last_update_time': signal.last_update_time
+                }))
+
+            if not signal.entry_price or not signal.quantity:
+                logging.warning(f"Skipping signal {signal.id} due to invalid entry_price or quantity")
+                continue
+            valid_signals.append(signal)
 
-                if entry_price == 0 or quantity == 0:
-                    logging.warning(f"Skipping signal {signal.id} due to invalid entry_price or quantity")
-                    continue
+        # Investment, P&L and target metrics for all signals in one vectorized pass
+        metrics = compute_signal_metrics(valid_signals)
 
-                invested_amount = entry_price * quantity
-                current_value = current_price * quantity
-                profit_loss = current_value - invested_amount
-                profit_loss_percent = ((current_price - entry_price) / entry_price) * 100
+        signals_data = []
+        for signal, row in zip(valid_signals, metrics.rows()):
+            try:
+                entry_price = float(signal.entry_price)
+                current_price = float(signal.current_price) if signal.current_price else entry_price
+                quantity = int(signal.quantity)
                 target_price = float(signal.target_price) if signal.target_price else 0
-                target_value_amount = target_price * quantity if target_price > 0 else 0
-                target_profit_return = ((target_price - entry_price) / entry_price) * 100 if target_price > 0 else 0
+                invested_amount = row['invested']
+                profit_loss = row['pnl']
+                profit_loss_percent = row['pnl_percent']
 
                 # Calculate days held
                 entry_date = signal.created_at
@@ -809,8 +781,8 @@ def get_etf_signals_data():
                     'change_pct': round(profit_loss_percent, 2),  # %Chan
                     'inv': round(invested_amount, 2),  # Inv.
                     'tp': round(target_price, 2) if target_price > 0 else 0,  # TP
-                    'tva': round(target_value_amount, 2),  # TVA
-                    'tpr': round(target_profit_return, 2),  # TPR
+                    'tva': round(row['target_value'], 2),  # TVA
+                    'tpr': round(row['target_return'], 2),  # TPR
                     'pl': round(profit_loss, 2),  # PL
                     'ed': signal.expires_at.strftime('%Y-%m-%d') if signal.expires_at else '',  # ED
                     'exp': signal.expires_at.strftime('%Y-%m-%d') if signal.expires_at else '',  # EXP
@@ -832,12 +804,21 @@ def get_etf_signals_data():
                 logging.error(f"Error processing signal {signal.id}: {signal_error}")
                 continue
 
+        # Write refreshed prices back in one batched update
+        if price_updates:
+            try:
+                write_back_quote_prices(price_updates)
+                db.session.commit()
+            except Exception as db_error:
+                db.session.rollback()
+                logging.warning(f"Could not update signal prices: {db_error}")
+
         # Calculate portfolio summary safely
         try:
-            total_investment = sum(float(s.get('inv', 0)) for s in signals_data if s.get('inv'))
-            total_current_value = sum(float(s.get('inv', 0)) + float(s.get('pl', 0)) for s in signals_data if s.get('inv') and s.get('pl'))
-            total_pnl = sum(float(s.get('pl', 0)) for s in signals_data if s.get('pl'))
-            return_percent = (total_pnl / total_investment * 100) if total_investment > 0 else 0
+            total_investment = metrics.totals['total_investment']
+            total_current_value = metrics.totals['total_current_value']
+            total_pnl = metrics.totals['total_pnl']
+            return_percent = metrics.totals['total_pnl_percent']
 
             portfolio_summary = {
                 'total_positions': len(signals_data),
@@ -5,7 +5,8 @@ Real-time Quotes API endpoints
 from flask import Blueprint, jsonify, request, session
 from app import db
 from models_etf import RealtimeQuote, ETFSignalTrade, AdminTradeSignal
-from realtime_quotes_manager import realtime_quotes_manager, get_latest_quotes_api, force_fetch_quotes
+from realtime_quotes_manager import get_latest_quotes_api
+from quote_orchestrator import quote_orchestrator
 import logging
 from datetime import datetime, timedelta
 
@@ -110,7 +111,7 @@ def force_quote_update():
                 'message': 'Authentication required'
             }), 401
         
-        success = force_fetch_quotes()
+        success = quote_orchestrator.run_cycle()
         
         return jsonify({
             'success': success,
@@ -145,11 +146,12 @@ def get_scheduler_status():
         
         return jsonify({
             'success': True,
-            'scheduler_running': realtime_quotes_manager.is_running,
+            'scheduler_running': quote_orchestrator.is_running,
+            'orchestrator': quote_orchestrator.get_stats(),
             'latest_update': latest_quote.timestamp.isoformat() if latest_quote else None,
             'quotes_last_24h': recent_count,
             'symbols_tracked': unique_symbols,
-            'status': 'active' if realtime_quotes_manager.is_running else 'stopped'
+            'status': 'active' if quote_orchestrator.is_running else 'stopped'
         })
         
     except Exception as e:
@@ -166,11 +168,6 @@ def get_quote_statistics():
         days = request.args.get('days', 7, type=int)
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Total quotes
-        total_quotes = RealtimeQuote.query.filter(
-            RealtimeQuote.timestamp >= start_date
-        ).count()
-        
         # Quotes per symbol
         symbol_stats = db.session.query(
             RealtimeQuote.symbol,
@@ -181,6 +178,9 @@ def get_quote_statistics():
             RealtimeQuote.timestamp >= start_date
         ).group_by(RealtimeQuote.symbol).all()
         
+        # Total comes from the same grouped scan instead of a second count over the range
+        total_quotes = sum(stat.quote_count for stat in symbol_stats)
+        
         symbol_data = []
         for stat in symbol_stats:
             symbol_data.append({
@@ -5,9 +5,12 @@ from flask import Blueprint, jsonify, request, session
 from app import db
 from models_etf import ETFSignalTrade, AdminTradeSignal, RealtimeQuote
 from models import User
+from quote_cache import latest_quote_cache, write_back_quote_prices
+from portfolio_engine import compute_signal_metrics
 from sqlalchemy import and_, or_, desc, asc, text
 from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
+from decimal import Decimal
 import logging
 import math
 
@@ -99,6 +102,18 @@ class DataTableProcessor:
                 'error': str(e)
             }
 
+def refreshed_trade_values(trade, current_price):
+    """Reprice an ETF signal trade and return the columns that changed"""
+    trade.current_price = current_price
+    trade.calculate_pnl()
+    return {
+        'current_price': trade.current_price,
+        'pnl_amount': trade.pnl_amount,
+        'pnl_percent': trade.pnl_percent,
+        'current_value': trade.current_value,
+        'change_pct': trade.change_pct
+    }
+
 @datatable_bp.route('/etf-signals/user', methods=['POST'])
 def get_user_etf_signals_datatable():
     """Get ETF signals for current user with DataTable support"""
@@ -130,17 +145,17 @@ def get_user_etf_signals_datatable():
         )
 
         # Format data for DataTable
+        # Latest quotes for the whole page from the shared quote cache
+        latest_quotes = latest_quote_cache.get_many([trade.symbol for trade in result['data']])
+
         formatted_data = []
+        price_updates = []
         for trade in result['data']:
             # Get latest quote for real-time calculations
-            latest_quote = RealtimeQuote.query.filter(
-                RealtimeQuote.symbol == trade.symbol
-            ).order_by(RealtimeQuote.timestamp.desc()).first()
+            latest_quote = latest_quotes.get(trade.symbol)
 
             if latest_quote:
-                trade.current_price = latest_quote.current_price
-                trade.calculate_pnl()
-                db.session.commit()
+                price_updates.append((trade, refreshed_trade_values(trade, latest_quote.current_price)))
 
             trade_dict = trade.to_dict()
 
@@ -168,6 +183,11 @@ def get_user_etf_signals_datatable():
 
             formatted_data.append(trade_dict)
 
+        # Write every refreshed price on the page back in one batched update
+        if price_updates:
+            write_back_quote_prices(price_updates)
+            db.session.commit()
+
         result['data'] = formatted_data
         return jsonify(result)
 
@@ -202,17 +222,17 @@ def get_admin_etf_signals_datatable():
         )
 
         # Format data for DataTable
+        # Latest quotes for the whole page from the shared quote cache
+        latest_quotes = latest_quote_cache.get_many([trade.symbol for trade in result['data']])
+
         formatted_data = []
+        price_updates = []
         for trade in result['data']:
             # Get latest quote for real-time calculations
-            latest_quote = RealtimeQuote.query.filter(
-                RealtimeQuote.symbol == trade.symbol
-            ).order_by(RealtimeQuote.timestamp.desc()).first()
+            latest_quote = latest_quotes.get(trade.symbol)
 
             if latest_quote:
-                trade.current_price = latest_quote.current_price
-                trade.calculate_pnl()
-                db.session.commit()
+                price_updates.append((trade, refreshed_trade_values(trade, latest_quote.current_price)))
 
             trade_dict = trade.to_dict()
 
@@ -248,6 +268,11 @@ def get_admin_etf_signals_datatable():
 
             formatted_data.append(trade_dict)
 
+        # Write every refreshed price on the page back in one batched update
+        if price_updates:
+            write_back_quote_prices(price_updates)
+            db.session.commit()
+
         result['data'] = formatted_data
         return jsonify(result)
 
@@ -282,33 +307,41 @@ def get_admin_signals_datatable():
         )
 
         # Format data for DataTable
-        formatted_data = []
+        # Latest quotes for the whole page from the shared quote cache
+        latest_quotes = latest_quote_cache.get_many([signal.symbol for signal in result['data']])
+
+        price_updates = []
         for signal in result['data']:
             # Get latest quote
-            latest_quote = RealtimeQuote.query.filter(
-                RealtimeQuote.symbol == signal.symbol
-            ).order_by(RealtimeQuote.timestamp.desc()).first()
+            latest_quote = latest_quotes.get(signal.symbol)
 
             if latest_quote:
-                signal.current_price = latest_quote.current_price
+                price_update = {
+                    'current_price': latest_quote.current_price,
+                    'last_update_time': datetime.utcnow()
+                }
                 if signal.entry_price:
                     change_pct = ((float(latest_quote.current_price) - float(signal.entry_price)) / float(signal.entry_price)) * 100
-                    signal.change_percent = change_pct
-                signal.last_update_time = datetime.utcnow()
-                db.session.commit()
+                    price_update['change_percent'] = Decimal(str(round(change_pct, 2)))
+                for column, value in price_update.items():
+                    setattr(signal, column, value)
+                price_updates.append((signal, price_update))
+
+        # Position metrics for the whole page from the refreshed prices
+        metrics = compute_signal_metrics(result['data'])
+
+        formatted_data = []
+        for signal, row in zip(result['data'], metrics.rows()):
+            latest_quote = latest_quotes.get(signal.symbol)
 
             # Calculate values
-            entry_price = float(signal.entry_price) if signal.entry_price else 0
-            current_price = float(signal.current_price) if signal.current_price else entry_price
-            target_price = float(signal.target_price) if signal.target_price else 0
-            quantity = signal.quantity or 0
-            pnl = (current_price - entry_price) * quantity
-            pnl_percent = ((current_price - entry_price) / entry_price * 100) if entry_price > 0 else 0
+            pnl = row['pnl']
+            pnl_percent = row['pnl_percent']
 
             # Calculate additional fields
-            investment = float(signal.entry_price * signal.quantity) if signal.entry_price else 0
-            current_value = float(signal.current_price * signal.quantity) if signal.current_price else 0
-            target_value = float(signal.target_price * signal.quantity) if signal.target_price else 0
+            investment = row['invested']
+            current_value = row['current_value']
+            target_value = row['target_value']
 
             # Format data exactly as requested with field names
             trade_dict = {
@@ -340,6 +373,11 @@ def get_admin_signals_datatable():
 
             formatted_data.append(trade_dict)
 
+        # Write every refreshed price on the page back in one batched update
+        if price_updates:
+            write_back_quote_prices(price_updates)
+            db.session.commit()
+
         result['data'] = formatted_data
         return jsonify(result)
 
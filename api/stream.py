@@ -0,0 +1,50 @@
+"""
+Live quote streaming endpoints (Server-Sent Events)
+"""
+from flask import Blueprint, Response, jsonify, stream_with_context
+from quote_stream import quote_broadcaster, QUOTE_STREAM_ENABLED
+from tick_pipeline import tick_pipeline
+from client_registry import client_registry
+from broker_cache import broker_cache
+from broker_scheduler import broker_scheduler
+from signal_book import signal_book
+from utils.auth import login_required
+import logging
+
+stream_bp = Blueprint('stream', __name__, url_prefix='/api/stream')
+logger = logging.getLogger(__name__)
+
+@stream_bp.route('/quotes', methods=['GET'])
+@login_required
+def stream_quotes():
+    """Push changed quotes to the browser as they reach the latest-quote cache"""
+    if not QUOTE_STREAM_ENABLED:
+        # 204 tells EventSource not to reconnect; pages keep polling
+        return Response(status=204)
+
+    response = Response(
+        stream_with_context(quote_broadcaster.stream()),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+@stream_bp.route('/status', methods=['GET'])
+@login_required
+def stream_status():
+    """Get quote stream statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'stream_enabled': QUOTE_STREAM_ENABLED,
+            'stream': quote_broadcaster.get_stats(),
+            'ticks': tick_pipeline.get_stats(),
+            'clients': client_registry.get_stats(),
+            'broker_cache': broker_cache.get_stats(),
+            'broker_scheduler': broker_scheduler.get_stats(),
+            'signal_book': signal_book.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting stream status: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -71,6 +71,40 @@ with app.app_context():
 
     db.create_all()
 
+# Composite indexes and optional partitioning for the quote history tables
+from quote_storage import setup_quote_storage
+setup_quote_storage()
+
+# Keyset pagination indexes for the signal list endpoints
+from signal_pagination import ensure_signal_indexes
+ensure_signal_indexes()
+
+# Scrip master indexes so quote paths resolve tokens without a network search
+from instrument_master import instrument_master
+from symbol_search import symbol_search_index
+instrument_master.ensure_loaded()
+if not instrument_master.loaded:
+    print(f"ERROR: No scrip master loaded, quotes cannot be resolved until one is: {instrument_master.last_error}")
+symbol_search_index.ensure_built()
+
+# Keeps user_portfolio_summaries in step with every user_deals write
+import portfolio_summary  # noqa: F401
+
+# In-memory active signals by symbol, kept in step with every signal write
+from signal_book import signal_book
+with app.app_context():
+    try:
+        signal_book.load()
+    except Exception as e:
+        print(f"Warning: Signal book will load on first use: {e}")
+
+# Pages only open the live quote stream when the server has it enabled
+from quote_stream import QUOTE_STREAM_ENABLED
+
+@app.context_processor
+def inject_quote_stream_flag():
+    return {'quote_stream_enabled': QUOTE_STREAM_ENABLED}
+
 # Import and add routes
 from flask import render_template, request, redirect, url_for, session, jsonify, flash
 from flask_session import Session
@@ -95,6 +129,7 @@ from trading_functions import TradingFunctions
 from user_manager import UserManager
 from session_helper import SessionHelper
 from websocket_handler import WebSocketHandler
+from client_registry import get_session_client, register_session_client, release_session_client
 try:
     from supabase_client import SupabaseClient
     supabase_client = SupabaseClient()
@@ -287,6 +322,8 @@ def login():
                 session['sid'] = session_data.get('sid')
                 session['ucc'] = ucc
                 session['client'] = client
+                register_session_client(ucc, client, session_data.get('access_token'),
+                                        session_data.get('session_token'), session_data.get('sid'))
                 session['login_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 session['greeting_name'] = session_data.get('greetingName', ucc)
                 session.permanent = True
@@ -348,6 +385,7 @@ def login():
 @app.route('/logout')
 def logout():
     """Logout and clear session"""
+    release_session_client(session.get('ucc'))
     session.clear()
     flash('Logged out successfully', 'info')
     return redirect(url_for('login'))
@@ -358,7 +396,7 @@ def dashboard():
     """Main dashboard with portfolio overview"""
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('login'))
@@ -449,7 +487,7 @@ def positions():
     """Positions page"""
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('login'))
@@ -483,7 +521,7 @@ def holdings():
     """Holdings page"""
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('login'))
@@ -517,7 +555,7 @@ def orders():
     """Orders page"""
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('login'))
@@ -597,7 +635,7 @@ def get_dashboard_data_api():
     try:
 
 
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'No active client'}), 400
 
@@ -614,7 +652,7 @@ def get_positions_api():
         return jsonify({'error': 'Not authenticated'}), 401
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'No active client'}), 400
 
@@ -631,7 +669,7 @@ def get_holdings_api():
         return jsonify({'error': 'Not authenticated'}), 401
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'error': 'No active client'}), 400
 
@@ -645,8 +683,10 @@ def get_holdings_api():
 def get_etf_signals_data():
     """API endpoint to get ETF signals data from database (admin_trade_signals for user zhz3j)"""
     try:
-        from models_etf import AdminTradeSignal, RealtimeQuote
+        from models_etf import AdminTradeSignal
         from models import User
+        from quote_cache import latest_quote_cache, write_back_quote_prices
+        from portfolio_engine import compute_signal_metrics
         from datetime import datetime
         
         # Always show zhz3j user's signals for demo purposes
@@ -663,30 +703,35 @@ def get_etf_signals_data():
             signals = AdminTradeSignal.query.limit(15).all()
             logging.info(f"ETF Signals API: No zhz3j user found, showing {len(signals)} signals")
         
-        signals_data = []
+        # Latest quotes for all signal symbols from the shared quote cache
+        latest_quotes = latest_quote_cache.get_many([signal.symbol for signal in signals])
+        
+        price_updates = []
         for signal in signals:
             # Get latest quote for real-time current price
-            latest_quote = RealtimeQuote.query.filter_by(
-                symbol=signal.symbol
-            ).order_by(RealtimeQuote.timestamp.desc()).first()
-            
-            # Calculate real-time values based on current database structure
-            current_price = float(signal.current_price) if signal.current_price else float(signal.entry_price)
+            latest_quote = latest_quotes.get(signal.symbol)
             if latest_quote:
-                current_price = float(latest_quote.current_price)
                 signal.current_price = latest_quote.current_price
                 signal.last_update_time = datetime.utcnow()
-                db.session.commit()
-            
+                price_updates.append((signal, {
+                    'current_price': signal.current_price,
+                    'last_update_time': signal.last_update_time
+                }))
+        
+        # Investment, P&L and target metrics for all signals in one vectorized pass
+        metrics = compute_signal_metrics(signals)
+        
+        signals_data = []
+        for signal, row in zip(signals, metrics.rows()):
             entry_price = float(signal.entry_price)
+            current_price = float(signal.current_price) if signal.current_price else entry_price
             quantity = signal.quantity
-            invested_amount = entry_price * quantity
-            current_value = current_price * quantity
-            profit_loss = current_value - invested_amount
-            profit_loss_percent = ((current_price - entry_price) / entry_price) * 100
+            invested_amount = row['invested']
+            profit_loss = row['pnl']
+            profit_loss_percent = row['pnl_percent']
             target_price = float(signal.target_price) if signal.target_price else 0
-            target_value_amount = target_price * quantity if target_price > 0 else 0
-            target_profit_return = ((target_price - entry_price) / entry_price) * 100 if target_price > 0 else 0
+            target_value_amount = row['target_value']
+            target_profit_return = row['target_return']
             
             # Calculate days held
             entry_date = signal.created_at
@@ -729,11 +774,16 @@ def get_etf_signals_data():
             }
             signals_data.append(signal_dict)
         
+        # Write refreshed prices back in one batched update
+        if price_updates:
+            write_back_quote_prices(price_updates)
+            db.session.commit()
+        
         # Calculate portfolio summary
-        total_investment = sum(float(s.get('inv', 0)) for s in signals_data)
-        total_current_value = sum(float(s.get('inv', 0)) + float(s.get('pl', 0)) for s in signals_data)
-        total_pnl = sum(float(s.get('pl', 0)) for s in signals_data)
-        return_percent = (total_pnl / total_investment * 100) if total_investment > 0 else 0
+        total_investment = metrics.totals['total_investment']
+        total_current_value = metrics.totals['total_current_value']
+        total_pnl = metrics.totals['total_pnl']
+        return_percent = metrics.totals['total_pnl_percent']
         
         portfolio_summary = {
             'total_positions': len(signals_data),
@@ -933,6 +983,7 @@ try:
     from api.enhanced_etf_signals import enhanced_etf_bp
     from api.admin_signals_api import admin_signals_bp
     from api.supabase_api import supabase_bp
+    from api.stream import stream_bp
 
     app.register_blueprint(etf_bp)
     app.register_blueprint(admin_bp)
@@ -942,15 +993,16 @@ try:
     app.register_blueprint(enhanced_etf_bp)
     app.register_blueprint(admin_signals_bp)
     app.register_blueprint(supabase_bp, url_prefix='/api')
+    app.register_blueprint(stream_bp)
     print("✓ Additional blueprints registered successfully")
     
-    # Initialize realtime quotes scheduler
+    # Single quote cycle feeding realtime, Kotak Neo, ETF and admin signal tables
     try:
-        from realtime_quotes_manager import start_quotes_scheduler
-        start_quotes_scheduler()
-        print("✓ Realtime quotes scheduler started")
+        from quote_orchestrator import start_quote_orchestrator
+        start_quote_orchestrator()
+        print("✓ Quote orchestrator started")
     except Exception as e:
-        print(f"Warning: Could not start quotes scheduler: {e}")
+        print(f"Warning: Could not start quote orchestrator: {e}")
         
 except ImportError as e:
     print(f"Warning: Could not import additional blueprint: {e}")
@@ -959,21 +1011,6 @@ if __name__ == '__main__':
     with app.app_context():
         db.create_all()
 
-    # Start ETF data scheduler for real-time quotes
-    try:
-        from etf_data_scheduler import start_etf_data_scheduler
-        start_etf_data_scheduler()
-        logging.info("✅ ETF Data Scheduler initialized")
-    except Exception as e:
-        logging.error(f"❌ Failed to start ETF scheduler: {str(e)}")
-
-    # Initialize admin signals scheduler for comprehensive Kotak Neo data updates (5-minute intervals)
-    try:
-        logging.info("Starting admin signals scheduler with Kotak Neo integration...")
-        from admin_signals_scheduler import start_admin_signals_scheduler
-        start_admin_signals_scheduler()
-        logging.info("✅ Admin signals scheduler started - automatic updates every 5 minutes")
-    except Exception as e:
-        logging.error(f"❌ Failed to start admin signals scheduler: {e}")
+    # ETF and admin signal prices are refreshed by the quote orchestrator started above
 
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
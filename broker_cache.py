@@ -0,0 +1,129 @@
+"""
+Broker Response Cache
+Short-TTL, per-session cache of read-only broker calls with single-flight coalescing
+"""
+
+import logging
+import os
+import threading
+import time
+
+from flask import has_request_context, session
+
+logger = logging.getLogger(__name__)
+
+# Seconds a positions/holdings/limits/order_report response is reused for the same session
+BROKER_CACHE_TTL = float(os.environ.get('BROKER_CACHE_TTL', '3'))
+
+# Seconds a coalesced caller waits for the in-flight call before giving up
+BROKER_COALESCE_WAIT = float(os.environ.get('BROKER_COALESCE_WAIT', '30'))
+
+# Read-only client methods safe to share between requests
+CACHEABLE_METHODS = ('positions', 'holdings', 'limits', 'order_report')
+
+
+def session_cache_key(client=None):
+    """Cache owner for the current request: the logged-in UCC, else the client object"""
+    if has_request_context():
+        owner = session.get('ucc') or session.get('user_id')
+        if owner:
+            return f"user:{owner}"
+    return f"client:{id(client)}"
+
+
+class _Flight:
+    """One in-progress broker call that concurrent callers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class BrokerResponseCache:
+    """(session, method) -> response for BROKER_CACHE_TTL seconds; concurrent misses share one call"""
+
+    def __init__(self, ttl=None):
+        self.ttl = BROKER_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def call(self, client, method_name, owner=None):
+        """client.method_name() through the cache; pass owner when calling off the request thread"""
+        if self.ttl <= 0 or method_name not in CACHEABLE_METHODS:
+            return getattr(client, method_name)()
+
+        key = (owner or session_cache_key(client), method_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.event.wait(BROKER_COALESCE_WAIT):
+                raise TimeoutError(f"Timed out waiting for in-flight {method_name}() call")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = getattr(client, method_name)()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+            return flight.value
+        except Exception as e:
+            # Errors are handed to the waiting callers but never cached
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                self._purge_expired()
+            flight.event.set()
+
+    def _purge_expired(self):
+        """Drop expired entries; called with the lock held"""
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+
+    def invalidate(self, client=None, owner=None, method_names=None):
+        """Forget a session's cached responses, e.g. after it places or cancels an order"""
+        owner = owner or session_cache_key(client)
+        with self._lock:
+            for method_name in method_names or CACHEABLE_METHODS:
+                self._entries.pop((owner, method_name), None)
+
+    def get_stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'in_flight': len(self._flights),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+
+# Global instance shared by every TradingFunctions
+broker_cache = BrokerResponseCache()
+
+
+def cached_broker_call(client, method_name, owner=None):
+    """Call a read-only broker method through the shared cache"""
+    return broker_cache.call(client, method_name, owner=owner)
@@ -0,0 +1,98 @@
+"""
+Broker HTTP
+One pooled keep-alive HTTP session for every Kotak Neo SDK call, with a default socket timeout
+"""
+
+import logging
+import os
+import sys
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connection pools kept (one per broker host) and connections kept alive per host
+BROKER_POOL_CONNECTIONS = int(os.environ.get('BROKER_POOL_CONNECTIONS', '4'))
+BROKER_POOL_MAXSIZE = int(os.environ.get('BROKER_POOL_MAXSIZE', '16'))
+
+# (connect, read) seconds for SDK calls that set no timeout, so a hung broker call always ends
+BROKER_CONNECT_TIMEOUT = float(os.environ.get('BROKER_CONNECT_TIMEOUT', '5'))
+BROKER_READ_TIMEOUT = float(os.environ.get('BROKER_READ_TIMEOUT', '15'))
+
+
+def build_session():
+    """requests.Session with a bounded keep-alive pool and no shared cookies"""
+    session = requests.Session()
+    # Clients of different users share the pool, so nothing one response sets may ride on another user's request
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(
+        pool_connections=BROKER_POOL_CONNECTIONS,
+        pool_maxsize=BROKER_POOL_MAXSIZE,
+        pool_block=False
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class PooledRequests:
+    """Drop-in for the requests module inside the SDK: same call shapes, one pooled session, a default timeout"""
+
+    def __init__(self, session=None, timeout=None):
+        self.session = session or build_session()
+        self.timeout = timeout or (BROKER_CONNECT_TIMEOUT, BROKER_READ_TIMEOUT)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request('PATCH', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def __getattr__(self, name):
+        # Exceptions, status codes and anything else the SDK reads off the module
+        return getattr(requests, name)
+
+
+# Global instance
+broker_http = PooledRequests()
+
+_install_lock = threading.Lock()
+
+
+def install_broker_http():
+    """Point the SDK's modules at broker_http; they call requests.<verb> per request, a new connection each time"""
+    with _install_lock:
+        patched = 0
+        for name, module in list(sys.modules.items()):
+            if name.split('.')[0] == 'neo_api_client' and getattr(module, 'requests', None) is requests:
+                module.requests = broker_http
+                patched += 1
+        if patched:
+            logger.info(f"🔌 Broker SDK HTTP calls pooled through {patched} modules "
+                        f"(pool {BROKER_POOL_MAXSIZE}, timeout {broker_http.timeout})")
+        return patched
+
+
+def neo_api():
+    """NeoAPI class with the SDK's HTTP calls already routed through the pooled session"""
+    from neo_api_client import NeoAPI
+    install_broker_http()
+    return NeoAPI
+
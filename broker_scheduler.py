@@ -0,0 +1,250 @@
+"""
+Broker Request Scheduler
+Token-bucket rate limiting, priority classes and in-flight de-duplication for broker API calls
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Sustained broker calls per second across the whole process
+BROKER_RATE_LIMIT = float(os.environ.get('BROKER_RATE_LIMIT', '5'))
+
+# Calls that may be made back to back before the rate limit kicks in
+BROKER_BURST = int(os.environ.get('BROKER_BURST', '10'))
+
+# Worker threads draining the quote queue
+BROKER_SCHEDULER_WORKERS = int(os.environ.get('BROKER_SCHEDULER_WORKERS', '2'))
+
+# Seconds a caller waits for its queued call before giving up
+BROKER_QUEUE_TIMEOUT = float(os.environ.get('BROKER_QUEUE_TIMEOUT', '30'))
+
+# Priority classes, lowest value served first
+PRIORITY_ORDER = 0
+PRIORITY_USER_QUOTE = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: 'orders',
+    PRIORITY_USER_QUOTE: 'user_quotes',
+    PRIORITY_BACKGROUND: 'background'
+}
+
+
+def default_quote_priority():
+    """User-facing when called while serving a request, background for schedulers and jobs"""
+    return PRIORITY_USER_QUOTE if has_request_context() else PRIORITY_BACKGROUND
+
+
+def quote_key(tokens):
+    """De-duplication key for a quote request; token order does not matter"""
+    return ('quotes', tuple(sorted(
+        f"{token.get('exchange_segment', '')}|{token.get('instrument_token', '')}" if isinstance(token, dict) else str(token)
+        for token in tokens
+    )))
+
+
+class TokenBucket:
+    """Classic token bucket; orders may borrow so the debt is paid by queued work, not by them"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add tokens accrued since the last update; called with the lock held"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Take a token unconditionally, going into debt if the bucket is empty"""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def refund(self):
+        """Return a token that was acquired but not used"""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def available(self):
+        """Tokens currently in the bucket (negative while orders are being repaid)"""
+        with self._lock:
+            self._refill()
+            return round(self.tokens, 2)
+
+
+class _Job:
+    """One queued broker call; duplicate callers share its future"""
+
+    def __init__(self, fn, args, kwargs, priority, key):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.future = Future()
+        self.started = False
+        self.enqueued_at = time.monotonic()
+
+
+class BrokerScheduler:
+    """Single gate for broker calls: orders run at once, quotes queue by priority behind a shared rate limit"""
+
+    def __init__(self, rate=None, burst=None, workers=None):
+        self.bucket = TokenBucket(BROKER_RATE_LIMIT if rate is None else rate, burst or BROKER_BURST)
+        self.workers = workers or BROKER_SCHEDULER_WORKERS
+        self._condition = threading.Condition()
+        self._queue = []
+        self._pending = {}
+        self._sequence = itertools.count()
+        self._threads = []
+        self.submitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_wait = 0.0
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use; called with the condition held"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"broker-scheduler-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🚦 Broker scheduler started: {self.bucket.rate}/s, burst {self.bucket.burst}, {self.workers} workers")
+
+    def run_order(self, fn, *args, **kwargs):
+        """Run an order call on the caller's thread; it never waits on the queue or the bucket"""
+        self.bucket.take()
+        with self._condition:
+            self.submitted[PRIORITY_NAMES[PRIORITY_ORDER]] += 1
+        return fn(*args, **kwargs)
+
+    def submit(self, fn, *args, priority=PRIORITY_BACKGROUND, key=None, **kwargs):
+        """Queue a broker call and return its future; a matching in-flight key shares one call"""
+        with self._condition:
+            self._ensure_workers()
+            self.submitted[PRIORITY_NAMES.get(priority, 'background')] += 1
+
+            job = self._pending.get(key) if key is not None else None
+            if job is not None:
+                self.deduplicated += 1
+                if not job.started and priority < job.priority:
+                    # A user is now waiting on a background refresh: move it up the queue
+                    job.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._sequence), job))
+                return job.future
+
+            job = _Job(fn, args, kwargs, priority, key)
+            if key is not None:
+                self._pending[key] = job
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self._condition.notify()
+            return job.future
+
+    def call(self, fn, *args, priority=PRIORITY_BACKGROUND, key=None, timeout=None, **kwargs):
+        """Queue a broker call and wait for its result"""
+        future = self.submit(fn, *args, priority=priority, key=key, **kwargs)
+        return future.result(timeout=BROKER_QUEUE_TIMEOUT if timeout is None else timeout)
+
+    def _next_job(self):
+        """Pop the most urgent job not already picked up; called with the condition held"""
+        while self._queue:
+            _, _, job = heapq.heappop(self._queue)
+            if not job.started:
+                job.started = True
+                return job
+        return None
+
+    def _worker(self):
+        """Take a rate-limit token, then run whichever job is most urgent at that moment"""
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+
+            self.bucket.acquire()
+
+            with self._condition:
+                job = self._next_job()
+                if job is None:
+                    # Another worker drained the queue while we waited; give the token back
+                    self.bucket.refund()
+                    continue
+                self.max_wait = max(self.max_wait, time.monotonic() - job.enqueued_at)
+
+            try:
+                job.future.set_result(job.fn(*job.args, **job.kwargs))
+                succeeded = True
+            except Exception as e:
+                job.future.set_exception(e)
+                succeeded = False
+
+            with self._condition:
+                if job.key is not None and self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def get_stats(self):
+        """Get scheduler statistics"""
+        with self._condition:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            waiting = {id(job): job for _, _, job in self._queue if not job.started}
+            for job in waiting.values():
+                queued[PRIORITY_NAMES.get(job.priority, 'background')] += 1
+            return {
+                'rate_per_second': self.bucket.rate,
+                'burst': self.bucket.burst,
+                'tokens_available': self.bucket.available(),
+                'workers': len(self._threads),
+                'queued': queued,
+                'submitted': dict(self.submitted),
+                'deduplicated': self.deduplicated,
+                'completed': self.completed,
+                'failed': self.failed,
+                'max_queue_wait_seconds': round(self.max_wait, 3)
+            }
+
+
+# Global instance shared by every broker caller in the process
+broker_scheduler = BrokerScheduler()
+
+
+def scheduled_quotes(client, tokens, priority=None):
+    """client.quotes(tokens) through the scheduler; identical in-flight requests share one call"""
+    return broker_scheduler.call(
+        client.quotes,
+        list(tokens),
+        priority=default_quote_priority() if priority is None else priority,
+        key=quote_key(tokens)
+    )
@@ -0,0 +1,200 @@
+"""
+Client Registry
+Process-wide, thread-safe reuse of initialized Kotak Neo clients keyed by UCC or token set
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client may sit unused before it is evicted
+CLIENT_IDLE_TIMEOUT = float(os.environ.get('CLIENT_IDLE_TIMEOUT', '1800'))
+
+# Hard cap on registered clients; the least recently used is evicted first
+CLIENT_REGISTRY_MAX = int(os.environ.get('CLIENT_REGISTRY_MAX', '200'))
+
+# Seconds between idle sweeps piggybacked on lookups
+CLIENT_SWEEP_INTERVAL = 60
+
+
+def token_fingerprint(access_token, session_token=None, sid=None):
+    """Stable digest of a token set, so raw tokens never serve as registry keys"""
+    raw = '|'.join(str(value or '') for value in (access_token, session_token, sid))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+class _Entry:
+    """A registered client and its usage counters"""
+
+    def __init__(self, client, fingerprint):
+        self.client = client
+        self.fingerprint = fingerprint
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class ClientRegistry:
+    """owner -> initialized client, so logins and token checks are not repeated per request"""
+
+    def __init__(self, idle_timeout=None, max_clients=None):
+        self.idle_timeout = CLIENT_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.max_clients = max_clients or CLIENT_REGISTRY_MAX
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._creating = {}
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.evicted = 0
+        self._last_sweep = time.monotonic()
+
+    def get(self, owner, fingerprint=None):
+        """Registered client for owner, or None; a changed token set drops the stale client"""
+        with self._lock:
+            if time.monotonic() - self._last_sweep > CLIENT_SWEEP_INTERVAL:
+                self._evict_locked()
+            entry = self._entries.get(owner)
+            if entry is None:
+                return None
+            if fingerprint is not None and entry.fingerprint != fingerprint:
+                del self._entries[owner]
+                self.evicted += 1
+                return None
+            entry.last_used = time.monotonic()
+            entry.uses += 1
+            self.hits += 1
+            return entry.client
+
+    def register(self, owner, client, fingerprint=None):
+        """Register (or replace) the client for owner"""
+        if client is None:
+            return None
+        with self._lock:
+            self._entries[owner] = _Entry(client, fingerprint)
+            self._evict_locked()
+        return client
+
+    def get_or_create(self, owner, fingerprint, factory):
+        """Registered client for owner, else factory() once even under concurrent callers"""
+        client = self.get(owner, fingerprint)
+        if client is not None:
+            return client
+
+        with self._lock:
+            creation_lock = self._creating.setdefault(owner, threading.Lock())
+
+        with creation_lock:
+            # Another caller may have built it while we waited
+            client = self.get(owner, fingerprint)
+            if client is not None:
+                return client
+
+            with self._lock:
+                self.misses += 1
+            client = factory()
+            if client is not None:
+                with self._lock:
+                    self.created += 1
+                self.register(owner, client, fingerprint)
+            return client
+
+    def remove(self, owner):
+        """Forget owner's client, e.g. on logout"""
+        with self._lock:
+            self._creating.pop(owner, None)
+            return self._entries.pop(owner, None) is not None
+
+    def evict_idle(self):
+        """Drop clients idle longer than idle_timeout; returns how many were evicted"""
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self):
+        """Idle and over-capacity eviction; called with the lock held"""
+        now = time.monotonic()
+        self._last_sweep = now
+        idle = [owner for owner, entry in self._entries.items() if now - entry.last_used > self.idle_timeout]
+        for owner in idle:
+            del self._entries[owner]
+            self._creating.pop(owner, None)
+
+        overflow = len(self._entries) - self.max_clients
+        if overflow > 0:
+            oldest = sorted(self._entries, key=lambda owner: self._entries[owner].last_used)[:overflow]
+            for owner in oldest:
+                del self._entries[owner]
+                self._creating.pop(owner, None)
+            idle.extend(oldest)
+
+        if idle:
+            self.evicted += len(idle)
+            logger.info(f"♻️ Evicted {len(idle)} idle broker clients")
+        return len(idle)
+
+    def get_stats(self):
+        """Get registry statistics"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'clients': len(self._entries),
+                'max_clients': self.max_clients,
+                'idle_timeout_seconds': self.idle_timeout,
+                'hits': self.hits,
+                'misses': self.misses,
+                'created': self.created,
+                'evicted': self.evicted,
+                'oldest_idle_seconds': round(max((now - entry.last_used for entry in self._entries.values()), default=0), 1)
+            }
+
+
+# Global instance
+client_registry = ClientRegistry()
+
+
+def get_session_client():
+    """Broker client for the current Flask session, reused across requests for the same UCC"""
+    from flask import session
+
+    owner = session.get('ucc')
+    client = session.get('client')
+    if not owner or client is None or isinstance(client, str):
+        return client
+
+    fingerprint = token_fingerprint(session.get('access_token'), session.get('session_token'), session.get('sid'))
+    registered = client_registry.get(owner, fingerprint)
+    if registered is not None:
+        return registered
+
+    # First request after login (or after eviction): keep this unpickled client for the next ones
+    return client_registry.register(owner, client, fingerprint)
+
+
+def register_session_client(ucc, client, access_token, session_token=None, sid=None):
+    """Register the client a login just produced"""
+    return client_registry.register(ucc, client, token_fingerprint(access_token, session_token, sid))
+
+
+def release_session_client(ucc):
+    """Drop a user's client on logout"""
+    if ucc:
+        client_registry.remove(ucc)
+
+
+def get_stored_session_client():
+    """Client for the stored default_user session, shared by schedulers and background jobs"""
+    from neo_client import NeoClient
+    from session_manager import SessionManager
+
+    session_data = SessionManager().get_session('default_user')
+    if not session_data or not session_data.get('access_token'):
+        return None
+    return NeoClient().initialize_client_with_tokens(
+        session_data.get('access_token'),
+        session_data.get('session_token'),
+        session_data.get('sid')
+    )
@@ -6,23 +6,100 @@ import os
 import logging
 from datetime import datetime
 import random
+import threading
+from snapshot_store import load_snapshot
+
+# Rows in the first column that are not positions
+SKIPPED_SYMBOLS = ('ETF', '', 'nan', 'MID150BEES')
+
+
+class CSVFrameCache:
+    """Parsed CSV frames keyed by (path, mtime, size), plus a stat-checked directory listing"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._listings = {}
+        self.parses = 0
+        self.hits = 0
+    
+    def list_csv_files(self, directory):
+        """Sorted CSV file names, re-listed only when the directory mtime changes"""
+        directory_mtime = os.stat(directory).st_mtime_ns
+        cached = self._listings.get(directory)
+        if cached and cached[0] == directory_mtime:
+            return cached[1]
+        
+        csv_files = sorted(f for f in os.listdir(directory) if f.endswith('.csv'))
+        self._listings[directory] = (directory_mtime, csv_files)
+        return csv_files
+    
+    def get(self, path, parse):
+        """Frame for path, parsed with parse(path) only when the file's mtime or size changed"""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._frames.get(path)
+        if cached and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+        
+        with self._lock:
+            cached = self._frames.get(path)
+            if cached and cached[0] == key:
+                self.hits += 1
+                return cached[1]
+            frame = parse(path)
+            self._frames[path] = (key, frame)
+            self.parses += 1
+            return frame
+    
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._listings.clear()
+
+
+# Shared by every CSVDataFetcher, so per-request TradingFunctions instances reuse the parse
+csv_frame_cache = CSVFrameCache()
+
+
+def parse_positions_frame(csv_file):
+    """Typed position columns (symbol, quantity, entry, cmp, investment) for a sheet export"""
+    # Zero-parse when snapshot_store has an Arrow copy of the file, a CSV parse otherwise
+    snapshot = load_snapshot(csv_file, ('symbol', 'quantity', 'entry_price', 'current_price', 'investment'))
+    
+    quantity = snapshot['quantity'].fillna(0).astype(int)
+    entry_price = snapshot['entry_price']
+    positions = pd.DataFrame({
+        'symbol': snapshot['symbol'],
+        'quantity': quantity,
+        'entry_price': entry_price.fillna(0.0),
+        'current_price': snapshot['current_price'].fillna(entry_price).fillna(0.0),
+        'investment': snapshot['investment'].fillna(0.0)
+    })
+    
+    # A real symbol with a quantity, as the per-row parser required
+    keep = ~positions['symbol'].isin(SKIPPED_SYMBOLS) & (quantity != 0)
+    positions = positions[keep].reset_index(drop=True)
+    logging.getLogger(__name__).info(f"Parsed {len(positions)} positions from {csv_file}")
+    return positions
+
 
 class CSVDataFetcher:
     """Fetch real trading data from CSV files"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
         self.csv_directory = "attached_assets"
         self.logger = logging.getLogger(__name__)
+        self.cache = cache or csv_frame_cache
         
     def get_latest_csv_file(self):
         """Get the most recent CSV file from attached assets"""
         try:
-            csv_files = [f for f in os.listdir(self.csv_directory) if f.endswith('.csv')]
+            csv_files = self.cache.list_csv_files(self.csv_directory)
             if not csv_files:
                 return None
             
-            # Get the most recent file by modification time
-            csv_files.sort()
             latest_file = csv_files[-1]  # Most recent alphabetically
             return os.path.join(self.csv_directory, latest_file)
             
@@ -31,20 +108,13 @@ class CSVDataFetcher:
             return None
     
     def load_csv_data(self):
-        """Load data from the latest CSV file"""
+        """Typed position columns from the latest CSV file, parsed once per file version"""
         try:
             csv_file = self.get_latest_csv_file()
             if not csv_file:
                 return pd.DataFrame()
             
-            # Read CSV with proper encoding, skip first 2 rows and use row 3 as header
-            df = pd.read_csv(csv_file, skiprows=2)
-            self.logger.info(f"Loaded {len(df)} rows from {csv_file}")
-            
-            # Clean up the dataframe - remove rows with all NaN values
-            df = df.dropna(how='all')
-            
-            return df
+            return self.cache.get(csv_file, parse_positions_frame)
             
         except Exception as e:
             self.logger.error(f"Error loading CSV data: {str(e)}")
@@ -58,65 +128,44 @@ class CSVDataFetcher:
                 return []
             
             positions = []
-            for _, row in df.iterrows():
-                try:
-                    # Use first column as ETF name (based on CSV structure)
-                    etf_name = str(row.iloc[0]) if len(row) > 0 else ''
-                    if etf_name in ['ETF', '', 'nan', 'MID150BEES'] or pd.isna(etf_name):
-                        continue
-                    
-                    # Map columns based on actual CSV structure
-                    # Columns: ETF, #N/A, #N/A.1, Date, Pos, Qty, EP, CMP, %Chan, Inv., etc.
-                    pos_status = row.iloc[4] if len(row) > 4 else 0  # Position status
-                    quantity = int(row.iloc[5]) if len(row) > 5 and pd.notna(row.iloc[5]) else 0
-                    
-                    # Skip if no quantity
-                    if quantity == 0:
-                        continue
-                    
-                    # Parse prices
-                    entry_price = float(row.iloc[6]) if len(row) > 6 and pd.notna(row.iloc[6]) else 0
-                    current_price = float(row.iloc[7]) if len(row) > 7 and pd.notna(row.iloc[7]) else entry_price
-                    
-                    # Investment amount
-                    investment = float(row.iloc[9]) if len(row) > 9 and pd.notna(row.iloc[9]) else 0
-                    
-                    # Add slight price variation for real-time simulation
-                    ltp = current_price * (1 + random.uniform(-0.015, 0.015))  # ±1.5% variation
-                    
-                    # Calculate P&L from current vs entry price
-                    pnl = (ltp - entry_price) * quantity
-                    pnl_percent = (pnl / investment * 100) if investment > 0 else 0
-                    
-                    position = {
-                        'symbol': etf_name,
-                        'product': 'CNC',
-                        'quantity': quantity,
-                        'avg_price': round(entry_price, 2),
-                        'ltp': round(ltp, 2),
-                        'pnl': round(pnl, 2),
-                        'pnl_percent': round(pnl_percent, 2),
-                        'segment': 'nse_cm',
-                        'value': round(investment, 2),
-                        'current_value': round(ltp * quantity, 2)
-                    }
-                    positions.append(position)
-                    
-                except (ValueError, TypeError, IndexError) as e:
-                    self.logger.warning(f"Error processing row for {etf_name}: {e}")
-                    continue
-            
-            self.logger.info(f"Processed {len(positions)} positions from CSV")
+            rows = zip(
+                df['symbol'].tolist(), df['quantity'].tolist(), df['entry_price'].tolist(),
+                df['current_price'].tolist(), df['investment'].tolist()
+            )
+            for etf_name, quantity, entry_price, current_price, investment in rows:
+                # Add slight price variation for real-time simulation
+                ltp = current_price * (1 + random.uniform(-0.015, 0.015))  # ±1.5% variation
+                
+                # Calculate P&L from current vs entry price
+                pnl = (ltp - entry_price) * quantity
+                pnl_percent = (pnl / investment * 100) if investment > 0 else 0
+                
+                position = {
+                    'symbol': etf_name,
+                    'product': 'CNC',
+                    'quantity': quantity,
+                    'avg_price': round(entry_price, 2),
+                    'ltp': round(ltp, 2),
+                    'pnl': round(pnl, 2),
+                    'pnl_percent': round(pnl_percent, 2),
+                    'segment': 'nse_cm',
+                    'value': round(investment, 2),
+                    'current_value': round(ltp * quantity, 2)
+                }
+                positions.append(position)
+            
+            self.logger.debug(f"Processed {len(positions)} positions from CSV")
             return positions
             
         except Exception as e:
             self.logger.error(f"Error fetching positions: {str(e)}")
             return []
     
-    def fetch_holdings_data(self):
+    def fetch_holdings_data(self, positions=None):
         """Extract holdings from CSV data (similar to positions but long-term)"""
         try:
-            positions = self.fetch_positions_data()
+            if positions is None:
+                positions = self.fetch_positions_data()
             # Convert positions to holdings format
             holdings = []
             
@@ -138,10 +187,11 @@ class CSVDataFetcher:
             self.logger.error(f"Error fetching holdings: {str(e)}")
             return []
     
-    def fetch_orders_data(self):
+    def fetch_orders_data(self, positions=None):
         """Generate recent orders based on positions"""
         try:
-            positions = self.fetch_positions_data()
+            if positions is None:
+                positions = self.fetch_positions_data()
             orders = []
             
             # Generate some sample orders based on positions
@@ -163,10 +213,11 @@ class CSVDataFetcher:
             self.logger.error(f"Error fetching orders: {str(e)}")
             return []
     
-    def fetch_limits_data(self):
+    def fetch_limits_data(self, positions=None):
         """Calculate account limits based on CSV data"""
         try:
-            positions = self.fetch_positions_data()
+            if positions is None:
+                positions = self.fetch_positions_data()
             
             total_investment = sum(pos['value'] for pos in positions)
             total_current_value = sum(pos['current_value'] for pos in positions)
@@ -191,10 +242,11 @@ class CSVDataFetcher:
     def get_comprehensive_dashboard_data(self):
         """Get all dashboard data from CSV sources"""
         try:
+            # One set of positions feeds every view, so one simulated price per symbol
             positions = self.fetch_positions_data()
-            holdings = self.fetch_holdings_data()
-            orders = self.fetch_orders_data()
-            limits = self.fetch_limits_data()
+            holdings = self.fetch_holdings_data(positions)
+            orders = self.fetch_orders_data(positions)
+            limits = self.fetch_limits_data(positions)
             
             # Calculate summary metrics
             total_pnl = sum(pos['pnl'] for pos in positions)
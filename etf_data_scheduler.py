@@ -3,9 +3,9 @@ import schedule
 import time
 import threading
 import logging
-from datetime import datetime
 from app import app, db
-from models_etf import ETFSignalTrade
+from market_calendar import market_calendar
+from signal_book import signal_book
 from trading_functions import TradingFunctions
 from session_manager import SessionManager
 from neo_client import NeoClient
@@ -19,6 +19,7 @@ class ETFDataScheduler:
         self.trading_functions = TradingFunctions()
         self.session_manager = SessionManager()
         self.neo_client = NeoClient()
+        self.scheduler = schedule.Scheduler()
         self.client = None
         self.is_running = False
         
@@ -45,6 +46,7 @@ class ETFDataScheduler:
             {'symbol': 'TCS', 'token': '11536'},
             {'symbol': 'INFY', 'token': '1594'},
         ]
+        self.token_symbols = {etf['token']: etf['symbol'] for etf in self.etf_instruments}
 
     def initialize_client(self):
         """Initialize Kotak Neo client with stored session"""
@@ -80,6 +82,10 @@ class ETFDataScheduler:
 
     def fetch_etf_quotes(self):
         """Fetch live quotes for all ETF instruments"""
+        if not market_calendar.should_refresh():
+            logger.debug(f"Market {market_calendar.phase()}, skipping ETF quote fetch")
+            return
+
         try:
             if not self.client:
                 if not self.initialize_client():
@@ -88,26 +94,17 @@ class ETFDataScheduler:
 
             logger.info(f"🔄 Fetching quotes for {len(self.etf_instruments)} ETF instruments...")
 
-            # Extract tokens for quote request
+            # One scheduled quote call for every ETF token
             instrument_tokens = [etf['token'] for etf in self.etf_instruments]
+            quotes = self.trading_functions.get_quotes(instrument_tokens, client=self.client)
 
-            # Get quotes from Kotak Neo API
-            quote_data = {
-                'instrument_tokens': instrument_tokens,
-                'quote_type': None,
-                'is_index': False
-            }
-
-            quotes_response = self.trading_functions.get_quotes(self.client, quote_data)
-
-            if quotes_response.get('success'):
-                quotes = quotes_response.get('data', {})
+            if quotes:
                 logger.info(f"✅ Received quotes for {len(quotes)} instruments")
                 
                 # Update database with new quotes
-                self.update_etf_database(quotes)
+                self.update_etf_database({quote['tk']: quote for quote in quotes})
             else:
-                logger.error(f"❌ Failed to get quotes: {quotes_response.get('message', 'Unknown error')}")
+                logger.error("❌ Failed to get quotes")
 
         except Exception as e:
             logger.error(f"❌ Error fetching ETF quotes: {str(e)}")
@@ -116,44 +113,15 @@ class ETFDataScheduler:
         """Update ETF signal trades with current market prices"""
         try:
             with app.app_context():
-                updated_count = 0
-                
+                prices = {}
                 for token, quote_info in quotes.items():
-                    # Find corresponding ETF symbol
-                    etf_symbol = None
-                    for etf in self.etf_instruments:
-                        if etf['token'] == token:
-                            etf_symbol = etf['symbol']
-                            break
-                    
-                    if not etf_symbol:
-                        continue
-
-                    # Extract quote data
-                    current_price = float(quote_info.get('last_traded_price', 0))
-                    change_percent = float(quote_info.get('change_percent', 0))
-
-                    if current_price <= 0:
-                        continue
-
-                    # Update all active ETF signal trades for this symbol
-                    etf_trades = ETFSignalTrade.query.filter_by(
-                        symbol=etf_symbol,
-                        status='ACTIVE'
-                    ).all()
-
-                    for trade in etf_trades:
-                        # Update current price
-                        trade.current_price = current_price
-                        trade.change_pct = f"{change_percent:.2f}%"
-                        trade.last_price_update = datetime.utcnow()
-                        
-                        # Recalculate P&L
-                        trade.calculate_pnl()
-                        
-                        updated_count += 1
-                        
-                        logger.debug(f"Updated {etf_symbol}: Price={current_price}, Change={change_percent}%")
+                    etf_symbol = self.token_symbols.get(str(token))
+                    current_price = quote_info['ltp']
+                    if etf_symbol and current_price > 0:
+                        prices[etf_symbol] = current_price
+
+                # Active trades come from the in-memory signal book, not a query per symbol
+                updated_count, _ = signal_book.reprice(prices, admin=False)
 
                 # Commit all updates
                 db.session.commit()
@@ -171,7 +139,7 @@ class ETFDataScheduler:
                 return
 
             # Schedule to run every 5 minutes
-            schedule.every(5).minutes.do(self.fetch_etf_quotes)
+            self.scheduler.every(5).minutes.do(self.fetch_etf_quotes)
             
             # Run immediately on start
             self.fetch_etf_quotes()
@@ -182,7 +150,7 @@ class ETFDataScheduler:
             # Run scheduler in background thread
             def run_scheduler():
                 while self.is_running:
-                    schedule.run_pending()
+                    self.scheduler.run_pending()
                     time.sleep(30)  # Check every 30 seconds
 
             scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
@@ -194,7 +162,7 @@ class ETFDataScheduler:
     def stop_scheduler(self):
         """Stop the scheduler"""
         self.is_running = False
-        schedule.clear()
+        self.scheduler.clear()
         logger.info("🛑 ETF Data Scheduler stopped")
 
 # Global scheduler instance
@@ -2,6 +2,10 @@ from app import db
 from models_etf import RealtimeQuote
 from neo_client import NeoClient
 from session_helper import SessionHelper
+from tick_pipeline import tick_pipeline
+from symbol_search import search_symbols
+from portfolio_summary import get_user_portfolio_summary
+from client_registry import get_session_client
 from datetime import datetime, timedelta
 import logging
 import json
@@ -253,9 +257,10 @@ class ETFTradingSignals:
         try:
             from flask import session
 
-            # Get client from Flask session (already initialized)
-            if 'client' in session and session['client']:
-                self.client = session['client']
+            # Get client from Flask session (already initialized), shared via the client registry
+            client = get_session_client()
+            if client:
+                self.client = client
                 logger.info("✅ Using existing Neo client from Flask session")
                 return True
             else:
@@ -267,66 +272,12 @@ class ETFTradingSignals:
             return False
 
     def search_etf_instruments(self, query):
-        """Search for ETF instruments using available data sources"""
-        if not self.client:
-            if not self.initialize_client():
-                return []
-
+        """Search for ETF instruments in the local scrip master"""
         try:
-            # For now, return some common ETF instruments as a fallback
-            # This ensures the interface works while API integration is being finalized
-            common_etfs = [
-                {
-                    'symbol': 'NIFTYBEES',
-                    'trading_symbol': 'NIFTYBEES-EQ',
-                    'token': '15083',
-                    'exchange': 'NSE',
-                    'description': 'Nippon India ETF Nifty BeES',
-                    'lot_size': 1
-                },
-                {
-                    'symbol': 'GOLDBEES',
-                    'trading_symbol': 'GOLDBEES-EQ', 
-                    'token': '1660',
-                    'exchange': 'NSE',
-                    'description': 'Nippon India ETF Gold BeES',
-                    'lot_size': 1
-                },
-                {
-                    'symbol': 'BANKBEES',
-                    'trading_symbol': 'BANKBEES-EQ',
-                    'token': '2800',
-                    'exchange': 'NSE', 
-                    'description': 'Nippon India ETF Bank BeES',
-                    'lot_size': 1
-                },
-                {
-                    'symbol': 'JUNIORBEES',
-                    'trading_symbol': 'JUNIORBEES-EQ',
-                    'token': '583',
-                    'exchange': 'NSE',
-                    'description': 'Nippon India ETF Junior BeES',
-                    'lot_size': 1
-                },
-                {
-                    'symbol': 'LIQUIDBEES',
-                    'trading_symbol': 'LIQUIDBEES-EQ',
-                    'token': '1023',
-                    'exchange': 'NSE',
-                    'description': 'Nippon India ETF Liquid BeES',
-                    'lot_size': 1
-                }
-            ]
+            etfs = [instrument.to_dict() for instrument in search_symbols(query, limit=10, etf_only=True)]
 
-            # Filter ETFs based on query
-            query_upper = query.upper()
-            filtered_etfs = [
-                etf for etf in common_etfs 
-                if query_upper in etf['symbol'].upper() or query_upper in etf['description'].upper()
-            ]
-
-            logger.info(f"Found {len(filtered_etfs)} ETF instruments for query: {query}")
-            return filtered_etfs
+            logger.info(f"Found {len(etfs)} ETF instruments for query: {query}")
+            return etfs
 
         except Exception as e:
             logger.error(f"Error searching ETF instruments: {e}")
@@ -529,6 +480,9 @@ class ETFTradingSignals:
         try:
             # Prepare instrument tokens for subscription
             tokens_to_subscribe = []
+            tick_pipeline.register_tokens({
+                instrument['token']: instrument.get('symbol') for instrument in instruments
+            })
             for instrument in instruments:
                 token = instrument['token']
                 if token not in self.websocket_subscriptions:
@@ -567,21 +521,9 @@ class ETFTradingSignals:
     def setup_websocket_callbacks(self):
         """Setup WebSocket callbacks for live price updates"""
         def on_message(message):
-            """Handle incoming WebSocket messages"""
+            """Queue incoming WebSocket messages for batched price updates"""
             try:
-                if isinstance(message, dict):
-                    token = message.get('tk')
-                    ltp = message.get('ltp')
-
-                    if token and ltp:
-                        # Update positions with new price data
-                        self.update_positions_with_live_data(token, {
-                            'ltp': ltp,
-                            'change': message.get('nc', 0),
-                            'change_percent': message.get('pc', 0),
-                            'volume': message.get('v', 0)
-                        })
-
+                tick_pipeline.submit(message)
             except Exception as e:
                 logger.error(f"Error processing WebSocket message: {e}")
 
@@ -597,42 +539,26 @@ class ETFTradingSignals:
             self.client.set_on_error(on_error)
             self.client.set_on_close(on_close)
 
-    def update_positions_with_live_data(self, token, quote_data):
-        """Update ETF positions with live market data"""
-        try:
-            positions = ETFPosition.query.filter_by(token=str(token), is_active=True).all()
-
-            for position in positions:
-                position.current_price = quote_data['ltp']
-                position.last_update_time = datetime.utcnow()
-
-            db.session.commit()
-            logger.debug(f"Updated {len(positions)} positions with live data for token {token}")
-
-        except Exception as e:
-            logger.error(f"Error updating positions with live data: {e}")
-
     def calculate_portfolio_summary(self, user_id):
-        """Calculate portfolio summary metrics"""
+        """Calculate portfolio summary metrics from the precomputed user summary"""
         try:
-            positions = ETFPosition.query.filter_by(user_id=user_id, is_active=True).all()
+            summary = get_user_portfolio_summary(user_id)
 
-            total_investment = sum(p.investment_amount for p in positions)
-            total_current_value = sum(p.current_value for p in positions)
-            total_pnl = sum(p.profit_loss for p in positions)
+            total_investment = summary['active_invested']
+            total_pnl = summary['active_pnl']
 
             portfolio_return_pct = 0
             if total_investment > 0:
                 portfolio_return_pct = (total_pnl / total_investment) * 100
 
             return {
-                'total_positions': len(positions),
+                'total_positions': summary['active_deals'],
                 'total_investment': total_investment,
-                'total_current_value': total_current_value,
+                'total_current_value': summary['active_current_value'],
                 'total_pnl': total_pnl,
                 'portfolio_return_percent': portfolio_return_pct,
-                'profitable_positions': len([p for p in positions if p.profit_loss > 0]),
-                'loss_positions': len([p for p in positions if p.profit_loss < 0])
+                'profitable_positions': summary['active_winning'],
+                'loss_positions': summary['active_losing']
             }
 
         except Exception as e:
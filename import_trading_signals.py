@@ -2,11 +2,11 @@
 """
 Import trading signals from CSV files and send to users
 """
-import pandas as pd
 import json
 import requests
 from datetime import datetime
 import logging
+from signal_csv_importer import ImportReport, SignalCSVImporter, iter_csv_chunks
 
 logging.basicConfig(level=logging.INFO)
 
@@ -33,31 +33,30 @@ class TradingSignalsImporter:
     def parse_csv_signals(self, csv_file_path):
         """Parse CSV file and extract trading signals"""
         try:
-            df = pd.read_csv(csv_file_path)
+            # Streaming parse of the sheet export (preamble rows, quoted "4,600,370" cells, #N/A)
+            report = ImportReport(dry_run=True)
+            parser = SignalCSVImporter()
             signals = []
             
-            for _, row in df.iterrows():
-                # Map CSV columns to signal data
-                signal = {
-                    'symbol': str(row.get('ETF', row.get('Symbol', ''))).strip(),
-                    'signal_type': 'BUY' if row.get('Pos', 1) > 0 else 'SELL',
-                    'entry_price': float(row.get('EP', 0)),
-                    'current_price': float(row.get('CMP', row.get('EP', 0))),
-                    'target_price': float(row.get('TP', 0)) if pd.notna(row.get('TP')) else None,
-                    'quantity': int(row.get('Qty', 100)),
-                    'change_percent': float(row.get('%Chan', 0)) if pd.notna(row.get('%Chan')) else None,
-                    'invested_amount': float(row.get('Inv', 0)) if pd.notna(row.get('Inv')) else None,
-                    'pnl': float(row.get('PL', 0)) if pd.notna(row.get('PL')) else None,
-                    'signal_title': f"{'BUY' if row.get('Pos', 1) > 0 else 'SELL'} {str(row.get('ETF', row.get('Symbol', ''))).strip()}",
-                    'signal_description': f"Position: {row.get('Pos', 1)}, Target: {row.get('TP', 'N/A')}, Volume: {row.get('Qty', 100)}"
-                }
-                
-                # Add exchange info if available
-                if 'Exchange' in row:
-                    signal['exchange'] = str(row['Exchange']).strip()
-                
-                signals.append(signal)
+            for _, chunk in iter_csv_chunks(csv_file_path):
+                for row in parser.convert_chunk(chunk, report):
+                    signals.append({
+                        'symbol': row['symbol'],
+                        'signal_type': row['signal_type'],
+                        'entry_price': row['entry_price'],
+                        'current_price': row['current_price'],
+                        'target_price': row['target_price'],
+                        'quantity': row['quantity'],
+                        'change_percent': row['change_percent'],
+                        'invested_amount': row['investment_amount'],
+                        'pnl': row['pnl'],
+                        'signal_title': f"{row['signal_type']} {row['symbol']}",
+                        'signal_description': f"Status: {row['status']}, Target: {row['target_price']}, Volume: {row['quantity']}",
+                        'exchange': row['exchange']
+                    })
             
+            for error in report.errors:
+                logging.warning(f"Skipped line {error['line']} ({error['symbol']}): {error['error']}")
             logging.info(f"Parsed {len(signals)} signals from CSV")
             return signals
             
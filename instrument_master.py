@@ -0,0 +1,381 @@
+"""
+Instrument Master
+In-memory scrip master with O(1) symbol / trading symbol / token lookups and a prefix/trigram search index
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from collections import namedtuple, defaultdict
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Kotak Neo scrip master CSV (or any CSV with the columns in MASTER_COLUMNS); downloaded through the Neo API when unset
+INSTRUMENT_MASTER_PATH = os.environ.get('INSTRUMENT_MASTER_PATH', '')
+
+# Where the scrip master downloaded through the Neo scrip-master API is kept
+INSTRUMENT_MASTER_CACHE = os.environ.get('INSTRUMENT_MASTER_CACHE', os.path.join(DATA_DIR, 'scrip_master_nse_cm.csv'))
+
+# Exchange segment downloaded from the scrip-master API
+INSTRUMENT_MASTER_SEGMENT = os.environ.get('INSTRUMENT_MASTER_SEGMENT', 'nse_cm')
+
+# Seconds before the downloaded master is refreshed (tokens change with new listings)
+INSTRUMENT_MASTER_MAX_AGE = float(os.environ.get('INSTRUMENT_MASTER_MAX_AGE', '86400'))
+
+# Seconds before a failed load is retried; lookups find nothing in between
+INSTRUMENT_MASTER_RETRY_SECONDS = float(os.environ.get('INSTRUMENT_MASTER_RETRY_SECONDS', '300'))
+
+# Sample scrip master with made-up tokens, for tests only: it is never loaded unless passed to load() explicitly
+FIXTURE_MASTER_PATH = os.path.join(DATA_DIR, 'scrip_master_fixture.csv')
+
+# Longest symbol prefix kept in the prefix index
+PREFIX_INDEX_DEPTH = 12
+
+# Accepted CSV headers for each field, Kotak Neo scrip master names first
+MASTER_COLUMNS = {
+    'token': ('pSymbol', 'token', 'tk', 'instrument_token'),
+    'symbol': ('pSymbolName', 'symbol'),
+    'trading_symbol': ('pTrdSymbol', 'trading_symbol', 'ts'),
+    'exchange_segment': ('pExchSeg', 'exchange_segment'),
+    'exchange': ('exchange', 'e'),
+    'name': ('pDesc', 'name', 'description'),
+    'instrument_type': ('pInstType', 'instrument_type', 'series'),
+    'isin': ('pISIN', 'isin'),
+    'lot_size': ('lLotSize', 'lot_size'),
+    'sector': ('sector',)
+}
+
+SEGMENT_EXCHANGES = {
+    'nse_cm': 'NSE',
+    'bse_cm': 'BSE',
+    'nse_fo': 'NFO',
+    'bse_fo': 'BFO',
+    'cde_fo': 'CDS',
+    'mcx_fo': 'MCX'
+}
+
+# Lower rank wins when a symbol is listed on several segments
+SEGMENT_PRIORITY = {'nse_cm': 0, 'bse_cm': 1}
+
+
+class Instrument(namedtuple('Instrument', [
+    'token', 'symbol', 'trading_symbol', 'exchange', 'exchange_segment',
+    'name', 'instrument_type', 'isin', 'lot_size', 'sector'
+])):
+    """One scrip master row"""
+    __slots__ = ()
+
+    @property
+    def is_etf(self):
+        """ETFs are flagged by instrument type or recognised by name"""
+        return (self.instrument_type == 'ETF' or 'ETF' in self.name.upper()
+                or self.symbol.endswith('BEES'))
+
+    def to_dict(self):
+        """Search result dict, carrying both Neo ('tk'/'ts'/'e') and long key names"""
+        return {
+            'tk': self.token,
+            'ts': self.trading_symbol,
+            'e': self.exchange,
+            'token': self.token,
+            'symbol': self.symbol,
+            'trading_symbol': self.trading_symbol,
+            'exchange': self.exchange,
+            'exchange_segment': self.exchange_segment,
+            'description': self.name,
+            'name': self.name,
+            'instrument_type': self.instrument_type,
+            'sector': self.sector,
+            'lot_size': self.lot_size
+        }
+
+
+def normalize_symbol(symbol):
+    """Upper-case a symbol and strip the series suffix (RELIANCE-EQ -> RELIANCE)"""
+    symbol = (symbol or '').strip().upper()
+    for suffix in ('-EQ', '-BE', '-BZ'):
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)]
+    return symbol
+
+
+def trigrams(text):
+    """Set of character trigrams of the alphanumeric characters in text"""
+    text = ''.join(ch for ch in text.upper() if ch.isalnum())
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class InstrumentMasterError(Exception):
+    """No usable scrip master could be loaded or downloaded"""
+
+
+class InstrumentIndex:
+    """Immutable set of lookup tables built from one scrip master load"""
+
+    def __init__(self, instruments):
+        self.instruments = sorted(
+            instruments,
+            key=lambda inst: (SEGMENT_PRIORITY.get(inst.exchange_segment, 9), len(inst.symbol), inst.symbol)
+        )
+        self.by_symbol = {}
+        self.by_trading_symbol = {}
+        self.by_token = {}
+        self.by_segment_token = {}
+        self.prefixes = defaultdict(list)
+        self.trigrams = defaultdict(list)
+
+        for position, instrument in enumerate(self.instruments):
+            # Sorted by segment priority, so the first entry per key is the preferred listing
+            self.by_symbol.setdefault(instrument.symbol, instrument)
+            self.by_trading_symbol.setdefault(instrument.trading_symbol.upper(), instrument)
+            self.by_token.setdefault(instrument.token, instrument)
+            self.by_segment_token[(instrument.exchange_segment, instrument.token)] = instrument
+
+            for length in range(1, min(len(instrument.symbol), PREFIX_INDEX_DEPTH) + 1):
+                self.prefixes[instrument.symbol[:length]].append(position)
+
+            for gram in trigrams(instrument.symbol) | trigrams(instrument.name):
+                self.trigrams[gram].append(position)
+
+
+class InstrumentMaster:
+    """Loads the scrip master and answers token / symbol lookups without network calls"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._index = InstrumentIndex([])
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self.source = None
+        self.last_error = None
+        self._retry_at = 0
+        self.generation = 0  # Bumped on every successful load so derived indexes can rebuild
+
+    def _resolve_columns(self, fieldnames):
+        """Map each field to the header present in the CSV"""
+        present = {name.strip(): name for name in fieldnames or []}
+        columns = {}
+        for field, aliases in MASTER_COLUMNS.items():
+            for alias in aliases:
+                if alias in present:
+                    columns[field] = present[alias]
+                    break
+        return columns
+
+    def _parse_row(self, row, columns):
+        """Build an Instrument from a CSV row, or None when it lacks a token or symbol"""
+        def value(field):
+            column = columns.get(field)
+            return (row.get(column) or '').strip() if column else ''
+
+        token = value('token')
+        trading_symbol = value('trading_symbol')
+        symbol = normalize_symbol(value('symbol') or trading_symbol)
+        if not token or not symbol:
+            return None
+
+        segment = value('exchange_segment').lower()
+        exchange = value('exchange').upper() or SEGMENT_EXCHANGES.get(segment, 'NSE')
+        if not segment:
+            segment = f"{exchange.lower()}_cm"
+
+        try:
+            lot_size = int(float(value('lot_size') or 1))
+        except ValueError:
+            lot_size = 1
+
+        return Instrument(
+            token=token,
+            symbol=symbol,
+            trading_symbol=trading_symbol or symbol,
+            exchange=exchange,
+            exchange_segment=segment,
+            name=value('name') or symbol,
+            instrument_type=value('instrument_type').upper(),
+            isin=value('isin'),
+            lot_size=lot_size,
+            sector=value('sector')
+        )
+
+    def download(self, client=None, destination=None):
+        """Fetch the scrip master CSV through the Neo scrip-master API into the local cache"""
+        import requests
+
+        if client is None:
+            from client_registry import get_stored_session_client
+            client = get_stored_session_client()
+        if client is None:
+            raise InstrumentMasterError("no broker session available to download the scrip master")
+
+        # The API returns the CSV URL for one segment, or every segment's URL under filesPaths
+        response = client.scrip_master(exchange_segment=INSTRUMENT_MASTER_SEGMENT)
+        if isinstance(response, str):
+            url = response
+        else:
+            url = next((path for path in (response or {}).get('filesPaths', []) if INSTRUMENT_MASTER_SEGMENT in path), None)
+        if not url:
+            raise InstrumentMasterError(f"scrip master API returned no {INSTRUMENT_MASTER_SEGMENT} file: {response}")
+
+        destination = destination or INSTRUMENT_MASTER_CACHE
+        download = requests.get(url, timeout=60)
+        download.raise_for_status()
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        partial = destination + '.part'
+        with open(partial, 'wb') as f:
+            f.write(download.content)
+        os.replace(partial, destination)
+        logger.info(f"📥 Downloaded {INSTRUMENT_MASTER_SEGMENT} scrip master to {destination}")
+        return destination
+
+    def _default_path(self):
+        """Configured master, else the downloaded one (refreshed once it is older than INSTRUMENT_MASTER_MAX_AGE)"""
+        if INSTRUMENT_MASTER_PATH:
+            return INSTRUMENT_MASTER_PATH
+
+        cache = INSTRUMENT_MASTER_CACHE
+        if os.path.exists(cache) and time.time() - os.path.getmtime(cache) < INSTRUMENT_MASTER_MAX_AGE:
+            return cache
+        try:
+            return self.download(destination=cache)
+        except Exception as e:
+            if os.path.exists(cache):
+                logger.warning(f"⚠️ Scrip master download failed ({str(e)}), using the previous download")
+                return cache
+            raise InstrumentMasterError(
+                f"set INSTRUMENT_MASTER_PATH or log in so the scrip master can be downloaded ({str(e)})"
+            )
+
+    def load(self, path=None):
+        """Load a scrip master CSV and swap in freshly built indexes; returns 0 (and logs an error) on failure"""
+        try:
+            path = path or self.path or self._default_path()
+            instruments = []
+            with open(path, newline='', encoding='utf-8-sig') as csv_file:
+                reader = csv.DictReader(csv_file)
+                columns = self._resolve_columns(reader.fieldnames)
+                for row in reader:
+                    instrument = self._parse_row(row, columns)
+                    if instrument:
+                        instruments.append(instrument)
+            if not instruments:
+                raise InstrumentMasterError(f"no instruments in {path}")
+
+            index = InstrumentIndex(instruments)
+            with self._lock:
+                self._index = index
+                self.loaded = True
+                self.source = path
+                self.last_error = None
+                self.generation += 1
+
+            logger.info(f"📇 Loaded {len(instruments)} instruments from {path}")
+            return len(instruments)
+
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"🚨 No scrip master loaded - symbol and token lookups will find nothing: {str(e)}")
+            return 0
+
+    def ensure_loaded(self):
+        """Load the master on first use; after a failure, retry only once INSTRUMENT_MASTER_RETRY_SECONDS have passed"""
+        if not self.loaded and time.monotonic() >= self._retry_at:
+            with self._load_lock:
+                if not self.loaded and time.monotonic() >= self._retry_at:
+                    if not self.load():
+                        self._retry_at = time.monotonic() + INSTRUMENT_MASTER_RETRY_SECONDS
+        return self._index
+
+    def get_by_symbol(self, symbol):
+        """Preferred listing for a symbol (NSE cash first)"""
+        return self.ensure_loaded().by_symbol.get(normalize_symbol(symbol))
+
+    def get_by_trading_symbol(self, trading_symbol):
+        """Instrument for an exact trading symbol such as NIFTYBEES-EQ"""
+        return self.ensure_loaded().by_trading_symbol.get((trading_symbol or '').strip().upper())
+
+    def get_by_token(self, token, exchange_segment=None):
+        """Instrument for a token, optionally scoped to an exchange segment"""
+        index = self.ensure_loaded()
+        if exchange_segment:
+            return index.by_segment_token.get((exchange_segment.lower(), str(token)))
+        return index.by_token.get(str(token))
+
+    def resolve(self, symbol):
+        """Resolve a symbol or trading symbol to its instrument"""
+        return self.get_by_symbol(symbol) or self.get_by_trading_symbol(symbol)
+
+    def resolve_many(self, symbols):
+        """Resolve many symbols at once, keyed by the symbol as given"""
+        instruments = {}
+        for symbol in dict.fromkeys(symbols):
+            instrument = self.resolve(symbol)
+            if instrument:
+                instruments[symbol] = instrument
+        return instruments
+
+    def prefix_matches(self, prefix, limit=None):
+        """Instruments whose symbol starts with prefix, shortest symbols first"""
+        index = self.ensure_loaded()
+        prefix = normalize_symbol(prefix)
+        if not prefix:
+            return []
+
+        positions = index.prefixes.get(prefix[:PREFIX_INDEX_DEPTH], [])
+        matches = [index.instruments[position] for position in positions]
+        if len(prefix) > PREFIX_INDEX_DEPTH:
+            matches = [instrument for instrument in matches if instrument.symbol.startswith(prefix)]
+        return matches[:limit] if limit else matches
+
+    def trigram_candidates(self, query, min_shared=1):
+        """Instruments sharing trigrams with query, as (instrument, shared_count) best first"""
+        index = self.ensure_loaded()
+        counts = defaultdict(int)
+        for gram in trigrams(query):
+            for position in index.trigrams.get(gram, ()):
+                counts[position] += 1
+
+        ranked = sorted(
+            (item for item in counts.items() if item[1] >= min_shared),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [(index.instruments[position], shared) for position, shared in ranked]
+
+    def all_instruments(self):
+        """Every loaded instrument, preferred listings first"""
+        return list(self.ensure_loaded().instruments)
+
+    def get_stats(self):
+        """Get instrument master statistics"""
+        index = self._index
+        return {
+            'loaded': self.loaded,
+            'source': self.source,
+            'last_error': self.last_error,
+            'instruments': len(index.instruments),
+            'symbols': len(index.by_symbol),
+            'tokens': len(index.by_segment_token),
+            'prefixes': len(index.prefixes),
+            'trigrams': len(index.trigrams)
+        }
+
+
+# Global instance
+instrument_master = InstrumentMaster()
+
+
+def resolve_instrument(symbol):
+    """Resolve a symbol to its scrip master instrument"""
+    return instrument_master.resolve(symbol)
+
+
+def resolve_token(symbol):
+    """Resolve a symbol to its instrument token, or None"""
+    instrument = instrument_master.resolve(symbol)
+    return instrument.token if instrument else None
@@ -20,6 +20,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app import db, app
 from models_etf import AdminTradeSignal, RealtimeQuote
 from models import User
+from market_calendar import market_calendar
 from trading_functions import TradingFunctions
 
 class KotakDataCollector:
@@ -27,6 +28,7 @@ class KotakDataCollector:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.scheduler = schedule.Scheduler()
         self.trading_client = None
         self.is_running = False
         
@@ -151,6 +153,10 @@ class KotakDataCollector:
     
     def collect_and_store_data(self):
         """Collect live data and store in admin_trade_signals table"""
+        if not market_calendar.is_open():
+            self.logger.debug(f"Market {market_calendar.phase()}, skipping data collection")
+            return
+
         with app.app_context():
             try:
                 self.logger.info(f"🔄 Starting data collection cycle at {datetime.now()}")
@@ -216,7 +222,7 @@ class KotakDataCollector:
             return
         
         # Schedule data collection every 5 minutes
-        schedule.every(5).minutes.do(self.collect_and_store_data)
+        self.scheduler.every(5).minutes.do(self.collect_and_store_data)
         
         # Run immediately for testing
         self.collect_and_store_data()
@@ -227,7 +233,7 @@ class KotakDataCollector:
         # Run scheduler in background thread
         def run_scheduler():
             while self.is_running:
-                schedule.run_pending()
+                self.scheduler.run_pending()
                 time.sleep(30)  # Check every 30 seconds
         
         scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
@@ -236,7 +242,7 @@ class KotakDataCollector:
     def stop_scheduler(self):
         """Stop the data collection scheduler"""
         self.is_running = False
-        schedule.clear()
+        self.scheduler.clear()
         self.logger.info("🛑 Stopped Kotak data collection scheduler")
 
 # Global instance
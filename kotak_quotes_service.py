@@ -6,6 +6,8 @@ import logging
 from datetime import datetime, timedelta
 from app import app, db
 from models_etf import KotakNeoQuote, AdminTradeSignal
+from portfolio_engine import compute_position
+from quote_cache import latest_quote_cache, upsert_latest_quotes, QuoteRecord
 from trading_functions import TradingFunctions
 import json
 
@@ -39,11 +41,11 @@ class KotakQuotesService:
             
             # Get comprehensive quote data
             quotes = self.trading_functions.get_quotes([token])
-            if not quotes or not quotes.get('data'):
+            if not quotes or quotes[0]['ltp'] <= 0:
                 logger.warning(f"No quote data received for {symbol}")
                 return None
             
-            quote_data = quotes['data'][0] if isinstance(quotes['data'], list) else quotes['data']
+            quote_data = quotes[0]
             
             # Parse comprehensive quote data according to Kotak Neo API structure
             return {
@@ -53,7 +55,7 @@ class KotakQuotesService:
                 'exchange': exchange,
                 'segment': quote_data.get('segment', 'EQ'),
                 'instrument_type': quote_data.get('instrument_type', 'EQ'),
-                'ltp': float(quote_data.get('ltp', quote_data.get('last_price', 100.0))),
+                'ltp': quote_data['ltp'],
                 'open_price': float(quote_data.get('open_price', quote_data.get('open', 0))),
                 'high_price': float(quote_data.get('high_price', quote_data.get('high', 0))),
                 'low_price': float(quote_data.get('low_price', quote_data.get('low', 0))),
@@ -85,6 +87,7 @@ class KotakQuotesService:
         """Update KotakNeoQuote table with latest market data"""
         try:
             updated_count = 0
+            cached_records = []
             
             for symbol in self.etf_symbols:
                 quote_data = self.fetch_comprehensive_quote_data(symbol)
@@ -104,15 +107,19 @@ class KotakQuotesService:
                         if hasattr(existing_quote, key):
                             setattr(existing_quote, key, value)
                     existing_quote.timestamp = datetime.now()
+                    cached_records.append(QuoteRecord.from_kotak_quote(existing_quote))
                 else:
                     # Create new quote
                     new_quote = KotakNeoQuote(**quote_data)
                     db.session.add(new_quote)
+                    cached_records.append(QuoteRecord.from_kotak_quote(new_quote))
                 
                 updated_count += 1
                 logger.info(f"Updated comprehensive quote for {symbol}: ₹{quote_data['ltp']}")
             
+            upsert_latest_quotes(cached_records)
             db.session.commit()
+            latest_quote_cache.put_many(cached_records)
             logger.info(f"Successfully updated {updated_count} comprehensive quotes")
             
             # Also update admin trade signals with latest prices
@@ -145,13 +152,15 @@ class KotakQuotesService:
                     
                     # Calculate P&L if entry price exists
                     if signal.entry_price:
-                        pnl_amount = (float(latest_quote.ltp) - float(signal.entry_price)) * signal.quantity
-                        pnl_percentage = ((float(latest_quote.ltp) - float(signal.entry_price)) / float(signal.entry_price)) * 100
+                        invested, current_value, pnl_amount, pnl_percentage = compute_position(
+                            float(signal.entry_price), float(latest_quote.ltp), signal.quantity,
+                            signal.signal_type, float(signal.investment_amount or 0)
+                        )
                         
                         signal.pnl = pnl_amount
                         signal.pnl_percentage = pnl_percentage
-                        signal.current_value = float(latest_quote.ltp) * signal.quantity
-                        signal.investment_amount = float(signal.entry_price) * signal.quantity
+                        signal.current_value = current_value
+                        signal.investment_amount = invested
             
             db.session.commit()
             logger.info(f"Updated {len(active_signals)} admin signals with latest quotes")
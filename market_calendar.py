@@ -0,0 +1,208 @@
+"""
+Market Calendar
+NSE trading sessions, pre-open, holidays and muting windows, and the quote refresh cadence they imply
+"""
+
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# NSE equity sessions (IST)
+PRE_OPEN_START = time(9, 0)
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+POST_CLOSE_END = time(16, 0)
+
+# Refresh cadence per phase, in seconds
+QUOTE_REFRESH_SECONDS = float(os.environ.get('QUOTE_REFRESH_SECONDS', '60'))
+QUOTE_PRE_OPEN_REFRESH_SECONDS = float(os.environ.get('QUOTE_PRE_OPEN_REFRESH_SECONDS', '300'))
+QUOTE_POST_CLOSE_REFRESH_SECONDS = float(os.environ.get('QUOTE_POST_CLOSE_REFRESH_SECONDS', '900'))
+
+# Longest a closed-market sleep lasts before the calendar is consulted again
+QUOTE_MAX_SLEEP_SECONDS = float(os.environ.get('QUOTE_MAX_SLEEP_SECONDS', '3600'))
+
+# NSE trading holidays for equities; extend with NSE_HOLIDAYS or NSE_HOLIDAYS_FILE as exchange circulars are published
+NSE_HOLIDAYS = {
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+    date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+    date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+    date(2025, 11, 5), date(2025, 12, 25),
+    date(2026, 1, 15), date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26),
+    date(2026, 3, 31), date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1),
+    date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2),
+    date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25)
+}
+
+# Phases
+PHASE_PRE_OPEN = 'PRE_OPEN'
+PHASE_OPEN = 'OPEN'
+PHASE_POST_CLOSE = 'POST_CLOSE'
+PHASE_CLOSED = 'CLOSED'
+PHASE_HOLIDAY = 'HOLIDAY'
+PHASE_WEEKEND = 'WEEKEND'
+PHASE_MUTED = 'MUTED'
+
+# Phases in which quotes are refreshed at all
+ACTIVE_PHASES = (PHASE_PRE_OPEN, PHASE_OPEN, PHASE_POST_CLOSE)
+
+
+def parse_dates(text):
+    """Comma or newline separated YYYY-MM-DD dates; malformed entries are skipped"""
+    dates = set()
+    for value in text.replace('\n', ',').split(','):
+        value = value.split('#')[0].strip()
+        if not value:
+            continue
+        try:
+            dates.add(datetime.strptime(value, '%Y-%m-%d').date())
+        except ValueError:
+            logger.warning(f"Ignoring malformed holiday date: {value}")
+    return dates
+
+
+def parse_windows(text):
+    """'HH:MM-HH:MM' windows separated by commas, as (start, end) times"""
+    windows = []
+    for value in text.split(','):
+        value = value.strip()
+        if not value:
+            continue
+        try:
+            start, end = (datetime.strptime(part.strip(), '%H:%M').time() for part in value.split('-'))
+            windows.append((start, end))
+        except ValueError:
+            logger.warning(f"Ignoring malformed muting window: {value}")
+    return windows
+
+
+def load_holidays():
+    """Built-in holidays plus NSE_HOLIDAYS and the NSE_HOLIDAYS_FILE contents"""
+    holidays = set(NSE_HOLIDAYS)
+    holidays.update(parse_dates(os.environ.get('NSE_HOLIDAYS', '')))
+    holidays_file = os.environ.get('NSE_HOLIDAYS_FILE')
+    if holidays_file:
+        try:
+            with open(holidays_file, 'r') as f:
+                holidays.update(parse_dates(f.read()))
+        except OSError as e:
+            logger.warning(f"Could not read holiday file {holidays_file}: {str(e)}")
+    return holidays
+
+
+class MarketCalendar:
+    """Answers 'what phase is NSE in' and 'when should quotes next be refreshed'"""
+
+    def __init__(self, holidays=None, muted_windows=None):
+        self.holidays = load_holidays() if holidays is None else set(holidays)
+        self.muted_windows = parse_windows(os.environ.get('QUOTE_MUTE_WINDOWS', '')) if muted_windows is None else list(muted_windows)
+        self.checked_years = set()
+
+    def local(self, now=None):
+        """now (or the current time) in IST"""
+        if now is None:
+            return datetime.now(IST)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        return now.astimezone(IST)
+
+    def check_holidays(self, year):
+        """Log an error, once per year, when no holidays are known for that year"""
+        if year in self.checked_years:
+            return
+        self.checked_years.add(year)
+        if not any(day.year == year for day in self.holidays):
+            logger.error(f"No NSE holidays loaded for {year}: exchange holidays will be treated as trading days. "
+                         f"Add them to NSE_HOLIDAYS or NSE_HOLIDAYS_FILE")
+
+    def is_trading_day(self, day):
+        """Weekday that is not an exchange holiday"""
+        return day.weekday() < 5 and day not in self.holidays
+
+    def is_muted(self, now=None):
+        """Inside a configured muting window (e.g. broker maintenance)"""
+        clock = self.local(now).time()
+        return any(start <= clock < end for start, end in self.muted_windows)
+
+    def phase(self, now=None):
+        """Current market phase"""
+        now = self.local(now)
+        self.check_holidays(now.year)
+        if now.weekday() >= 5:
+            return PHASE_WEEKEND
+        if now.date() in self.holidays:
+            return PHASE_HOLIDAY
+        if self.is_muted(now):
+            return PHASE_MUTED
+
+        clock = now.time()
+        if PRE_OPEN_START <= clock < MARKET_OPEN:
+            return PHASE_PRE_OPEN
+        if MARKET_OPEN <= clock < MARKET_CLOSE:
+            return PHASE_OPEN
+        if MARKET_CLOSE <= clock < POST_CLOSE_END:
+            return PHASE_POST_CLOSE
+        return PHASE_CLOSED
+
+    def is_open(self, now=None):
+        """True during the regular session"""
+        return self.phase(now) == PHASE_OPEN
+
+    def should_refresh(self, now=None):
+        """True while quotes are worth fetching: pre-open, regular session and the closing-price window"""
+        return self.phase(now) in ACTIVE_PHASES
+
+    def next_session_start(self, now=None):
+        """Start of the next pre-open on a trading day, in IST"""
+        now = self.local(now)
+        day = now.date()
+        if now.time() >= PRE_OPEN_START:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, PRE_OPEN_START, tzinfo=IST)
+
+    def refresh_interval(self, now=None):
+        """Seconds until the next refresh: fast in session, slower around it, asleep until the next session otherwise"""
+        now = self.local(now)
+        phase = self.phase(now)
+        if phase == PHASE_OPEN:
+            interval = QUOTE_REFRESH_SECONDS
+        elif phase == PHASE_PRE_OPEN:
+            interval = QUOTE_PRE_OPEN_REFRESH_SECONDS
+        elif phase == PHASE_POST_CLOSE:
+            interval = QUOTE_POST_CLOSE_REFRESH_SECONDS
+        elif phase == PHASE_MUTED:
+            clock = now.time()
+            end = min(end for start, end in self.muted_windows if start <= clock < end)
+            interval = (datetime.combine(now.date(), end, tzinfo=IST) - now).total_seconds()
+        else:
+            interval = (self.next_session_start(now) - now).total_seconds()
+
+        # Never sleep through a phase change (e.g. pre-open into the opening bell)
+        boundaries = [MARKET_OPEN, MARKET_CLOSE, POST_CLOSE_END] + [start for start, end in self.muted_windows]
+        upcoming = [datetime.combine(now.date(), boundary, tzinfo=IST) for boundary in boundaries if boundary > now.time()]
+        if upcoming:
+            interval = min(interval, (min(upcoming) - now).total_seconds())
+        return max(1.0, min(interval, QUOTE_MAX_SLEEP_SECONDS))
+
+    def get_status(self, now=None):
+        """Phase and cadence snapshot for status endpoints"""
+        now = self.local(now)
+        return {
+            'phase': self.phase(now),
+            'is_open': self.is_open(now),
+            'refresh_interval_seconds': round(self.refresh_interval(now), 1),
+            'next_session_start': self.next_session_start(now).isoformat(),
+            'holidays_loaded': len(self.holidays),
+            'holidays_this_year': sum(1 for day in self.holidays if day.year == now.year),
+            'muted_windows': [f"{start:%H:%M}-{end:%H:%M}" for start, end in self.muted_windows]
+        }
+
+
+# Global instance
+market_calendar = MarketCalendar()
+
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime, timedelta
+from portfolio_engine import compute_position
 import logging
 
 class AdminTradeSignal(db.Model):
@@ -51,6 +52,16 @@ class AdminTradeSignal(db.Model):
     admin_user = db.relationship('User', foreign_keys=[admin_user_id], backref='sent_signals')
     target_user = db.relationship('User', foreign_keys=[target_user_id], backref='received_signals')
 
+    # Keyset pagination indexes: one per sort key, id as tie-breaker (see signal_pagination.SORT_KEYS)
+    __table_args__ = (
+        db.Index('ix_admin_trade_signals_status_created', status, created_at, id),
+        db.Index('ix_admin_trade_signals_user_status_created', target_user_id, status, created_at, id),
+        db.Index('ix_admin_trade_signals_status_symbol', status, symbol, id),
+        db.Index('ix_admin_trade_signals_status_pnl', status, db.func.coalesce(pnl, 0), id),
+        db.Index('ix_admin_trade_signals_status_pnl_pct', status, db.func.coalesce(pnl_percentage, 0), id),
+        db.Index('ix_admin_trade_signals_status_value', status, db.func.coalesce(current_value, 0), id),
+    )
+
     def __repr__(self):
         return f'<AdminTradeSignal {self.symbol} - {self.signal_type}>'
 
@@ -141,6 +152,11 @@ class KotakNeoQuote(db.Model):
     lot_size = db.Column(db.Integer, nullable=True)
     tick_size = db.Column(db.Numeric(8, 4), nullable=True)
 
+    # Readers filter by symbol and take the newest rows first
+    __table_args__ = (
+        db.Index('ix_kotak_neo_quotes_symbol_timestamp', symbol, timestamp.desc()),
+    )
+
     def __repr__(self):
         return f'<KotakNeoQuote {self.symbol} @ ₹{self.ltp}>'
 
@@ -213,6 +229,11 @@ class RealtimeQuote(db.Model):
     data_source = db.Column(db.String(50), default='KOTAK_NEO')
     fetch_status = db.Column(db.String(20), default='SUCCESS')  # SUCCESS, ERROR, STALE
 
+    # Readers filter by symbol and take the newest rows first
+    __table_args__ = (
+        db.Index('ix_realtime_quotes_symbol_timestamp', symbol, timestamp.desc()),
+    )
+
     def __repr__(self):
         return f'<RealtimeQuote {self.symbol} @ {self.current_price}>'
 
@@ -238,6 +259,40 @@ class RealtimeQuote(db.Model):
             'fetch_status': self.fetch_status
         }
 
+class LatestQuote(db.Model):
+    """Latest quote per (symbol, exchange), upserted by the quote schedulers on every write"""
+    __tablename__ = 'latest_quotes'
+
+    symbol = db.Column(db.String(50), primary_key=True)
+    exchange = db.Column(db.String(20), primary_key=True, default='NSE')
+    trading_symbol = db.Column(db.String(100), nullable=True)
+    token = db.Column(db.String(50), nullable=True)
+
+    # Market Data
+    current_price = db.Column(db.Numeric(12, 4), nullable=False)
+    open_price = db.Column(db.Numeric(12, 4), nullable=True)
+    high_price = db.Column(db.Numeric(12, 4), nullable=True)
+    low_price = db.Column(db.Numeric(12, 4), nullable=True)
+    close_price = db.Column(db.Numeric(12, 4), nullable=True)
+    change_amount = db.Column(db.Numeric(12, 4), nullable=True)
+    change_percent = db.Column(db.Numeric(8, 4), nullable=True)
+    volume = db.Column(db.BigInteger, nullable=True)
+
+    # Bid/Ask and 52-week Data (Kotak Neo quotes only)
+    bid_price = db.Column(db.Numeric(12, 4), nullable=True)
+    ask_price = db.Column(db.Numeric(12, 4), nullable=True)
+    week_52_high = db.Column(db.Numeric(12, 4), nullable=True)
+    week_52_low = db.Column(db.Numeric(12, 4), nullable=True)
+
+    # Status and Timestamps
+    market_status = db.Column(db.String(20), nullable=True)
+    data_source = db.Column(db.String(50), nullable=False)  # KOTAK_NEO_API, REALTIME_QUOTES
+    timestamp = db.Column(db.DateTime, nullable=True)  # Quote time from the source table
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LatestQuote {self.symbol}:{self.exchange} @ {self.current_price}>'
+
 class UserNotification(db.Model):
     __tablename__ = 'user_notifications'
 
@@ -338,13 +393,9 @@ class UserDeal(db.Model):
     def calculate_pnl(self):
         """Calculate current P&L"""
         if self.current_price and self.entry_price:
-            if self.position_type == 'LONG':
-                self.pnl_amount = (self.current_price - self.entry_price) * self.quantity
-            else:  # SHORT
-                self.pnl_amount = (self.entry_price - self.current_price) * self.quantity
-
-            self.pnl_percent = (self.pnl_amount / self.invested_amount) * 100
-            self.current_value = self.invested_amount + self.pnl_amount
+            _, self.current_value, self.pnl_amount, self.pnl_percent = compute_position(
+                self.entry_price, self.current_price, self.quantity, self.position_type, self.invested_amount
+            )
 
     def to_dict(self):
         return {
@@ -375,6 +426,57 @@ class UserDeal(db.Model):
             'last_price_update': self.last_price_update.isoformat() if self.last_price_update else None
         }
 
+class UserPortfolioSummary(db.Model):
+    """Per-user deal aggregates, kept current by portfolio_summary on every deal write"""
+    __tablename__ = 'user_portfolio_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+
+    # Deal Counts
+    total_deals = db.Column(db.Integer, nullable=False, default=0)
+    active_deals = db.Column(db.Integer, nullable=False, default=0)
+    closed_deals = db.Column(db.Integer, nullable=False, default=0)
+    winning_deals = db.Column(db.Integer, nullable=False, default=0)
+    losing_deals = db.Column(db.Integer, nullable=False, default=0)
+    long_positions = db.Column(db.Integer, nullable=False, default=0)
+    short_positions = db.Column(db.Integer, nullable=False, default=0)
+
+    # Amounts over all deals
+    total_invested = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_pnl = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    # Amounts over active deals only
+    active_invested = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    active_current_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    active_pnl = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    active_winning = db.Column(db.Integer, nullable=False, default=0)
+    active_losing = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserPortfolioSummary user={self.user_id} deals={self.total_deals}>'
+
+    def to_dict(self):
+        return {
+            'total_deals': self.total_deals,
+            'active_deals': self.active_deals,
+            'closed_deals': self.closed_deals,
+            'total_invested': float(self.total_invested or 0),
+            'total_pnl': float(self.total_pnl or 0),
+            'winning_deals': self.winning_deals,
+            'losing_deals': self.losing_deals,
+            'long_positions': self.long_positions,
+            'short_positions': self.short_positions,
+            'success_rate': (self.winning_deals / self.total_deals) * 100 if self.total_deals else 0,
+            'active_invested': float(self.active_invested or 0),
+            'active_current_value': float(self.active_current_value or 0),
+            'active_pnl': float(self.active_pnl or 0),
+            'active_winning': self.active_winning,
+            'active_losing': self.active_losing,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 class ETFSignalTrade(db.Model):
     """ETF Signal Trade Model for tracking ETF trading signals and performance"""
     __tablename__ = 'etf_signal_trades'
@@ -434,15 +536,9 @@ class ETFSignalTrade(db.Model):
     def calculate_pnl(self):
         """Calculate current P&L based on current price"""
         if self.current_price and self.entry_price and self.quantity:
-            if self.position_type == 'LONG':
-                self.pnl_amount = (self.current_price - self.entry_price) * self.quantity
-            else:  # SHORT
-                self.pnl_amount = (self.entry_price - self.current_price) * self.quantity
-
-            if self.invested_amount and self.invested_amount > 0:
-                self.pnl_percent = (self.pnl_amount / self.invested_amount) * 100
-            
-            self.current_value = self.invested_amount + self.pnl_amount if self.invested_amount else 0
+            _, self.current_value, self.pnl_amount, self.pnl_percent = compute_position(
+                self.entry_price, self.current_price, self.quantity, self.position_type, self.invested_amount
+            )
             self.change_pct = f"{self.pnl_percent:.2f}%" if self.pnl_percent else "0.00%"
 
     def to_dict(self):
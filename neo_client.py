@@ -1,5 +1,7 @@
 import logging
 import os
+from broker_http import neo_api
+from client_registry import client_registry, token_fingerprint
 
 # Critical: Preload libraries before any pandas/numpy operations
 import ctypes
@@ -15,7 +17,7 @@ class NeoClient:
     def initialize_client_with_tokens(self, access_token, session_token, sid):
         """Initialize Neo client with existing tokens"""
         try:
-            from neo_api_client import NeoAPI
+            NeoAPI = neo_api()
             
             client = NeoAPI(
                 consumer_key=os.environ.get('KOTAK_CONSUMER_KEY'),
@@ -40,7 +42,7 @@ class NeoClient:
     def initialize_neo_client(self, ucc):
         """Initialize the Kotak Neo API client - following Jupyter notebook implementation"""
         try:
-            from neo_api_client import NeoAPI
+            NeoAPI = neo_api()
             
             # Get credentials from environment or defaults
             consumer_key = os.environ.get('KOTAK_CONSUMER_KEY', '4OKP7bOfI5ozzCB1EI4a6DOIyJsa')
@@ -68,9 +70,19 @@ class NeoClient:
             return None
     
     def initialize_client_with_tokens(self, access_token, session_token, sid=None):
-        """Initialize the Kotak Neo API client with existing tokens"""
+        """Initialize the Kotak Neo API client with existing tokens, reusing a registered client"""
+        # Same token set -> same client object, so its HTTP connections are not rebuilt per call
+        fingerprint = token_fingerprint(access_token, session_token, sid)
+        return client_registry.get_or_create(
+            f"tokens:{fingerprint}",
+            fingerprint,
+            lambda: self._create_client_with_tokens(access_token, session_token, sid)
+        )
+    
+    def _create_client_with_tokens(self, access_token, session_token, sid=None):
+        """Build a new Kotak Neo API client from existing tokens"""
         try:
-            from neo_api_client import NeoAPI
+            NeoAPI = neo_api()
             
             # Use credentials from environment
             consumer_key = os.environ.get('KOTAK_CONSUMER_KEY', '4OKP7bOfI5ozzCB1EI4a6DOIyJsa')
@@ -267,6 +279,7 @@ class NeoClient:
                 )
             
             # Fallback to traditional initialization
+            NeoAPI = neo_api()
             consumer_key = credentials.get('consumer_key', os.environ.get('KOTAK_CONSUMER_KEY', '4OKP7bOfI5ozzCB1EI4a6DOIyJsa'))
             consumer_secret = credentials.get('consumer_secret', os.environ.get('KOTAK_CONSUMER_SECRET', 'cnLm3ZSJVLCOPiwTk4xAJw5G8v0a'))
             neo_fin_key = credentials.get('neo_fin_key', os.environ.get('KOTAK_NEO_FIN_KEY', 'neotradeapi'))
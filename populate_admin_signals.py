@@ -14,6 +14,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app import app, db
 from models_etf import AdminTradeSignal
 from models import User
+from signal_csv_importer import SignalCSVImporter
 
 def create_admin_user():
     """Create admin user if not exists"""
@@ -53,11 +54,6 @@ def populate_admin_signals():
     admin_user = create_admin_user()
     target_user = create_target_user()
     
-    # Clear existing signals
-    AdminTradeSignal.query.delete()
-    db.session.commit()
-    print("✓ Cleared existing signals")
-    
     # Sample ETF signals data
     etf_signals = [
         {
@@ -172,36 +168,46 @@ def populate_admin_signals():
         }
     ]
     
-    # Create signals
-    for signal_data in etf_signals:
-        signal = AdminTradeSignal(
-            admin_user_id=admin_user.id,
-            target_user_id=target_user.id,
-            symbol=signal_data['symbol'],
-            trading_symbol=f"{signal_data['symbol']}-EQ",
-            signal_type=signal_data['signal_type'],
-            entry_price=signal_data['entry_price'],
-            target_price=signal_data['target_price'],
-            stop_loss=signal_data['stop_loss'],
-            quantity=signal_data['quantity'],
-            signal_title=signal_data['signal_title'],
-            signal_description=signal_data['signal_description'],
-            priority=signal_data['priority'],
-            status='ACTIVE',
-            created_at=datetime.now() - timedelta(days=1),  # Created yesterday
-            signal_date=datetime.now().date(),
-            expiry_date=(datetime.now() + timedelta(days=30)).date(),
+    # Build all rows, then stage and merge them in one pass (replacing the existing signals)
+    now = datetime.now()
+    rows = [
+        {
+            'admin_user_id': admin_user.id,
+            'target_user_id': target_user.id,
+            'symbol': signal_data['symbol'],
+            'trading_symbol': f"{signal_data['symbol']}-EQ",
+            'token': None,
+            'exchange': 'NSE',
+            'signal_type': signal_data['signal_type'],
+            'entry_price': signal_data['entry_price'],
+            'target_price': signal_data['target_price'],
+            'stop_loss': signal_data['stop_loss'],
+            'quantity': signal_data['quantity'],
+            'signal_title': signal_data['signal_title'],
+            'signal_description': signal_data['signal_description'],
+            'priority': signal_data['priority'],
+            'status': 'ACTIVE',
+            'created_at': now - timedelta(days=1),  # Created yesterday
+            'updated_at': now,
+            'signal_date': now.date(),
+            'expiry_date': (now + timedelta(days=30)).date(),
             # Calculate initial values
-            investment_amount=signal_data['entry_price'] * signal_data['quantity'],
-            current_price=signal_data['entry_price'],  # Will be updated by Kotak quotes
-            current_value=signal_data['entry_price'] * signal_data['quantity'],
-            pnl=Decimal('0.00'),
-            pnl_percentage=Decimal('0.00')
-        )
-        db.session.add(signal)
+            'current_price': signal_data['entry_price'],  # Will be updated by Kotak quotes
+            'change_percent': Decimal('0.00'),
+            'investment_amount': signal_data['entry_price'] * signal_data['quantity'],
+            'current_value': signal_data['entry_price'] * signal_data['quantity'],
+            'pnl': Decimal('0.00'),
+            'pnl_percentage': Decimal('0.00')
+        }
+        for signal_data in etf_signals
+    ]
     
-    db.session.commit()
-    print(f"✓ Created {len(etf_signals)} ETF signals in admin_trade_signals table")
+    # Clear existing signals, then load the new ones
+    AdminTradeSignal.query.delete()
+    importer = SignalCSVImporter(admin_user_id=admin_user.id, target_user_id=target_user.id)
+    report = importer.import_rows(rows)
+    print("✓ Cleared existing signals")
+    print(f"✓ Created {report.inserted} ETF signals in admin_trade_signals table")
     
     # Display summary
     total_signals = AdminTradeSignal.query.count()
@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
 from models_etf import KotakNeoQuote, AdminTradeSignal
+from portfolio_engine import compute_position
 from trading_functions import TradingFunctions
 from datetime import datetime
 import logging
@@ -53,15 +54,15 @@ def populate_comprehensive_quotes():
                     exchange = instrument.get('exchange', 'NSE')
                     
                     # Get live quotes
-                    quotes_response = trading_functions.get_quotes([token])
-                    if not quotes_response or not quotes_response.get('data'):
+                    quotes = trading_functions.get_quotes([token])
+                    if not quotes or quotes[0]['ltp'] <= 0:
                         logger.warning(f"No quote data for {symbol}")
                         continue
                     
-                    quote_data = quotes_response['data'][0] if isinstance(quotes_response['data'], list) else quotes_response['data']
+                    quote_data = quotes[0]
                     
                     # Extract comprehensive market data
-                    ltp = float(quote_data.get('ltp', quote_data.get('last_price', 100.0)))
+                    ltp = quote_data['ltp']
                     open_price = float(quote_data.get('open_price', quote_data.get('open', ltp)))
                     high_price = float(quote_data.get('high_price', quote_data.get('high', ltp)))
                     low_price = float(quote_data.get('low_price', quote_data.get('low', ltp)))
@@ -183,13 +184,15 @@ def update_admin_signals_with_quotes():
                 
                 # Calculate P&L if entry price exists
                 if signal.entry_price:
-                    pnl_amount = (float(latest_quote.ltp) - float(signal.entry_price)) * signal.quantity
-                    pnl_percentage = ((float(latest_quote.ltp) - float(signal.entry_price)) / float(signal.entry_price)) * 100
+                    invested, current_value, pnl_amount, pnl_percentage = compute_position(
+                        float(signal.entry_price), float(latest_quote.ltp), signal.quantity,
+                        signal.signal_type, float(signal.investment_amount or 0)
+                    )
                     
                     signal.pnl = pnl_amount
                     signal.pnl_percentage = pnl_percentage
-                    signal.current_value = float(latest_quote.ltp) * signal.quantity
-                    signal.investment_amount = float(signal.entry_price) * signal.quantity
+                    signal.current_value = current_value
+                    signal.investment_amount = invested
         
         db.session.commit()
         logger.info(f"Updated {len(active_signals)} admin signals with comprehensive quotes")
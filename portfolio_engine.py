@@ -0,0 +1,123 @@
+"""
+Portfolio Engine
+Vectorized P&L metrics for signals, trades and deals - one formula shared by every endpoint
+"""
+
+import numpy as np
+
+# Sides that make money when price rises; everything else (SELL, SHORT) is short
+LONG_SIDES = ('BUY', 'LONG')
+
+
+def side_sign(side):
+    """+1 for long sides, -1 for short sides"""
+    return 1 if (side or 'BUY').upper() in LONG_SIDES else -1
+
+
+def compute_position(entry_price, current_price, quantity, side, invested_amount=None):
+    """Metrics for one position as (invested, current_value, pnl, pnl_percent)"""
+    # Same arithmetic as compute_metrics, but Decimal-safe so model columns keep their precision
+    invested = invested_amount if invested_amount else entry_price * quantity
+    pnl = (current_price - entry_price) * quantity * side_sign(side)
+    pnl_percent = pnl / invested * 100 if invested else 0
+    return invested, invested + pnl, pnl, pnl_percent
+
+
+class PortfolioMetrics:
+    """Per-position metric arrays plus portfolio totals from one vectorized pass"""
+
+    def __init__(self, invested, current_value, pnl, pnl_percent, target_value, target_return, sides):
+        self.invested = invested
+        self.current_value = current_value
+        self.pnl = pnl
+        self.pnl_percent = pnl_percent
+        self.target_value = target_value
+        self.target_return = target_return
+        self.sides = sides
+
+        total_investment = float(invested.sum())
+        total_pnl = float(pnl.sum())
+        self.totals = {
+            'positions': int(len(pnl)),
+            'total_investment': total_investment,
+            'total_current_value': float(current_value.sum()),
+            'total_pnl': total_pnl,
+            'total_pnl_percent': total_pnl / total_investment * 100 if total_investment > 0 else 0,
+            'profit_positions': int((pnl > 0).sum()),
+            'loss_positions': int((pnl < 0).sum()),
+            'long_positions': int((sides > 0).sum()),
+            'short_positions': int((sides < 0).sum())
+        }
+
+    def rows(self):
+        """Per-position metrics as plain floats, one dict per input position"""
+        columns = zip(
+            self.invested.tolist(), self.current_value.tolist(), self.pnl.tolist(),
+            self.pnl_percent.tolist(), self.target_value.tolist(), self.target_return.tolist()
+        )
+        return [
+            {
+                'invested': invested,
+                'current_value': current_value,
+                'pnl': pnl,
+                'pnl_percent': pnl_percent,
+                'target_value': target_value,
+                'target_return': target_return
+            }
+            for invested, current_value, pnl, pnl_percent, target_value, target_return in columns
+        ]
+
+
+def compute_metrics(entry, cmp, qty, side, target=None, invested=None):
+    """Derive every position metric and portfolio aggregate from column arrays"""
+    # side holds +1 (long) / -1 (short); target and invested are optional, 0 meaning unset
+    # current_value is invested + pnl and pnl_percent is pnl over invested, the book value the
+    # stored ETF trade / deal columns hold; it equals cmp x qty only for a long bought at entry x qty
+    entry = np.asarray(entry, dtype=np.float64)
+    cmp = np.asarray(cmp, dtype=np.float64)
+    qty = np.asarray(qty, dtype=np.float64)
+    sides = np.asarray(side, dtype=np.float64)
+    target = np.zeros_like(entry) if target is None else np.asarray(target, dtype=np.float64)
+
+    invested_amount = entry * qty
+    if invested is not None:
+        invested = np.asarray(invested, dtype=np.float64)
+        invested_amount = np.where(invested > 0, invested, invested_amount)
+
+    pnl = (cmp - entry) * qty * sides
+    current_value = invested_amount + pnl
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_percent = np.where(invested_amount > 0, pnl / invested_amount * 100, 0.0)
+        target_return = np.where((target > 0) & (entry > 0), (target - entry) / entry * 100, 0.0)
+    target_value = np.where(target > 0, target * qty, 0.0)
+
+    return PortfolioMetrics(invested_amount, current_value, pnl, pnl_percent, target_value, target_return, sides)
+
+
+def compute_signal_metrics(signals, prices=None, side_attr='signal_type'):
+    """Metrics for ORM rows (AdminTradeSignal, ETFSignalTrade, UserDeal), in input order"""
+    # prices maps row id -> current price and overrides the stored current_price
+    prices = prices or {}
+    count = len(signals)
+    entry = np.empty(count)
+    cmp = np.empty(count)
+    qty = np.empty(count)
+    sides = np.empty(count)
+    target = np.empty(count)
+    invested = np.empty(count)
+
+    for i, signal in enumerate(signals):
+        entry_price = float(signal.entry_price or 0)
+        current_price = prices.get(signal.id)
+        if current_price is None:
+            current_price = signal.current_price or entry_price
+        entry[i] = entry_price
+        cmp[i] = float(current_price)
+        qty[i] = signal.quantity or 0
+        sides[i] = side_sign(getattr(signal, side_attr))
+        target[i] = float(signal.target_price or 0)
+        # AdminTradeSignal names it investment_amount, ETFSignalTrade and UserDeal invested_amount
+        invested[i] = float(getattr(signal, 'investment_amount', None) or getattr(signal, 'invested_amount', None) or 0)
+
+    return compute_metrics(entry, cmp, qty, sides, target, invested)
@@ -0,0 +1,279 @@
+"""
+Portfolio Summary Aggregates
+Keeps user_portfolio_summaries in step with user_deals so stats endpoints read a single row
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import bindparam, case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from models_etf import UserDeal, UserPortfolioSummary
+from signal_repricer import invested_sql
+
+logger = logging.getLogger(__name__)
+
+COUNT_FIELDS = (
+    'total_deals', 'active_deals', 'closed_deals', 'winning_deals', 'losing_deals',
+    'long_positions', 'short_positions', 'active_winning', 'active_losing'
+)
+AMOUNT_FIELDS = ('total_invested', 'total_pnl', 'active_invested', 'active_current_value', 'active_pnl')
+SUMMARY_FIELDS = COUNT_FIELDS + AMOUNT_FIELDS
+
+# UserDeal columns that feed the summary
+DEAL_FIELDS = ('user_id', 'status', 'position_type', 'invested_amount', 'current_value', 'pnl_amount')
+
+CENT = Decimal('0.01')
+
+# The one status counted as active - by the flush deltas, the rebuild and the bulk repricer alike.
+# A deal's status is never None here: after_flush sees the column default ('ACTIVE') already applied.
+ACTIVE_STATUS = 'ACTIVE'
+
+
+def _amount(value):
+    """Money value rounded the way the Numeric(12, 2) deal columns store it"""
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def deal_contribution(status, position_type, invested, current_value, pnl):
+    """Summary column values contributed by one deal"""
+    active = status == ACTIVE_STATUS
+    invested, current_value, pnl = _amount(invested), _amount(current_value), _amount(pnl)
+    zero = Decimal('0.00')
+    return {
+        'total_deals': 1,
+        'active_deals': int(active),
+        'closed_deals': int(status == 'CLOSED'),
+        'winning_deals': int(pnl > 0),
+        'losing_deals': int(pnl < 0),
+        'long_positions': int(position_type == 'LONG'),
+        'short_positions': int(position_type == 'SHORT'),
+        'active_winning': int(active and pnl > 0),
+        'active_losing': int(active and pnl < 0),
+        'total_invested': invested,
+        'total_pnl': pnl,
+        'active_invested': invested if active else zero,
+        'active_current_value': current_value if active else zero,
+        'active_pnl': pnl if active else zero
+    }
+
+
+def _deal_values(deal, previous=False):
+    """Summary-relevant values of a deal, as flushed now or as they were before this flush"""
+    state = inspect(deal)
+    values = {}
+    for field in DEAL_FIELDS:
+        value = getattr(deal, field)
+        if previous:
+            history = state.attrs[field].history
+            if history.deleted:
+                value = history.deleted[0]
+        values[field] = value
+    return values
+
+
+def _add_delta(deltas, values, sign):
+    """Add (sign=1) or remove (sign=-1) a deal's contribution from its user's delta"""
+    if values['user_id'] is None:
+        return
+    contribution = deal_contribution(
+        values['status'], values['position_type'], values['invested_amount'],
+        values['current_value'], values['pnl_amount']
+    )
+    totals = deltas[values['user_id']]
+    for field, value in contribution.items():
+        totals[field] = totals.get(field, 0) + sign * value
+
+
+def collect_deal_deltas(session):
+    """Per-user summary deltas for every UserDeal inserted, changed or deleted in a flush"""
+    deltas = defaultdict(dict)
+    for deal in session.new:
+        if isinstance(deal, UserDeal):
+            _add_delta(deltas, _deal_values(deal), 1)
+
+    for deal in session.dirty:
+        if isinstance(deal, UserDeal) and session.is_modified(deal):
+            before, after = _deal_values(deal, previous=True), _deal_values(deal)
+            if before != after:
+                _add_delta(deltas, before, -1)
+                _add_delta(deltas, after, 1)
+
+    for deal in session.deleted:
+        if isinstance(deal, UserDeal):
+            _add_delta(deltas, _deal_values(deal, previous=True), -1)
+
+    return {
+        user_id: totals for user_id, totals in deltas.items()
+        if any(totals.values())
+    }
+
+
+def apply_summary_deltas(connection, deltas):
+    """Add per-user deltas to existing summary rows; rows that do not exist yet are rebuilt"""
+    if not deltas:
+        return 0
+
+    existing = set(connection.execute(
+        select(UserPortfolioSummary.user_id).where(UserPortfolioSummary.user_id.in_(list(deltas)))
+    ).scalars())
+
+    # One executemany UPDATE with every field, zero deltas included
+    params = [
+        dict({f"d_{field}": delta.get(field, 0) for field in SUMMARY_FIELDS}, b_user_id=user_id)
+        for user_id, delta in deltas.items() if user_id in existing
+    ]
+    if params:
+        values = {field: getattr(UserPortfolioSummary, field) + bindparam(f"d_{field}") for field in SUMMARY_FIELDS}
+        values['updated_at'] = datetime.utcnow()
+        connection.execute(
+            update(UserPortfolioSummary)
+            .where(UserPortfolioSummary.user_id == bindparam('b_user_id'))
+            .values(values),
+            params
+        )
+
+    missing = [user_id for user_id in deltas if user_id not in existing]
+    if missing:
+        rebuild_user_summaries(missing, connection)
+
+    return len(deltas)
+
+
+def rebuild_user_summaries(user_ids, connection=None):
+    """Recompute summary rows for users from user_deals (backfill and repair)"""
+    connection = connection or db.session.connection()
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+
+    active = UserDeal.status == ACTIVE_STATUS
+
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    def sum_where(condition, column):
+        return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+    rows = connection.execute(
+        select(
+            UserDeal.user_id,
+            func.count(UserDeal.id),
+            count_where(active),
+            count_where(UserDeal.status == 'CLOSED'),
+            count_where(UserDeal.pnl_amount > 0),
+            count_where(UserDeal.pnl_amount < 0),
+            count_where(UserDeal.position_type == 'LONG'),
+            count_where(UserDeal.position_type == 'SHORT'),
+            count_where(active & (UserDeal.pnl_amount > 0)),
+            count_where(active & (UserDeal.pnl_amount < 0)),
+            func.coalesce(func.sum(UserDeal.invested_amount), 0),
+            func.coalesce(func.sum(UserDeal.pnl_amount), 0),
+            sum_where(active, UserDeal.invested_amount),
+            sum_where(active, UserDeal.current_value),
+            sum_where(active, UserDeal.pnl_amount)
+        )
+        .where(UserDeal.user_id.in_(user_ids))
+        .group_by(UserDeal.user_id)
+    ).all()
+
+    now = datetime.utcnow()
+    summaries = {user_id: dict({field: 0 for field in SUMMARY_FIELDS}, user_id=user_id, updated_at=now) for user_id in user_ids}
+    for row in rows:
+        summaries[row[0]].update(zip(SUMMARY_FIELDS, row[1:]))
+
+    connection.execute(delete(UserPortfolioSummary).where(UserPortfolioSummary.user_id.in_(user_ids)))
+    connection.execute(insert(UserPortfolioSummary), list(summaries.values()))
+    return len(summaries)
+
+
+def reprice_deals_bulk(prices, timestamp):
+    """Reprice active deals for all symbols with one UPDATE and fold the P&L change into the summaries"""
+    if not prices:
+        return 0
+
+    connection = db.session.connection()
+    symbols = list(prices)
+    new_price = case(prices, value=UserDeal.symbol)
+    new_pnl = case(
+        (UserDeal.position_type == 'LONG', (new_price - UserDeal.entry_price) * UserDeal.quantity),
+        else_=(UserDeal.entry_price - new_price) * UserDeal.quantity
+    )
+    # Same maths as UserDeal.calculate_pnl, done in SQL
+    invested = invested_sql(UserDeal.invested_amount, UserDeal.entry_price, UserDeal.quantity)
+    new_current_value = invested + new_pnl
+    repriced = (UserDeal.symbol.in_(symbols), UserDeal.status == ACTIVE_STATUS)
+
+    # Deltas are read before the UPDATE, against the values about to be replaced
+    old_pnl = func.coalesce(UserDeal.pnl_amount, 0)
+    rounded_pnl = func.round(new_pnl, 2)
+    rows = connection.execute(
+        select(
+            UserDeal.user_id,
+            func.sum(rounded_pnl - old_pnl),
+            func.sum(func.round(new_current_value, 2) - func.coalesce(UserDeal.current_value, 0)),
+            func.sum(case((rounded_pnl > 0, 1), else_=0) - case((old_pnl > 0, 1), else_=0)),
+            func.sum(case((rounded_pnl < 0, 1), else_=0) - case((old_pnl < 0, 1), else_=0))
+        )
+        .where(*repriced)
+        .group_by(UserDeal.user_id)
+    ).all()
+
+    result = connection.execute(
+        update(UserDeal)
+        .where(*repriced)
+        .values(
+            current_price=new_price,
+            last_price_update=timestamp,
+            pnl_amount=new_pnl,
+            pnl_percent=case((invested > 0, new_pnl * 100 / invested), else_=0),
+            current_value=new_current_value
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    deltas = {}
+    for user_id, pnl_delta, value_delta, winning_delta, losing_delta in rows:
+        delta = {
+            'total_pnl': pnl_delta or 0,
+            'active_pnl': pnl_delta or 0,
+            'active_current_value': value_delta or 0,
+            'winning_deals': winning_delta or 0,
+            'losing_deals': losing_delta or 0,
+            'active_winning': winning_delta or 0,
+            'active_losing': losing_delta or 0
+        }
+        if any(delta.values()):
+            deltas[user_id] = delta
+    apply_summary_deltas(connection, deltas)
+
+    return result.rowcount
+
+
+def get_user_portfolio_summary(user_id):
+    """Summary dict for a user, built on first request"""
+    summary = db.session.get(UserPortfolioSummary, user_id)
+    if summary is None:
+        try:
+            rebuild_user_summaries([user_id])
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error building portfolio summary for user {user_id}: {str(e)}")
+            db.session.rollback()
+            raise
+        summary = db.session.get(UserPortfolioSummary, user_id)
+    return summary.to_dict()
+
+
+@event.listens_for(Session, 'after_flush')
+def update_summaries_after_flush(session, flush_context):
+    """Fold UserDeal inserts, updates and deletes into the summaries inside the same transaction"""
+    deltas = collect_deal_deltas(session)
+    if deltas:
+        apply_summary_deltas(session.connection(), deltas)
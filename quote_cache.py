@@ -0,0 +1,432 @@
+"""
+Latest Quote Cache
+In-process cache of the most recent quote per symbol shared by all quote-reading endpoints
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached quote stays valid before the next read falls back to the database
+DEFAULT_QUOTE_CACHE_TTL = int(os.environ.get('QUOTE_CACHE_TTL', '60'))
+
+# Sources in priority order - Kotak Neo quotes win over the legacy realtime table
+SOURCE_KOTAK_NEO = 'KOTAK_NEO_API'
+SOURCE_REALTIME = 'REALTIME_QUOTES'
+SOURCE_PRIORITY = {SOURCE_KOTAK_NEO: 2, SOURCE_REALTIME: 1}
+
+# Seconds a Kotak Neo quote in latest_quotes is protected from realtime overwrites
+KOTAK_PRIORITY_WINDOW = int(os.environ.get('KOTAK_QUOTE_PRIORITY_WINDOW', '900'))
+
+
+def _decimal(value):
+    """Coerce a price to Decimal so records behave like model attributes"""
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+class QuoteRecord(namedtuple('QuoteRecord', [
+    'symbol', 'trading_symbol', 'token', 'exchange',
+    'current_price', 'open_price', 'high_price', 'low_price', 'close_price',
+    'change_amount', 'change_percent', 'volume',
+    'bid_price', 'ask_price', 'week_52_high', 'week_52_low',
+    'market_status', 'timestamp', 'data_source'
+])):
+    """Compact latest-quote record, field names match RealtimeQuote columns"""
+    __slots__ = ()
+
+    @classmethod
+    def from_kotak_quote(cls, quote):
+        """Build a record from a KotakNeoQuote row"""
+        return cls(
+            symbol=quote.symbol,
+            trading_symbol=quote.trading_symbol,
+            token=quote.token,
+            exchange=quote.exchange,
+            current_price=_decimal(quote.ltp),
+            open_price=_decimal(quote.open_price),
+            high_price=_decimal(quote.high_price),
+            low_price=_decimal(quote.low_price),
+            close_price=_decimal(quote.close_price),
+            change_amount=_decimal(quote.net_change),
+            change_percent=_decimal(quote.percentage_change),
+            volume=quote.volume,
+            bid_price=_decimal(quote.bid_price),
+            ask_price=_decimal(quote.ask_price),
+            week_52_high=_decimal(quote.week_52_high),
+            week_52_low=_decimal(quote.week_52_low),
+            market_status=quote.market_status,
+            timestamp=quote.timestamp,
+            data_source=SOURCE_KOTAK_NEO
+        )
+
+    @classmethod
+    def from_realtime_quote(cls, quote):
+        """Build a record from a RealtimeQuote row"""
+        return cls(
+            symbol=quote.symbol,
+            trading_symbol=quote.trading_symbol,
+            token=quote.token,
+            exchange=quote.exchange,
+            current_price=_decimal(quote.current_price),
+            open_price=_decimal(quote.open_price),
+            high_price=_decimal(quote.high_price),
+            low_price=_decimal(quote.low_price),
+            close_price=_decimal(quote.close_price),
+            change_amount=_decimal(quote.change_amount),
+            change_percent=_decimal(quote.change_percent),
+            volume=quote.volume,
+            bid_price=None,
+            ask_price=None,
+            week_52_high=None,
+            week_52_low=None,
+            market_status=quote.market_status,
+            timestamp=quote.timestamp,
+            data_source=SOURCE_REALTIME
+        )
+
+    @classmethod
+    def from_latest_quote(cls, quote):
+        """Build a record from a LatestQuote row"""
+        return cls(
+            symbol=quote.symbol,
+            trading_symbol=quote.trading_symbol,
+            token=quote.token,
+            exchange=quote.exchange,
+            current_price=_decimal(quote.current_price),
+            open_price=_decimal(quote.open_price),
+            high_price=_decimal(quote.high_price),
+            low_price=_decimal(quote.low_price),
+            close_price=_decimal(quote.close_price),
+            change_amount=_decimal(quote.change_amount),
+            change_percent=_decimal(quote.change_percent),
+            volume=quote.volume,
+            bid_price=_decimal(quote.bid_price),
+            ask_price=_decimal(quote.ask_price),
+            week_52_high=_decimal(quote.week_52_high),
+            week_52_low=_decimal(quote.week_52_low),
+            market_status=quote.market_status,
+            timestamp=quote.timestamp,
+            data_source=quote.data_source
+        )
+
+    @classmethod
+    def from_quote_data(cls, quote_data, timestamp, data_source=SOURCE_REALTIME):
+        """Build a record from a RealtimeQuotesManager quote dict; data_source names the table the cycle wrote it to"""
+        return cls(
+            symbol=quote_data['symbol'],
+            trading_symbol=quote_data.get('trading_symbol'),
+            token=quote_data.get('token'),
+            exchange=quote_data.get('exchange', 'NSE'),
+            current_price=_decimal(quote_data['current_price']),
+            open_price=_decimal(quote_data.get('open_price')),
+            high_price=_decimal(quote_data.get('high_price')),
+            low_price=_decimal(quote_data.get('low_price')),
+            close_price=_decimal(quote_data.get('close_price')),
+            change_amount=_decimal(quote_data.get('change_amount')),
+            change_percent=_decimal(quote_data.get('change_percent')),
+            volume=quote_data.get('volume'),
+            bid_price=None,
+            ask_price=None,
+            week_52_high=None,
+            week_52_low=None,
+            market_status=quote_data.get('market_status'),
+            timestamp=timestamp,
+            data_source=data_source
+        )
+
+    @classmethod
+    def from_tick(cls, tick, symbol):
+        """Build a record from a coalesced Kotak Neo websocket tick"""
+        return cls(
+            symbol=symbol,
+            trading_symbol=None,
+            token=tick.token,
+            exchange='NSE',
+            current_price=_decimal(tick.ltp),
+            open_price=_decimal(tick.open_price),
+            high_price=_decimal(tick.high_price),
+            low_price=_decimal(tick.low_price),
+            close_price=_decimal(tick.close_price),
+            change_amount=_decimal(tick.change_amount),
+            change_percent=_decimal(tick.change_percent),
+            volume=tick.volume,
+            bid_price=None,
+            ask_price=None,
+            week_52_high=None,
+            week_52_low=None,
+            market_status='OPEN',
+            timestamp=tick.received_at,
+            data_source=SOURCE_KOTAK_NEO
+        )
+
+    def to_dict(self):
+        """Serialize using the KotakNeoQuote.to_dict field names"""
+        return {
+            'symbol': self.symbol,
+            'trading_symbol': self.trading_symbol,
+            'token': self.token,
+            'exchange': self.exchange,
+            'ltp': float(self.current_price) if self.current_price else None,
+            'open_price': float(self.open_price) if self.open_price else None,
+            'high_price': float(self.high_price) if self.high_price else None,
+            'low_price': float(self.low_price) if self.low_price else None,
+            'close_price': float(self.close_price) if self.close_price else None,
+            'net_change': float(self.change_amount) if self.change_amount else None,
+            'percentage_change': float(self.change_percent) if self.change_percent else None,
+            'volume': self.volume,
+            'bid_price': float(self.bid_price) if self.bid_price else None,
+            'ask_price': float(self.ask_price) if self.ask_price else None,
+            'week_52_high': float(self.week_52_high) if self.week_52_high else None,
+            'week_52_low': float(self.week_52_low) if self.week_52_low else None,
+            'market_status': self.market_status,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'data_source': self.data_source
+        }
+
+
+def query_latest_quotes(model, symbols):
+    """Fetch the newest row per symbol from a quote table in a single windowed query"""
+    from app import db
+    from sqlalchemy import func
+    from sqlalchemy.orm import aliased
+
+    if not symbols:
+        return []
+
+    if db.engine.dialect.name == 'postgresql':
+        # DISTINCT ON keeps the first row of each symbol group in timestamp order
+        return db.session.query(model).filter(
+            model.symbol.in_(symbols)
+        ).distinct(model.symbol).order_by(model.symbol, model.timestamp.desc()).all()
+
+    ranked = db.session.query(
+        model,
+        func.row_number().over(
+            partition_by=model.symbol,
+            order_by=model.timestamp.desc()
+        ).label('row_number')
+    ).filter(model.symbol.in_(symbols)).subquery()
+
+    latest = aliased(model, ranked)
+    return db.session.query(latest).filter(ranked.c.row_number == 1).all()
+
+
+def write_back_quote_prices(changes):
+    """Persist refreshed prices for loaded rows with one CASE-keyed UPDATE per model"""
+    # changes are (instance, {column: value}) pairs; values are also set on the instances
+    # as committed state so the session does not flush them a second time
+    from app import db
+    from sqlalchemy import case, update
+    from sqlalchemy.orm.attributes import set_committed_value
+
+    by_model = {}
+    for instance, values in changes:
+        if not values:
+            continue
+        for column, value in values.items():
+            set_committed_value(instance, column, value)
+        by_model.setdefault(type(instance), []).append((instance.id, values))
+
+    updated = 0
+    for model, rows in by_model.items():
+        columns = {column for _, values in rows for column in values}
+        assignments = {}
+        for column in columns:
+            mapping = {row_id: values[column] for row_id, values in rows if column in values}
+            assignments[column] = case(mapping, value=model.id, else_=getattr(model, column))
+
+        result = db.session.execute(
+            update(model)
+            .where(model.id.in_([row_id for row_id, _ in rows]))
+            .values(**assignments)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+
+    return updated
+
+
+def upsert_latest_quotes(records):
+    """Upsert quote records into latest_quotes in the caller's transaction"""
+    from app import db
+    from models_etf import LatestQuote
+
+    # One row per (symbol, exchange) - a statement may not touch the same key twice
+    rows = {}
+    for record in records:
+        if record is None or not record.current_price:
+            continue
+        row = record._asdict()
+        row['exchange'] = row['exchange'] or 'NSE'
+        row['updated_at'] = datetime.utcnow()
+        rows[(row['symbol'], row['exchange'])] = row
+
+    if not rows:
+        return 0
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows.values():
+            db.session.merge(LatestQuote(**row))
+        return len(rows)
+
+    stmt = insert(LatestQuote).values(list(rows.values()))
+    update_columns = [column.name for column in LatestQuote.__table__.columns if column.name not in ('symbol', 'exchange')]
+
+    # Realtime rows only replace a Kotak Neo row once it is older than the priority window
+    priority_cutoff = datetime.utcnow() - timedelta(seconds=KOTAK_PRIORITY_WINDOW)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['symbol', 'exchange'],
+        set_={column: stmt.excluded[column] for column in update_columns},
+        where=db.or_(
+            stmt.excluded.data_source == SOURCE_KOTAK_NEO,
+            LatestQuote.data_source != SOURCE_KOTAK_NEO,
+            LatestQuote.updated_at < priority_cutoff
+        )
+    )
+    db.session.execute(stmt)
+    return len(rows)
+
+
+class LatestQuoteCache:
+    """Symbol-indexed latest quote cache with TTL expiry and database fallback"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else DEFAULT_QUOTE_CACHE_TTL
+        self._entries = {}  # symbol -> (expires_at, QuoteRecord or None)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+
+    def add_listener(self, callback):
+        """Register a callback receiving the records stored by each put_many"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def put(self, record):
+        """Store a single quote record"""
+        self.put_many([record])
+
+    def put_many(self, records):
+        """Store quote records written by a scheduler, keeping higher priority sources"""
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        stored = []
+        with self._lock:
+            for record in records:
+                if record is None or not record.current_price:
+                    continue
+                existing = self._entries.get(record.symbol)
+                if existing and existing[0] > now and existing[1] is not None:
+                    if SOURCE_PRIORITY.get(existing[1].data_source, 0) > SOURCE_PRIORITY.get(record.data_source, 0):
+                        continue
+                self._entries[record.symbol] = (expires_at, record)
+                stored.append(record)
+
+        # Notify listeners (e.g. the SSE broadcaster) outside the lock
+        if stored:
+            for callback in self._listeners:
+                try:
+                    callback(stored)
+                except Exception as e:
+                    logger.error(f"Quote cache listener failed: {str(e)}")
+
+    def invalidate(self, symbols=None):
+        """Drop cached entries for the given symbols, or everything"""
+        with self._lock:
+            if symbols is None:
+                self._entries.clear()
+            else:
+                for symbol in symbols:
+                    self._entries.pop(symbol, None)
+
+    def get(self, symbol):
+        """Get the latest quote record for a symbol, or None"""
+        return self.get_many([symbol]).get(symbol)
+
+    def get_many(self, symbols):
+        """Get latest quote records keyed by symbol, loading misses from the database"""
+        symbols = list(dict.fromkeys(s for s in symbols if s))
+        found = {}
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(symbol)
+                if entry and entry[0] > now:
+                    if entry[1] is not None:
+                        found[symbol] = entry[1]
+                else:
+                    missing.append(symbol)
+            self.hits += len(symbols) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load_from_db(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for symbol in missing:
+                    # Symbols without any quote are cached as None so they don't re-query every poll
+                    self._entries[symbol] = (expires_at, loaded.get(symbol))
+            found.update(loaded)
+
+        return found
+
+    def _load_from_db(self, symbols):
+        """Load latest quotes from latest_quotes, falling back to the history tables"""
+        from models_etf import LatestQuote, KotakNeoQuote, RealtimeQuote
+
+        records = {}
+        try:
+            # Primary-key lookups on the materialized latest_quotes table
+            for quote in LatestQuote.query.filter(LatestQuote.symbol.in_(symbols)).all():
+                existing = records.get(quote.symbol)
+                if existing is None or SOURCE_PRIORITY.get(quote.data_source, 0) > SOURCE_PRIORITY.get(existing.data_source, 0):
+                    records[quote.symbol] = QuoteRecord.from_latest_quote(quote)
+
+            # Symbols not yet upserted (e.g. before the first scheduler run) come from history
+            history_missing = [s for s in symbols if s not in records]
+            if history_missing:
+                for quote in query_latest_quotes(KotakNeoQuote, history_missing):
+                    if quote.ltp and float(quote.ltp) > 0:
+                        records[quote.symbol] = QuoteRecord.from_kotak_quote(quote)
+
+            still_missing = [s for s in symbols if s not in records]
+            if still_missing:
+                for quote in query_latest_quotes(RealtimeQuote, still_missing):
+                    records[quote.symbol] = QuoteRecord.from_realtime_quote(quote)
+
+            logger.debug(f"Quote cache loaded {len(records)}/{len(symbols)} symbols from database")
+
+        except Exception as e:
+            logger.error(f"Error loading latest quotes from database: {str(e)}")
+
+        return records
+
+    def get_stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global instance shared by schedulers and API endpoints
+latest_quote_cache = LatestQuoteCache()
@@ -0,0 +1,297 @@
+"""
+Quote Orchestrator
+One market-hours-aware quote cycle: fetch every tracked symbol once, fan the result out to all quote writers
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import schedule
+
+from app import db, app
+from market_calendar import market_calendar
+from quote_cache import latest_quote_cache, upsert_latest_quotes, QuoteRecord, SOURCE_KOTAK_NEO
+from quote_storage import quote_partition_manager
+from realtime_quotes_manager import realtime_quotes_manager
+from signal_repricer import SignalRepricer
+
+logger = logging.getLogger(__name__)
+
+# Percent move between two cycles that puts a symbol on the fast lane
+QUOTE_BOOST_THRESHOLD_PCT = float(os.environ.get('QUOTE_BOOST_THRESHOLD_PCT', '1.0'))
+
+# Seconds between fast-lane refreshes of sharply moving symbols during the session
+QUOTE_BOOST_SECONDS = float(os.environ.get('QUOTE_BOOST_SECONDS', '15'))
+
+# Largest move from the previous close accepted as a real price (NSE's widest price band is 20%)
+QUOTE_MAX_MOVE_PCT = float(os.environ.get('QUOTE_MAX_MOVE_PCT', '20'))
+
+
+class QuoteOrchestrator:
+    """Replaces the per-module 5-minute pollers with a single fetch and a fan-out to every quote table"""
+
+    def __init__(self, calendar=None, boost_threshold=None, boost_interval=None):
+        self.calendar = calendar or market_calendar
+        self.boost_threshold = QUOTE_BOOST_THRESHOLD_PCT if boost_threshold is None else boost_threshold
+        self.boost_interval = boost_interval or QUOTE_BOOST_SECONDS
+        self.quotes_manager = realtime_quotes_manager
+        self.repricer = SignalRepricer()
+        self.scheduler = schedule.Scheduler()
+        self.scheduler_thread = None
+        self.is_running = False
+        self._stop_event = threading.Event()
+        self._cycle_lock = threading.Lock()
+        self.next_run_at = None
+        self.next_boost_at = None
+        self.last_prices = {}
+        self.boosted = set()
+        self.cycles = 0
+        self.boost_cycles = 0
+        self.skipped_cycles = 0
+        self.failed_cycles = 0
+        self.rejected_quotes = 0
+        self.last_cycle = {}
+
+    def tracked_symbols(self):
+        """Union of every symbol the old pollers fetched: active signals, default ETFs and ETF instruments"""
+        symbols = set(self.quotes_manager.get_unique_symbols_from_signals())
+        try:
+            from etf_data_scheduler import etf_scheduler
+            symbols.update(instrument['symbol'] for instrument in etf_scheduler.etf_instruments)
+        except Exception as e:
+            logger.warning(f"ETF instrument list unavailable: {str(e)}")
+        return sorted(symbols)
+
+    def next_interval(self, now=None):
+        """Seconds until the next full cycle, from the market calendar"""
+        return self.calendar.refresh_interval(now)
+
+    def validate_quotes(self, quotes):
+        """Drop quotes that cannot be real prices; refuse the whole batch when it looks synthetic"""
+        valid = []
+        for quote_data in quotes:
+            price = float(quote_data['current_price'] or 0)
+            low, high = float(quote_data['low_price'] or 0), float(quote_data['high_price'] or 0)
+            close = float(quote_data['close_price'] or 0)
+            if price <= 0:
+                reason = 'no price'
+            elif low > 0 and high > 0 and not (low * 0.999 <= price <= high * 1.001):
+                reason = f"outside day range {low}-{high}"
+            elif close > 0 and abs(price - close) * 100 / close > QUOTE_MAX_MOVE_PCT:
+                reason = f"{abs(price - close) * 100 / close:.1f}% from close {close}"
+            else:
+                valid.append(quote_data)
+                continue
+            self.rejected_quotes += 1
+            logger.warning(f"⚠️ Rejected quote for {quote_data['symbol']} at {price}: {reason}")
+
+        # Many different instruments at one identical price is a placeholder response, not a market
+        prices = {float(quote_data['current_price']) for quote_data in valid}
+        if len(valid) >= 3 and len(prices) == 1:
+            raise RuntimeError(f"all {len(valid)} quotes priced at {prices.pop()}, refusing to fan out")
+        return valid
+
+    def update_movers(self, quotes, boost=False):
+        """Remember this cycle's prices and return the symbols that moved more than the boost threshold"""
+        movers = set()
+        for quote_data in quotes:
+            symbol = quote_data['symbol']
+            price = float(quote_data['current_price'] or 0)
+            previous = self.last_prices.get(symbol)
+            if previous and price and abs(price - previous) * 100 / previous >= self.boost_threshold:
+                movers.add(symbol)
+            if price:
+                self.last_prices[symbol] = price
+
+        # A full cycle re-ranks every symbol; a boost cycle only re-checks the boosted ones
+        fetched = {quote_data['symbol'] for quote_data in quotes}
+        self.boosted = (self.boosted - fetched) | movers if boost else movers
+        if movers:
+            logger.info(f"⚡ Boosting {len(self.boosted)} fast-moving symbols: {', '.join(sorted(self.boosted))}")
+        return movers
+
+    def run_cycle(self, symbols=None, boost=False):
+        """Fetch each symbol once and write the quotes to every table in one transaction"""
+        if not self._cycle_lock.acquire(blocking=False):
+            logger.info("Quote cycle already running, skipping")
+            return False
+
+        timings = {}
+        started = time.perf_counter()
+        try:
+            # A new day or month needs its partition before the first insert; a no-op otherwise
+            quote_partition_manager.ensure_current_partitions()
+
+            stage = time.perf_counter()
+            symbols = sorted(symbols) if symbols is not None else self.tracked_symbols()
+            timings['symbols'] = time.perf_counter() - stage
+
+            stage = time.perf_counter()
+            if not self.quotes_manager.initialize_trading_functions():
+                raise RuntimeError("trading functions not initialized")
+            quotes = self.validate_quotes(self.quotes_manager.fetch_quotes_batch(symbols))
+            timings['fetch'] = time.perf_counter() - stage
+
+            counts = self.fan_out(quotes, timings)
+            self.update_movers(quotes, boost=boost)
+            if boost:
+                self.boost_cycles += 1
+            else:
+                self.cycles += 1
+            success = True
+        except Exception as e:
+            logger.error(f"❌ Quote cycle failed: {str(e)}")
+            self.failed_cycles += 1
+            symbols, quotes, counts = [], [], {}
+            success = False
+        finally:
+            self._cycle_lock.release()
+
+        timings['total'] = time.perf_counter() - started
+        self.last_cycle = {
+            'finished_at': datetime.utcnow().isoformat(),
+            'success': success,
+            'boost': boost,
+            'symbols': len(symbols),
+            'quotes': len(quotes),
+            'rows': counts,
+            'timings_ms': {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+        }
+        logger.info(f"📊 {'Boost' if boost else 'Quote'} cycle: {len(quotes)}/{len(symbols)} symbols, "
+                    + ", ".join(f"{name} {ms}ms" for name, ms in self.last_cycle['timings_ms'].items()))
+        return success
+
+    def fan_out(self, quotes, timings):
+        """Write one cycle of quotes to realtime_quotes, kotak_neo_quotes, the signal tables and latest_quotes"""
+        if not quotes:
+            return {}
+
+        counts = {}
+        try:
+            with app.app_context():
+                timestamp = datetime.utcnow()
+
+                stage = time.perf_counter()
+                counts['realtime_quotes'] = self.quotes_manager.store_quotes_bulk(quotes, timestamp)
+                timings['realtime_quotes'] = time.perf_counter() - stage
+
+                stage = time.perf_counter()
+                counts['kotak_neo_quotes'] = self.quotes_manager.store_kotak_quotes_bulk(quotes, timestamp)
+                timings['kotak_neo_quotes'] = time.perf_counter() - stage
+
+                # ETF signal trades, admin trade signals and user deals, only for symbols whose LTP moved
+                stage = time.perf_counter()
+                moved = self.repricer.changed_prices(
+                    {quote_data['symbol']: quote_data['current_price'] for quote_data in quotes}
+                )
+                etf_count, admin_count = self.quotes_manager.update_signal_prices_bulk(moved, timestamp)
+                counts['etf_signal_trades'] = etf_count
+                counts['admin_trade_signals'] = admin_count
+                timings['signals'] = time.perf_counter() - stage
+
+                stage = time.perf_counter()
+                # The cycle stored these in kotak_neo_quotes too, so readers give them Kotak Neo priority
+                records = [QuoteRecord.from_quote_data(quote_data, timestamp, SOURCE_KOTAK_NEO) for quote_data in quotes]
+                counts['latest_quotes'] = upsert_latest_quotes(records)
+                db.session.commit()
+                self.repricer.mark_applied(moved)
+                latest_quote_cache.put_many(records)
+                timings['commit'] = time.perf_counter() - stage
+                return counts
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def tick(self):
+        """Run whatever is due: a full cycle, a boost cycle for fast movers, or nothing while the market is closed"""
+        now = time.monotonic()
+        if self.next_run_at is None or now >= self.next_run_at:
+            if self.calendar.should_refresh():
+                self.run_cycle()
+            else:
+                # Closed, holiday or muted: no broker calls, no writes
+                self.skipped_cycles += 1
+                self.boosted.clear()
+            self.next_run_at = time.monotonic() + self.next_interval()
+            self.next_boost_at = time.monotonic() + self.boost_interval
+        elif self.boosted and now >= (self.next_boost_at or 0):
+            if self.calendar.is_open():
+                self.run_cycle(self.boosted, boost=True)
+            else:
+                self.boosted.clear()
+            self.next_boost_at = time.monotonic() + self.boost_interval
+
+    def _run(self):
+        """Background loop: quote cycles on the market-aware timer, daily jobs on the private scheduler"""
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+                self.scheduler.run_pending()
+            except Exception as e:
+                logger.error(f"Quote orchestrator error: {str(e)}")
+
+            due = [at for at in (self.next_run_at, self.next_boost_at if self.boosted else None) if at]
+            wait = min(due) - time.monotonic() if due else 30
+            self._stop_event.wait(min(30, max(1, wait)))
+
+    def start(self):
+        """Start the orchestrator thread"""
+        if self.is_running:
+            logger.warning("Quote orchestrator is already running")
+            return
+
+        # Cleanup keeps its own daily slot on this instance's scheduler, not the global one
+        self.scheduler.every().day.at("02:00").do(self.quotes_manager.cleanup_old_quotes)
+
+        self._stop_event.clear()
+        self.is_running = True
+        self.scheduler_thread = threading.Thread(target=self._run, name='quote-orchestrator', daemon=True)
+        self.scheduler_thread.start()
+        logger.info(f"🚀 Quote orchestrator started in {self.calendar.phase()} phase, "
+                    f"next cycle in {self.next_interval():.0f}s once running")
+
+    def stop(self):
+        """Stop the orchestrator thread"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self._stop_event.set()
+        self.scheduler.clear()
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.scheduler_thread.join(timeout=5)
+        logger.info("🛑 Quote orchestrator stopped")
+
+    def get_stats(self):
+        """Get orchestrator statistics"""
+        return {
+            'running': self.is_running,
+            'market': self.calendar.get_status(),
+            'next_run_in_seconds': round(max(0, self.next_run_at - time.monotonic()), 1) if self.next_run_at else None,
+            'boosted_symbols': sorted(self.boosted),
+            'cycles': self.cycles,
+            'boost_cycles': self.boost_cycles,
+            'skipped_cycles': self.skipped_cycles,
+            'failed_cycles': self.failed_cycles,
+            'rejected_quotes': self.rejected_quotes,
+            'repricer': self.repricer.get_stats(),
+            'last_cycle': self.last_cycle
+        }
+
+
+# Global instance
+quote_orchestrator = QuoteOrchestrator()
+
+
+def start_quote_orchestrator():
+    """Start the global quote orchestrator"""
+    quote_orchestrator.start()
+
+
+def stop_quote_orchestrator():
+    """Stop the global quote orchestrator"""
+    quote_orchestrator.stop()
@@ -0,0 +1,263 @@
+"""
+Quote Storage Manager
+Composite indexes and optional time-range partitioning for the quote history tables
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db, app
+
+logger = logging.getLogger(__name__)
+
+# Partition interval for quote history tables: '' (disabled), 'daily' or 'monthly'
+QUOTE_PARTITIONING = os.environ.get('QUOTE_PARTITIONING', '').strip().lower()
+
+# Number of future partitions created ahead of the current one
+QUOTE_PARTITIONS_AHEAD = int(os.environ.get('QUOTE_PARTITIONS_AHEAD', '3'))
+
+PARTITIONED_QUOTE_TABLES = ('realtime_quotes', 'kotak_neo_quotes')
+
+
+class QuotePartitionManager:
+    """Creates, converts and drops range partitions of the quote history tables"""
+
+    def __init__(self, interval=None, partitions_ahead=None):
+        self.interval = interval if interval is not None else QUOTE_PARTITIONING
+        self.partitions_ahead = partitions_ahead if partitions_ahead is not None else QUOTE_PARTITIONS_AHEAD
+        self.ensured_period = None
+
+    def is_enabled(self):
+        """Partitioning is opt-in and only supported on PostgreSQL"""
+        return self.interval in ('daily', 'monthly') and db.engine.dialect.name == 'postgresql'
+
+    def period_start(self, moment):
+        """Start of the partition period containing a datetime or date"""
+        day = moment.date() if isinstance(moment, datetime) else moment
+        if self.interval == 'monthly':
+            return day.replace(day=1)
+        return day
+
+    def next_period(self, start):
+        """Start of the period following the given period start"""
+        if self.interval == 'monthly':
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start + timedelta(days=1)
+
+    def partition_name(self, table_name, start):
+        """Partition table name, e.g. realtime_quotes_p20240115 or realtime_quotes_p202401"""
+        suffix = start.strftime('%Y%m') if self.interval == 'monthly' else start.strftime('%Y%m%d')
+        return f"{table_name}_p{suffix}"
+
+    def parse_partition_bounds(self, table_name, partition_name):
+        """Get (start, end) dates of a partition from its name, or None"""
+        suffix = partition_name[len(table_name) + 2:]
+        try:
+            if len(suffix) == 8:
+                start = datetime.strptime(suffix, '%Y%m%d').date()
+                return start, start + timedelta(days=1)
+            if len(suffix) == 6:
+                start = datetime.strptime(suffix, '%Y%m').date()
+                return start, (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        except ValueError:
+            pass
+        return None
+
+    def is_partitioned(self, connection, table_name):
+        """Check whether a table exists as a partitioned parent table"""
+        relkind = connection.execute(
+            text("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(:table_name)"),
+            {'table_name': table_name}
+        ).scalar()
+        return relkind == 'p'
+
+    def list_partitions(self, connection, table_name):
+        """Names of all partitions attached to a table"""
+        rows = connection.execute(
+            text("""
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(:table_name)
+            """),
+            {'table_name': table_name}
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def default_partition_name(self, table_name):
+        """Catch-all partition for rows no period partition covers"""
+        return f"{table_name}_default"
+
+    def create_default_partition(self, connection, table_name):
+        """Create the DEFAULT partition, so inserts never fail for want of a period partition"""
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.default_partition_name(table_name)} PARTITION OF {table_name} DEFAULT"
+        ))
+
+    def create_partition(self, connection, table_name, start):
+        """Create the partition covering the period starting at start"""
+        end = self.next_period(start)
+        name = self.partition_name(table_name, start)
+        if connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': name}).scalar():
+            return
+
+        # Rows the DEFAULT partition took for this period must move out before the range can be attached
+        default_name = self.default_partition_name(table_name)
+        bounds = {'start': start, 'end': end}
+        has_default = connection.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {'name': default_name}
+        ).scalar()
+        stranded = has_default and connection.execute(
+            text(f'SELECT EXISTS (SELECT 1 FROM {default_name} WHERE "timestamp" >= :start AND "timestamp" < :end)'),
+            bounds
+        ).scalar()
+
+        if stranded:
+            connection.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {default_name}"))
+        connection.execute(text(
+            f"CREATE TABLE {name} "
+            f"PARTITION OF {table_name} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if stranded:
+            moved = connection.execute(text(
+                f'WITH moved AS (DELETE FROM {default_name} WHERE "timestamp" >= :start AND "timestamp" < :end RETURNING *) '
+                f"INSERT INTO {table_name} SELECT * FROM moved"
+            ), bounds).rowcount
+            connection.execute(text(f"ALTER TABLE {table_name} ATTACH PARTITION {default_name} DEFAULT"))
+            logger.info(f"🗂️ Moved {moved} {table_name} rows from the default partition into {name}")
+
+    def create_partitions_between(self, connection, table_name, first_day, last_day):
+        """Create every partition needed to cover first_day through last_day"""
+        start = self.period_start(first_day)
+        created = 0
+        while start <= last_day:
+            self.create_partition(connection, table_name, start)
+            start = self.next_period(start)
+            created += 1
+        return created
+
+    def ensure_partitions(self):
+        """Create partitions for the current period and the configured periods ahead"""
+        created = 0
+        try:
+            with app.app_context():
+                today = datetime.utcnow().date()
+                if not self.is_enabled():
+                    self.ensured_period = self.period_start(today)
+                    return 0
+                with db.engine.begin() as connection:
+                    last_day = today
+                    for _ in range(self.partitions_ahead):
+                        last_day = self.next_period(self.period_start(last_day))
+
+                    for table_name in PARTITIONED_QUOTE_TABLES:
+                        if self.is_partitioned(connection, table_name):
+                            self.create_default_partition(connection, table_name)
+                            created += self.create_partitions_between(connection, table_name, today, last_day)
+                self.ensured_period = self.period_start(today)
+        except Exception as e:
+            logger.error(f"Error creating quote partitions: {str(e)}")
+
+        return created
+
+    def ensure_current_partitions(self):
+        """ensure_partitions() once per period; cheap enough to call before every quote cycle"""
+        if self.ensured_period is not None and self.ensured_period == self.period_start(datetime.utcnow()):
+            return 0
+        return self.ensure_partitions()
+
+    def convert_to_partitioned(self, connection, table_name):
+        """Rebuild a plain quote table as a range-partitioned table, keeping its rows"""
+        legacy_name = f"{table_name}_legacy"
+        sequence = connection.execute(
+            text("SELECT pg_get_serial_sequence(:table_name, 'id')"),
+            {'table_name': table_name}
+        ).scalar()
+        first_ts, last_ts, undated = connection.execute(
+            text(f'SELECT min("timestamp"), max("timestamp"), count(*) - count("timestamp") FROM {table_name}')
+        ).fetchone()
+
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        connection.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+        connection.execute(text(
+            f'CREATE TABLE {table_name} (LIKE {legacy_name} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+        ))
+
+        today = datetime.utcnow().date()
+        first_day = first_ts.date() if first_ts else today
+        last_day = max(last_ts.date() if last_ts else today, today)
+        self.create_default_partition(connection, table_name)
+        self.create_partitions_between(connection, table_name, first_day, last_day)
+
+        # The timestamp becomes part of the primary key, so rows without one cannot be kept
+        connection.execute(text(f'INSERT INTO {table_name} SELECT * FROM {legacy_name} WHERE "timestamp" IS NOT NULL'))
+        if undated:
+            logger.warning(f"Dropped {undated} {table_name} rows without a timestamp while partitioning")
+        connection.execute(text(f"DROP TABLE {legacy_name}"))
+
+        # The partition key must be part of the primary key on a partitioned table
+        connection.execute(text(f'ALTER TABLE {table_name} ADD PRIMARY KEY (id, "timestamp")'))
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table_name}.id"))
+
+        logger.info(f"🗂️ Converted {table_name} to {self.interval} range partitions")
+
+    def drop_partitions_before(self, table_name, cutoff):
+        """Drop whole partitions whose range ends on or before cutoff"""
+        dropped = 0
+        cutoff_day = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+        with db.engine.begin() as connection:
+            if not self.is_partitioned(connection, table_name):
+                return 0
+            for partition_name in self.list_partitions(connection, table_name):
+                bounds = self.parse_partition_bounds(table_name, partition_name)
+                if bounds and bounds[1] <= cutoff_day:
+                    connection.execute(text(f"DROP TABLE IF EXISTS {partition_name}"))
+                    dropped += 1
+
+            # Rows that landed in the DEFAULT partition age out by DELETE
+            default_name = self.default_partition_name(table_name)
+            if default_name in self.list_partitions(connection, table_name):
+                connection.execute(
+                    text(f'DELETE FROM {default_name} WHERE "timestamp" < :cutoff'), {'cutoff': cutoff_day}
+                )
+
+        if dropped > 0:
+            logger.info(f"Dropped {dropped} {table_name} partitions older than {cutoff_day}")
+        return dropped
+
+    def setup(self):
+        """Create missing composite indexes and, when enabled, partition the history tables"""
+        from models_etf import RealtimeQuote, KotakNeoQuote
+
+        try:
+            with app.app_context():
+                if self.is_enabled():
+                    with db.engine.begin() as connection:
+                        for table_name in PARTITIONED_QUOTE_TABLES:
+                            exists = connection.execute(
+                                text("SELECT to_regclass(:table_name) IS NOT NULL"),
+                                {'table_name': table_name}
+                            ).scalar()
+                            if exists and not self.is_partitioned(connection, table_name):
+                                self.convert_to_partitioned(connection, table_name)
+
+                # db.create_all() does not add new indexes to tables that already exist
+                for model in (RealtimeQuote, KotakNeoQuote):
+                    for index in model.__table__.indexes:
+                        index.create(bind=db.engine, checkfirst=True)
+
+        except Exception as e:
+            logger.error(f"Error setting up quote storage: {str(e)}")
+
+
+# Global instance
+quote_partition_manager = QuotePartitionManager()
+
+
+def setup_quote_storage():
+    """Prepare quote history indexes and partitions"""
+    quote_partition_manager.setup()
+    # Separately from setup(), so a failed conversion or index build still leaves today's partitions in place
+    quote_partition_manager.ensure_partitions()
@@ -0,0 +1,165 @@
+"""
+Quote Stream Broadcaster
+Fans latest-quote cache updates out to Server-Sent Events subscribers
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from quote_cache import latest_quote_cache
+
+logger = logging.getLogger(__name__)
+
+# Off by default: each open stream holds a worker for up to QUOTE_STREAM_MAX_DURATION seconds, so only
+# enable it on a server with gthread/gevent workers and a worker timeout longer than that duration
+QUOTE_STREAM_ENABLED = os.environ.get('QUOTE_STREAM_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Seconds between keepalive comments on an idle stream
+STREAM_HEARTBEAT_SECONDS = int(os.environ.get('QUOTE_STREAM_HEARTBEAT', '15'))
+
+# Seconds before a stream is closed so the browser reconnects and the worker is released
+STREAM_MAX_DURATION_SECONDS = int(os.environ.get('QUOTE_STREAM_MAX_DURATION', '300'))
+
+# Frames buffered per subscriber before it is considered lagging
+STREAM_QUEUE_SIZE = int(os.environ.get('QUOTE_STREAM_QUEUE_SIZE', '100'))
+
+
+def _quote_payload(record):
+    """Compact JSON payload for a quote record"""
+    return {
+        'symbol': record.symbol,
+        'ltp': float(record.current_price) if record.current_price else None,
+        'change_percent': float(record.change_percent) if record.change_percent else 0,
+        'open_price': float(record.open_price) if record.open_price else None,
+        'high_price': float(record.high_price) if record.high_price else None,
+        'low_price': float(record.low_price) if record.low_price else None,
+        'volume': record.volume or 0,
+        'timestamp': record.timestamp.isoformat() if record.timestamp else None,
+        'data_source': record.data_source
+    }
+
+
+def _format_event(event, data, event_id=None):
+    """Serialize one SSE frame"""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n" + frame
+    return frame + f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class QuoteBroadcaster:
+    """Publishes changed quotes once per tick and shares the serialized frame with every subscriber"""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or STREAM_QUEUE_SIZE
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._last_payloads = {}  # symbol -> last published payload
+        self._sequence = 0
+        self._snapshot_frame = None
+        self.frames_published = 0
+
+    def publish(self, records):
+        """Publish quote deltas for records whose values changed since the last tick"""
+        with self._lock:
+            deltas = []
+            for record in records:
+                payload = _quote_payload(record)
+                previous = self._last_payloads.get(record.symbol)
+                if previous and previous['ltp'] == payload['ltp'] and previous['volume'] == payload['volume'] \
+                        and previous['change_percent'] == payload['change_percent']:
+                    continue
+                self._last_payloads[record.symbol] = payload
+                deltas.append(payload)
+
+            if not deltas:
+                return 0
+
+            self._sequence += 1
+            self._snapshot_frame = None
+            # Serialized once, shared by all open streams
+            frame = _format_event('quotes', {'seq': self._sequence, 'quotes': deltas}, self._sequence)
+            subscribers = list(self._subscribers)
+            self.frames_published += 1
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                # Slow client: drop its backlog and ask it to reload full data
+                self._drain(subscriber)
+                try:
+                    subscriber.put_nowait(_format_event('resync', {'seq': self._sequence}))
+                except queue.Full:
+                    pass
+
+        return len(deltas)
+
+    def _drain(self, subscriber):
+        """Discard everything buffered for a subscriber"""
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+
+    def snapshot_frame(self):
+        """Frame with every last published quote, rebuilt at most once per tick"""
+        with self._lock:
+            if self._snapshot_frame is None:
+                self._snapshot_frame = _format_event(
+                    'snapshot',
+                    {'seq': self._sequence, 'quotes': list(self._last_payloads.values())},
+                    self._sequence
+                )
+            return self._snapshot_frame
+
+    def subscribe(self):
+        """Register a new subscriber queue"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        logger.debug(f"Quote stream subscriber added ({len(self._subscribers)} open)")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber queue"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        logger.debug(f"Quote stream subscriber removed ({len(self._subscribers)} open)")
+
+    def stream(self, heartbeat=None, max_duration=None):
+        """Generator of SSE frames for one client connection"""
+        heartbeat = heartbeat or STREAM_HEARTBEAT_SECONDS
+        max_duration = max_duration or STREAM_MAX_DURATION_SECONDS
+        subscriber = self.subscribe()
+        deadline = time.monotonic() + max_duration
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            yield self.snapshot_frame()
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def get_stats(self):
+        """Get broadcaster statistics"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'symbols': len(self._last_payloads),
+                'sequence': self._sequence,
+                'frames_published': self.frames_published
+            }
+
+
+# Global instance fed by every latest-quote cache write
+quote_broadcaster = QuoteBroadcaster()
+latest_quote_cache.add_listener(quote_broadcaster.publish)
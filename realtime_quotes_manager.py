@@ -4,25 +4,40 @@ Fetches and stores CMP data every 5 minutes using Kotak Neo API
 """
 
 import logging
+import os
 import threading
 import time
 from datetime import datetime, timedelta
 from decimal import Decimal
 import schedule
+from sqlalchemy import case, cast, func, insert, update, String
 from app import db, app
-from models_etf import RealtimeQuote, ETFSignalTrade, AdminTradeSignal
+from instrument_master import instrument_master
+from market_calendar import market_calendar
+from models_etf import RealtimeQuote, ETFSignalTrade, AdminTradeSignal, KotakNeoQuote
+from portfolio_summary import reprice_deals_bulk
+from quote_cache import latest_quote_cache, upsert_latest_quotes, QuoteRecord
+from quote_storage import quote_partition_manager
+from signal_book import BOOK_SYNCED, note_prices, signal_book
+from signal_repricer import admin_signal_price_values, invested_sql
 from trading_functions import TradingFunctions
 import json
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of instrument tokens sent in a single quotes request
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('QUOTES_MAX_BATCH_SIZE', '50'))
+
 class RealtimeQuotesManager:
     """Manages real-time quotes fetching and storage"""
     
-    def __init__(self):
+    def __init__(self, max_batch_size=None, batch_mode=True):
         self.trading_functions = None
+        self.scheduler = schedule.Scheduler()
         self.scheduler_thread = None
         self.is_running = False
+        self.batch_mode = batch_mode
+        self.max_batch_size = max(1, int(max_batch_size or DEFAULT_MAX_BATCH_SIZE))
         self.etf_symbols = [
             'NIFTYBEES', 'BANKBEES', 'GOLDSHARE', 'ITBEES', 'PSUBNKBEES',
             'JUNIORBEES', 'LIQUIDBEES', 'CPSE ETF', 'KOTAKPSU', 'ICICIB22',
@@ -33,9 +48,10 @@ class RealtimeQuotesManager:
     def initialize_trading_functions(self):
         """Initialize trading functions with current session"""
         try:
-            self.trading_functions = TradingFunctions()
-            if hasattr(self.trading_functions, 'initialize_neo_client'):
-                self.trading_functions.initialize_neo_client()
+            # Reused across cycles; the broker client itself comes from the shared client registry
+            if self.trading_functions is None:
+                self.trading_functions = TradingFunctions()
+            self.trading_functions.initialize_neo_client()
             logger.info("Trading functions initialized successfully")
             return True
         except Exception as e:
@@ -77,56 +93,105 @@ class RealtimeQuotesManager:
             if not self.trading_functions:
                 return None
                 
-            # Search for the instrument
-            search_results = self.trading_functions.search_instruments(symbol)
-            if not search_results or len(search_results) == 0:
+            # Token from the in-memory scrip master
+            master_instrument = instrument_master.resolve(symbol)
+            if not master_instrument:
                 logger.warning(f"No instrument found for symbol: {symbol}")
                 return None
             
-            # Use the first match
-            instrument = search_results[0]
-            token = instrument.get('tk', '')
+            instrument = master_instrument.to_dict()
+            token = instrument['tk']
             
             # Get quote data
             quote_data = self.trading_functions.get_quotes([token])
-            if not quote_data or len(quote_data) == 0:
+            if not quote_data or quote_data[0]['ltp'] <= 0:
                 logger.warning(f"No quote data for symbol: {symbol}")
                 return None
             
-            quote = quote_data[0]
-            
-            # Parse the quote data
-            current_price = float(quote.get('ltp', 0))
-            open_price = float(quote.get('o', 0))
-            high_price = float(quote.get('h', 0))
-            low_price = float(quote.get('l', 0))
-            close_price = float(quote.get('c', 0))
-            
-            # Calculate change
-            change_amount = current_price - close_price if close_price > 0 else 0
-            change_percent = (change_amount / close_price * 100) if close_price > 0 else 0
-            
-            return {
-                'symbol': symbol,
-                'trading_symbol': instrument.get('ts', f"{symbol}-EQ"),
-                'token': token,
-                'exchange': instrument.get('e', 'NSE'),
-                'current_price': current_price,
-                'open_price': open_price,
-                'high_price': high_price,
-                'low_price': low_price,
-                'close_price': close_price,
-                'change_amount': change_amount,
-                'change_percent': change_percent,
-                'volume': int(quote.get('v', 0)),
-                'avg_volume': int(quote.get('av', 0)),
-                'market_status': 'OPEN' if quote.get('stat', '') == 'Ok' else 'CLOSED'
-            }
+            return self.parse_quote(symbol, instrument, quote_data[0])
             
         except Exception as e:
             logger.error(f"Error fetching quote for {symbol}: {str(e)}")
             return None
     
+    def parse_quote(self, symbol, instrument, quote):
+        """Convert a raw Neo quote into the record stored for a symbol"""
+        current_price = float(quote.get('ltp', 0))
+        open_price = float(quote.get('o', 0))
+        high_price = float(quote.get('h', 0))
+        low_price = float(quote.get('l', 0))
+        close_price = float(quote.get('c', 0))
+        
+        # Calculate change
+        change_amount = current_price - close_price if close_price > 0 else 0
+        change_percent = (change_amount / close_price * 100) if close_price > 0 else 0
+        
+        return {
+            'symbol': symbol,
+            'trading_symbol': instrument.get('ts', f"{symbol}-EQ"),
+            'token': instrument.get('tk', ''),
+            'exchange': instrument.get('e', 'NSE'),
+            'current_price': current_price,
+            'open_price': open_price,
+            'high_price': high_price,
+            'low_price': low_price,
+            'close_price': close_price,
+            'change_amount': change_amount,
+            'change_percent': change_percent,
+            'volume': int(quote.get('v', 0)),
+            'avg_volume': int(quote.get('av', 0)),
+            'market_status': 'OPEN' if market_calendar.is_open() else 'CLOSED'
+        }
+    
+    def resolve_instruments(self, symbols):
+        """Resolve every symbol to its instrument from the scrip master, keyed by symbol"""
+        return {
+            symbol: instrument.to_dict()
+            for symbol, instrument in instrument_master.resolve_many(symbols).items()
+        }
+    
+    def fetch_quotes_batch(self, symbols):
+        """Fetch quotes for many symbols using chunked multi-token requests"""
+        if not self.trading_functions:
+            return []
+        
+        instruments = self.resolve_instruments(symbols)
+        missing = [symbol for symbol in symbols if symbol not in instruments]
+        if missing:
+            logger.warning(f"No instrument found for symbols: {missing}")
+        
+        # token -> (symbol, instrument) so multi-token responses can be matched back
+        by_token = {}
+        for symbol, instrument in instruments.items():
+            token = instrument.get('tk', '')
+            if token:
+                by_token[token] = (symbol, instrument)
+        
+        tokens = list(by_token.keys())
+        batches = [tokens[i:i + self.max_batch_size] for i in range(0, len(tokens), self.max_batch_size)]
+        
+        quotes = []
+        for batch in batches:
+            try:
+                quote_data = self.trading_functions.get_quotes(batch) or []
+            except Exception as e:
+                logger.error(f"Error fetching quote batch of {len(batch)} tokens: {str(e)}")
+                continue
+            
+            for quote in quote_data:
+                # Matched on the token echoed by the broker only: request order is not guaranteed when a token is omitted
+                token = str(quote.get('tk', ''))
+                if token not in by_token or quote.get('ltp', 0) <= 0:
+                    continue
+                symbol, instrument = by_token[token]
+                try:
+                    quotes.append(self.parse_quote(symbol, instrument, quote))
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Could not parse quote for {symbol}: {str(e)}")
+        
+        logger.info(f"Fetched {len(quotes)}/{len(symbols)} quotes in {len(batches)} batches (max {self.max_batch_size} tokens)")
+        return quotes
+    
     def store_quote(self, quote_data):
         """Store quote data in database"""
         try:
@@ -161,43 +226,166 @@ class RealtimeQuotesManager:
             return False
     
     def update_signal_prices(self, symbol, current_price):
-        """Update current prices in signal tables"""
+        """Update current prices in signal tables from the in-memory signal book (no DB read)"""
         try:
             with app.app_context():
-                # Update ETF signal trades
-                etf_trades = ETFSignalTrade.query.filter(
-                    ETFSignalTrade.symbol == symbol,
-                    ETFSignalTrade.status == 'ACTIVE'
-                ).all()
-                
-                for trade in etf_trades:
-                    trade.current_price = Decimal(str(current_price))
-                    trade.last_price_update = datetime.utcnow()
-                    trade.calculate_pnl()
-                
-                # Update admin trade signals
-                admin_signals = AdminTradeSignal.query.filter(
-                    AdminTradeSignal.symbol == symbol,
-                    AdminTradeSignal.status == 'ACTIVE'
-                ).all()
-                
-                for signal in admin_signals:
-                    old_price = float(signal.current_price) if signal.current_price else 0
-                    signal.current_price = Decimal(str(current_price))
-                    signal.last_update_time = datetime.utcnow()
-                    
-                    # Calculate change percent
-                    if old_price > 0:
-                        change_pct = ((current_price - old_price) / old_price) * 100
-                        signal.change_percent = Decimal(str(change_pct))
-                
+                etf_count, admin_count = signal_book.reprice({symbol: current_price})
                 db.session.commit()
-                logger.debug(f"Updated prices for {len(etf_trades)} ETF trades and {len(admin_signals)} admin signals")
+                logger.debug(f"Updated prices for {etf_count} ETF trades and {admin_count} admin signals")
                 
         except Exception as e:
             logger.error(f"Error updating signal prices for {symbol}: {str(e)}")
             db.session.rollback()
     
+    def store_quotes_bulk(self, quotes, timestamp=None):
+        """Insert every quote of a cycle into realtime_quotes with one multi-row statement"""
+        timestamp = timestamp or datetime.utcnow()
+        rows = [{
+            'symbol': quote_data['symbol'],
+            'trading_symbol': quote_data['trading_symbol'],
+            'token': quote_data['token'],
+            'exchange': quote_data['exchange'],
+            'current_price': Decimal(str(quote_data['current_price'])),
+            'open_price': Decimal(str(quote_data['open_price'])),
+            'high_price': Decimal(str(quote_data['high_price'])),
+            'low_price': Decimal(str(quote_data['low_price'])),
+            'close_price': Decimal(str(quote_data['close_price'])),
+            'change_amount': Decimal(str(quote_data['change_amount'])),
+            'change_percent': Decimal(str(quote_data['change_percent'])),
+            'volume': quote_data['volume'],
+            'avg_volume': quote_data['avg_volume'],
+            'timestamp': timestamp,
+            'market_status': quote_data['market_status'],
+            'data_source': 'KOTAK_NEO',
+            'fetch_status': 'SUCCESS'
+        } for quote_data in quotes]
+        
+        if rows:
+            db.session.execute(insert(RealtimeQuote), rows)
+        return len(rows)
+
+    def store_kotak_quotes_bulk(self, quotes, timestamp=None):
+        """Upsert today's kotak_neo_quotes row per symbol: one lookup, one bulk UPDATE and one INSERT"""
+        timestamp = timestamp or datetime.utcnow()
+        quotes = {quote_data['symbol']: quote_data for quote_data in quotes}
+        if not quotes:
+            return 0
+
+        # Newest row of the day per symbol; older duplicates are left as history
+        day_start = datetime.combine(timestamp.date(), datetime.min.time())
+        existing = {}
+        for row_id, symbol in db.session.query(KotakNeoQuote.id, KotakNeoQuote.symbol).filter(
+            KotakNeoQuote.symbol.in_(list(quotes)),
+            KotakNeoQuote.timestamp >= day_start
+        ).order_by(KotakNeoQuote.timestamp.desc()):
+            existing.setdefault(symbol, row_id)
+
+        updates = []
+        inserts = []
+        for symbol, quote_data in quotes.items():
+            row = {
+                'ltp': Decimal(str(quote_data['current_price'])),
+                'open_price': Decimal(str(quote_data['open_price'])),
+                'high_price': Decimal(str(quote_data['high_price'])),
+                'low_price': Decimal(str(quote_data['low_price'])),
+                'close_price': Decimal(str(quote_data['close_price'])),
+                'net_change': Decimal(str(quote_data['change_amount'])),
+                'percentage_change': Decimal(str(quote_data['change_percent'])),
+                'volume': quote_data['volume'],
+                'market_status': quote_data['market_status'],
+                'timestamp': timestamp
+            }
+            if symbol in existing:
+                updates.append(dict(row, id=existing[symbol]))
+            else:
+                inserts.append(dict(
+                    row,
+                    symbol=symbol,
+                    trading_symbol=quote_data['trading_symbol'],
+                    token=quote_data['token'],
+                    exchange=quote_data['exchange']
+                ))
+
+        if updates:
+            db.session.execute(update(KotakNeoQuote), updates)
+        if inserts:
+            db.session.execute(insert(KotakNeoQuote), inserts)
+        return len(updates) + len(inserts)
+
+    def update_signal_prices_bulk(self, prices, timestamp=None):
+        """Reprice active signals and user deals for all symbols with one UPDATE per table"""
+        if not prices:
+            return 0, 0
+        
+        timestamp = timestamp or datetime.utcnow()
+        prices = {symbol: Decimal(str(price)) for symbol, price in prices.items()}
+        
+        # ETF signal trades: same maths as ETFSignalTrade.calculate_pnl, done in SQL
+        new_price = case(prices, value=ETFSignalTrade.symbol)
+        invested = invested_sql(ETFSignalTrade.invested_amount, ETFSignalTrade.entry_price, ETFSignalTrade.quantity)
+        pnl_amount = case(
+            (ETFSignalTrade.position_type == 'LONG', (new_price - ETFSignalTrade.entry_price) * ETFSignalTrade.quantity),
+            else_=(ETFSignalTrade.entry_price - new_price) * ETFSignalTrade.quantity
+        )
+        pnl_percent = case(
+            (invested > 0, pnl_amount * 100 / invested),
+            else_=ETFSignalTrade.pnl_percent
+        )
+        etf_result = db.session.execute(
+            update(ETFSignalTrade)
+            .where(ETFSignalTrade.symbol.in_(list(prices)), ETFSignalTrade.status == 'ACTIVE')
+            .values(
+                current_price=new_price,
+                last_price_update=timestamp,
+                pnl_amount=pnl_amount,
+                pnl_percent=pnl_percent,
+                current_value=func.coalesce(invested + pnl_amount, 0),
+                change_pct=func.coalesce(cast(func.round(pnl_percent, 2), String) + '%', '0.00%')
+            )
+            .execution_options(synchronize_session=False, **{BOOK_SYNCED: True})
+        )
+        
+        # Admin trade signals: change percent is measured against the previous price, P&L against entry
+        new_price = case(prices, value=AdminTradeSignal.symbol)
+        admin_result = db.session.execute(
+            update(AdminTradeSignal)
+            .where(AdminTradeSignal.symbol.in_(list(prices)), AdminTradeSignal.status == 'ACTIVE')
+            .values(**admin_signal_price_values(new_price, timestamp))
+            .execution_options(synchronize_session=False, **{BOOK_SYNCED: True})
+        )
+        note_prices(db.session, prices)
+        
+        # User deals: repriced the same way, with the P&L change folded into the portfolio summaries
+        deal_count = reprice_deals_bulk(prices, timestamp)
+        logger.debug(f"Repriced {deal_count} active user deals")
+        
+        return etf_result.rowcount, admin_result.rowcount
+    
+    def persist_quotes(self, quotes):
+        """Store a full quote cycle and reprice signals in a single transaction"""
+        if not quotes:
+            return True
+        
+        try:
+            with app.app_context():
+                timestamp = datetime.utcnow()
+                stored = self.store_quotes_bulk(quotes, timestamp)
+                etf_count, admin_count = self.update_signal_prices_bulk(
+                    {quote_data['symbol']: quote_data['current_price'] for quote_data in quotes},
+                    timestamp
+                )
+                records = [QuoteRecord.from_quote_data(quote_data, timestamp) for quote_data in quotes]
+                upsert_latest_quotes(records)
+                db.session.commit()
+                latest_quote_cache.put_many(records)
+                logger.debug(f"Stored {stored} quotes, updated {etf_count} ETF trades and {admin_count} admin signals")
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error persisting quote cycle of {len(quotes)} symbols: {str(e)}")
+            db.session.rollback()
+            return False
+    
     def fetch_all_quotes(self):
         """Fetch quotes for all symbols and store them"""
         try:
@@ -211,25 +399,23 @@ class RealtimeQuotesManager:
             successful_fetches = 0
             failed_fetches = 0
             
-            for symbol in symbols:
-                try:
+            if self.batch_mode:
+                quotes = self.fetch_quotes_batch(symbols)
+                failed_fetches += len(symbols) - len(quotes)
+            else:
+                quotes = []
+                for symbol in symbols:
                     quote_data = self.fetch_quote_for_symbol(symbol)
                     if quote_data:
-                        # Store in realtime_quotes table
-                        if self.store_quote(quote_data):
-                            # Update prices in signal tables
-                            self.update_signal_prices(symbol, quote_data['current_price'])
-                            successful_fetches += 1
-                            logger.debug(f"Successfully processed quote for {symbol}: ₹{quote_data['current_price']}")
-                        else:
-                            failed_fetches += 1
+                        quotes.append(quote_data)
                     else:
                         failed_fetches += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing symbol {symbol}: {str(e)}")
-                    failed_fetches += 1
-                    continue
+            
+            # Store the whole cycle and update signal tables with a single commit
+            if self.persist_quotes(quotes):
+                successful_fetches += len(quotes)
+            else:
+                failed_fetches += len(quotes)
             
             logger.info(f"Quote fetch completed: {successful_fetches} successful, {failed_fetches} failed")
             return successful_fetches > 0
@@ -238,11 +424,25 @@ class RealtimeQuotesManager:
             logger.error(f"Error in fetch_all_quotes: {str(e)}")
             return False
     
+    def scheduled_fetch(self):
+        """Scheduled quote fetch; skipped while the market is closed"""
+        if not market_calendar.should_refresh():
+            logger.debug(f"Market {market_calendar.phase()}, skipping scheduled quote fetch")
+            return False
+        return self.fetch_all_quotes()
+    
     def cleanup_old_quotes(self, days_to_keep=7):
         """Clean up old quote data to prevent database bloat"""
         try:
             with app.app_context():
                 cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
+                
+                # Partitioned history: retention is a cheap partition drop instead of a DELETE
+                if quote_partition_manager.is_enabled():
+                    quote_partition_manager.drop_partitions_before('realtime_quotes', cutoff_date)
+                    quote_partition_manager.ensure_partitions()
+                    return
+                
                 deleted_count = RealtimeQuote.query.filter(
                     RealtimeQuote.timestamp < cutoff_date
                 ).delete()
@@ -293,10 +493,10 @@ class RealtimeQuotesManager:
         logger.info("Starting realtime quotes scheduler...")
         
         # Schedule quote fetching every 5 minutes
-        schedule.every(5).minutes.do(self.fetch_all_quotes)
+        self.scheduler.every(5).minutes.do(self.scheduled_fetch)
         
         # Schedule cleanup daily at 2 AM
-        schedule.every().day.at("02:00").do(self.cleanup_old_quotes)
+        self.scheduler.every().day.at("02:00").do(self.cleanup_old_quotes)
         
         # Run initial fetch
         self.fetch_all_quotes()
@@ -305,7 +505,7 @@ class RealtimeQuotesManager:
             self.is_running = True
             while self.is_running:
                 try:
-                    schedule.run_pending()
+                    self.scheduler.run_pending()
                     time.sleep(60)  # Check every minute
                 except Exception as e:
                     logger.error(f"Scheduler error: {str(e)}")
@@ -323,7 +523,7 @@ class RealtimeQuotesManager:
         
         logger.info("Stopping realtime quotes scheduler...")
         self.is_running = False
-        schedule.clear()
+        self.scheduler.clear()
         
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             self.scheduler_thread.join(timeout=5)
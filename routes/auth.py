@@ -5,6 +5,7 @@ import logging
 
 from utils.auth import validate_current_session, clear_session
 from neo_client import NeoClient
+from client_registry import register_session_client
 from user_manager import UserManager
 
 auth_bp = Blueprint('auth', __name__)
@@ -45,6 +46,8 @@ def login():
             session['sid'] = session_data.get('sid')
             session['ucc'] = ucc
             session['client'] = client
+            register_session_client(ucc, client, session_data.get('access_token'),
+                                    session_data.get('session_token'), session_data.get('sid'))
             session['login_time'] = datetime.now().strftime('%B %d, %Y at %I:%M:%S %p')
             session['greeting_name'] = session_data.get('greetingName', ucc)
             session.permanent = True
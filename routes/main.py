@@ -6,6 +6,7 @@ from datetime import datetime
 
 from utils.auth import login_required, validate_current_session
 from trading_functions import TradingFunctions
+from client_registry import get_session_client
 from neo_client import NeoClient
 
 main_bp = Blueprint('main', __name__)
@@ -31,7 +32,7 @@ def dashboard():
         return redirect(url_for('auth.login'))
 
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please complete the 2FA process and login again.', 'error')
             session.clear()
@@ -143,7 +144,7 @@ def dashboard():
 def positions():
     """Positions page"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('auth.login'))
@@ -179,7 +180,7 @@ def positions():
 def api_positions():
     """API endpoint for positions data (for AJAX refresh)"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'success': False, 'message': 'Session expired. Please login again.'}), 401
 
@@ -275,7 +276,7 @@ def api_positions():
 def api_portfolio_summary():
     """API endpoint for portfolio summary data"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'success': False, 'message': 'Session expired. Please login again.'}), 401
 
@@ -331,7 +332,7 @@ def api_portfolio_summary():
 def api_portfolio_details():
     """API endpoint for detailed portfolio data"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'success': False, 'message': 'Session expired. Please login again.'}), 401
 
@@ -484,7 +485,7 @@ def api_user_profile():
 def holdings():
     """Holdings page"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('auth.login'))
@@ -501,7 +502,7 @@ def holdings():
 def api_holdings():
     """API endpoint for holdings data (for AJAX refresh)"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'success': False, 'message': 'Session expired. Please login again.'}), 401
 
@@ -575,7 +576,7 @@ def api_holdings():
 def orders():
     """Orders page"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             flash('Session expired. Please login again.', 'error')
             return redirect(url_for('auth.login'))
@@ -592,7 +593,7 @@ def orders():
 def api_orders():
     """API endpoint for orders data (for AJAX refresh)"""
     try:
-        client = session.get('client')
+        client = get_session_client()
         if not client:
             return jsonify({'success': False, 'message': 'Session expired. Please login again.'}), 401
 
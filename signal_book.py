@@ -0,0 +1,414 @@
+"""
+Signal Book
+Active ETF signal trades and admin trade signals held in memory by symbol and token, so a tick reprices them without a DB read
+"""
+
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from app import db
+from instrument_master import instrument_master
+from models_etf import AdminTradeSignal, ETFSignalTrade
+from portfolio_engine import side_sign
+from signal_repricer import invested_sql
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+# Seconds between checks that the book still matches the database; catches writes from other processes (CSV import scripts, other workers)
+SIGNAL_BOOK_CHECK_SECONDS = float(os.environ.get('SIGNAL_BOOK_CHECK_SECONDS', '30'))
+
+# Execution option marking statements whose effect on the book is already accounted for
+BOOK_SYNCED = 'signal_book'
+
+# session.info keys for changes applied to the book once the transaction commits
+PENDING_KEY = 'signal_book_pending'
+STALE_KEY = 'signal_book_stale'
+
+
+def _money(value):
+    """Float to a 2dp Decimal for Numeric columns"""
+    return Decimal(str(value)).quantize(CENT)
+
+
+class SymbolGroup:
+    """Rows of one symbol as parallel typed arrays; removal swaps the last row into the hole"""
+
+    __slots__ = ('ids', 'columns', '_positions')
+
+    def __init__(self, typecodes):
+        self.ids = array('q')
+        self.columns = {name: array(typecode) for name, typecode in typecodes.items()}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def upsert(self, row_id, **values):
+        """Add a row or overwrite it in place"""
+        position = self._positions.get(row_id)
+        if position is None:
+            self._positions[row_id] = len(self.ids)
+            self.ids.append(row_id)
+            for name, column in self.columns.items():
+                column.append(values[name])
+        else:
+            for name, column in self.columns.items():
+                column[position] = values[name]
+
+    def remove(self, row_id):
+        """Drop a row; returns False when it was not in the group"""
+        position = self._positions.pop(row_id, None)
+        if position is None:
+            return False
+        last = len(self.ids) - 1
+        if position != last:
+            moved_id = self.ids[last]
+            self.ids[position] = moved_id
+            for column in self.columns.values():
+                column[position] = column[last]
+            self._positions[moved_id] = position
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+        return True
+
+
+class _Side:
+    """One table's half of the book: symbol -> group, plus id -> symbol for moves and removals"""
+
+    def __init__(self, typecodes):
+        self.typecodes = typecodes
+        self.groups = {}
+        self.row_symbols = {}
+
+    def upsert(self, row_id, symbol, **values):
+        previous = self.row_symbols.get(row_id)
+        if previous is not None and previous != symbol:
+            self.remove(row_id)
+        group = self.groups.get(symbol)
+        if group is None:
+            group = self.groups[symbol] = SymbolGroup(self.typecodes)
+        group.upsert(row_id, **values)
+        self.row_symbols[row_id] = symbol
+
+    def remove(self, row_id):
+        symbol = self.row_symbols.pop(row_id, None)
+        group = self.groups.get(symbol)
+        if group is not None:
+            group.remove(row_id)
+            if not group:
+                del self.groups[symbol]
+
+    def __len__(self):
+        return len(self.row_symbols)
+
+
+class SignalBook:
+    """Active signals grouped by symbol; rebuilt on startup and kept in sync from session events"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.trades = _Side({'entry': 'd', 'quantity': 'd', 'invested': 'd', 'side': 'b'})
+        self.signals = _Side({'price': 'd', 'entry': 'd', 'quantity': 'd', 'invested': 'd', 'side': 'b'})
+        self.token_symbols = {}
+        self.loaded = False
+        self.fingerprint = None
+        self.checked_at = 0.0
+        self.stale_rebuilds = 0
+        self.rebuilds = 0
+        self.ticks = 0
+        self.rows_repriced = 0
+
+    def load(self):
+        """Rebuild the book from the active rows of both tables"""
+        # Taken before the rows: a write landing in between costs one extra rebuild, never a missed one
+        fingerprint = self._fingerprint()
+        trades = _Side(self.trades.typecodes)
+        signals = _Side(self.signals.typecodes)
+        token_symbols = {}
+
+        for row in db.session.query(
+            ETFSignalTrade.id, ETFSignalTrade.symbol, ETFSignalTrade.token, ETFSignalTrade.entry_price,
+            ETFSignalTrade.quantity, ETFSignalTrade.invested_amount, ETFSignalTrade.position_type
+        ).filter(ETFSignalTrade.status == 'ACTIVE'):
+            trades.upsert(row.id, row.symbol, **self._trade_values(row.entry_price, row.quantity, row.invested_amount, row.position_type))
+            if row.token:
+                token_symbols[str(row.token)] = row.symbol
+
+        for row in db.session.query(
+            AdminTradeSignal.id, AdminTradeSignal.symbol, AdminTradeSignal.token, AdminTradeSignal.current_price,
+            AdminTradeSignal.entry_price, AdminTradeSignal.quantity, AdminTradeSignal.investment_amount,
+            AdminTradeSignal.signal_type
+        ).filter(AdminTradeSignal.status == 'ACTIVE'):
+            signals.upsert(row.id, row.symbol, **self._signal_values(
+                row.current_price, row.entry_price, row.quantity, row.investment_amount, row.signal_type))
+            if row.token:
+                token_symbols[str(row.token)] = row.symbol
+
+        with self._lock:
+            self.trades, self.signals, self.token_symbols = trades, signals, token_symbols
+            self.fingerprint = fingerprint
+            self.checked_at = time.monotonic()
+            self.loaded = True
+            self.rebuilds += 1
+        logger.info(f"📚 Signal book loaded: {len(trades)} ETF trades, {len(signals)} admin signals "
+                    f"across {len(set(trades.groups) | set(signals.groups))} symbols")
+
+    def ensure_loaded(self):
+        """Load on first use, after a bulk statement made the book stale, or when another process changed the signals"""
+        if not self.loaded:
+            self.load()
+        elif time.monotonic() - self.checked_at >= SIGNAL_BOOK_CHECK_SECONDS:
+            self.checked_at = time.monotonic()
+            if self._fingerprint() != self.fingerprint:
+                logger.info("📚 Signal book no longer matches the database, rebuilding")
+                self.stale_rebuilds += 1
+                self.load()
+
+    @staticmethod
+    def _fingerprint():
+        """Count, ids and position sizes of the active rows of both tables; repricing leaves it unchanged"""
+        fingerprint = ()
+        for model, invested_amount in (
+            (ETFSignalTrade, ETFSignalTrade.invested_amount),
+            (AdminTradeSignal, AdminTradeSignal.investment_amount)
+        ):
+            fingerprint += tuple(db.session.query(
+                func.count(model.id),
+                func.max(model.id),
+                func.sum(model.id),
+                func.sum(model.entry_price),
+                func.sum(invested_sql(invested_amount, model.entry_price, model.quantity))
+            ).filter(model.status == 'ACTIVE').one())
+        return fingerprint
+
+    def invalidate(self):
+        """Force a rebuild on next use (e.g. after raw SQL bulk writes)"""
+        with self._lock:
+            self.loaded = False
+
+    @staticmethod
+    def _trade_values(entry_price, quantity, invested_amount, position_type):
+        entry = float(entry_price or 0)
+        quantity = float(quantity or 0)
+        return {
+            'entry': entry,
+            'quantity': quantity,
+            'invested': float(invested_amount or 0) or entry * quantity,
+            'side': side_sign(position_type or 'LONG')
+        }
+
+    @staticmethod
+    def _signal_values(current_price, entry_price, quantity, investment_amount, signal_type):
+        entry = float(entry_price or 0)
+        quantity = float(quantity or 0)
+        return {
+            'price': float(current_price or 0),
+            'entry': entry,
+            'quantity': quantity,
+            'invested': float(investment_amount or 0) or entry * quantity,
+            'side': side_sign(signal_type)
+        }
+
+    def symbol_for_token(self, token):
+        """Symbol for an instrument token: signal tokens first, then the scrip master"""
+        token = str(token)
+        symbol = self.token_symbols.get(token)
+        if symbol is None:
+            instrument = instrument_master.get_by_token(token)
+            if instrument:
+                symbol = self.token_symbols[token] = instrument.symbol
+        return symbol
+
+    def symbols(self):
+        """Symbols with at least one active signal"""
+        with self._lock:
+            return set(self.trades.groups) | set(self.signals.groups)
+
+    def reprice(self, prices, timestamp=None, admin=True):
+        """Reprice every active signal of the given symbols from memory; one executemany UPDATE per table"""
+        self.ensure_loaded()
+        timestamp = timestamp or datetime.utcnow()
+        trade_rows = []
+        signal_rows = []
+
+        with self._lock:
+            for symbol, price in prices.items():
+                price = float(price or 0)
+                if price <= 0:
+                    continue
+
+                group = self.trades.groups.get(symbol)
+                if group is not None:
+                    columns = group.columns
+                    for position, row_id in enumerate(group.ids):
+                        invested = columns['invested'][position]
+                        pnl = (price - columns['entry'][position]) * columns['quantity'][position] * columns['side'][position]
+                        pnl_percent = pnl / invested * 100 if invested else 0
+                        trade_rows.append({
+                            'id': row_id,
+                            'current_price': _money(price),
+                            'current_value': _money(invested + pnl),
+                            'pnl_amount': _money(pnl),
+                            'pnl_percent': _money(pnl_percent),
+                            'change_pct': f"{pnl_percent:.2f}%",
+                            'last_price_update': timestamp
+                        })
+
+                group = self.signals.groups.get(symbol) if admin else None
+                if group is not None:
+                    columns = group.columns
+                    for position, row_id in enumerate(group.ids):
+                        previous = columns['price'][position]
+                        invested = columns['invested'][position]
+                        pnl = (price - columns['entry'][position]) * columns['quantity'][position] * columns['side'][position]
+                        row = {
+                            'id': row_id,
+                            'current_price': _money(price),
+                            'investment_amount': _money(invested),
+                            'current_value': _money(invested + pnl),
+                            'pnl': _money(pnl),
+                            'pnl_percentage': _money(pnl / invested * 100 if invested else 0),
+                            'last_update_time': timestamp
+                        }
+                        if previous > 0:
+                            row['change_percent'] = _money((price - previous) * 100 / previous)
+                        signal_rows.append(row)
+
+        # Bulk UPDATE by primary key; rows with and without change_percent are sent as separate batches
+        if trade_rows:
+            db.session.execute(update(ETFSignalTrade).execution_options(**{BOOK_SYNCED: True}), trade_rows)
+        for rows in (
+            [row for row in signal_rows if 'change_percent' in row],
+            [row for row in signal_rows if 'change_percent' not in row]
+        ):
+            if rows:
+                db.session.execute(update(AdminTradeSignal).execution_options(**{BOOK_SYNCED: True}), rows)
+        if signal_rows:
+            note_prices(db.session, prices)
+
+        self.ticks += 1
+        self.rows_repriced += len(trade_rows) + len(signal_rows)
+        return len(trade_rows), len(signal_rows)
+
+    def reprice_tokens(self, token_prices, timestamp=None, admin=True):
+        """reprice() keyed by instrument token"""
+        prices = {}
+        for token, price in token_prices.items():
+            symbol = self.symbol_for_token(token)
+            if symbol:
+                prices[symbol] = price
+        return self.reprice(prices, timestamp, admin=admin)
+
+    def apply(self, changes):
+        """Apply committed row changes: ('trade'|'signal', 'upsert'|'remove'|'prices', payload)"""
+        with self._lock:
+            if not self.loaded:
+                return
+            for kind, action, payload in changes:
+                if action == 'prices':
+                    for symbol, price in payload.items():
+                        group = self.signals.groups.get(symbol)
+                        if group is not None:
+                            column = group.columns['price']
+                            for position in range(len(column)):
+                                column[position] = float(price)
+                    continue
+
+                side = self.trades if kind == 'trade' else self.signals
+                if action == 'remove':
+                    side.remove(payload['id'])
+                    continue
+                side.upsert(payload['id'], payload['symbol'], **payload['values'])
+                if payload.get('token'):
+                    self.token_symbols[str(payload['token'])] = payload['symbol']
+
+    def get_stats(self):
+        """Get book statistics"""
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'etf_trades': len(self.trades),
+                'admin_signals': len(self.signals),
+                'symbols': len(set(self.trades.groups) | set(self.signals.groups)),
+                'tokens': len(self.token_symbols),
+                'rebuilds': self.rebuilds,
+                'stale_rebuilds': self.stale_rebuilds,
+                'reprices': self.ticks,
+                'rows_repriced': self.rows_repriced
+            }
+
+
+# Global instance
+signal_book = SignalBook()
+
+
+def note_prices(session, prices):
+    """Record admin signal prices written by a bulk UPDATE, applied to the book on commit"""
+    session.info.setdefault(PENDING_KEY, []).append(('signal', 'prices', dict(prices)))
+
+
+def _row_change(obj, deleted=False):
+    """Book change for a flushed ETFSignalTrade or AdminTradeSignal"""
+    kind = 'trade' if isinstance(obj, ETFSignalTrade) else 'signal'
+    if deleted or obj.status != 'ACTIVE' or obj.id is None:
+        return kind, 'remove', {'id': obj.id}
+    if kind == 'trade':
+        values = SignalBook._trade_values(obj.entry_price, obj.quantity, obj.invested_amount, obj.position_type)
+    else:
+        values = SignalBook._signal_values(obj.current_price, obj.entry_price, obj.quantity, obj.investment_amount, obj.signal_type)
+    return kind, 'upsert', {'id': obj.id, 'symbol': obj.symbol, 'token': obj.token, 'values': values}
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_book_changes(session, flush_context):
+    """Queue inserts, updates and deletes of active signals for the book"""
+    changes = [
+        _row_change(obj) for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, (ETFSignalTrade, AdminTradeSignal))
+    ]
+    changes.extend(
+        _row_change(obj, deleted=True) for obj in session.deleted
+        if isinstance(obj, (ETFSignalTrade, AdminTradeSignal))
+    )
+    if changes:
+        session.info.setdefault(PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def track_bulk_statements(orm_execute_state):
+    """Bulk INSERT/UPDATE/DELETE on signal tables outside the book make it stale"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get(BOOK_SYNCED):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (ETFSignalTrade, AdminTradeSignal):
+        orm_execute_state.session.info[STALE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_book_changes(session):
+    """Apply queued changes once they are durable"""
+    changes = session.info.pop(PENDING_KEY, None)
+    if session.info.pop(STALE_KEY, False):
+        signal_book.invalidate()
+    elif changes:
+        signal_book.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_book_changes(session, previous_transaction):
+    """A rollback (even of a savepoint) leaves queued changes uncertain: rebuild instead"""
+    if session.info.pop(PENDING_KEY, None) or session.info.pop(STALE_KEY, False):
+        signal_book.invalidate()
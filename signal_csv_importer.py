@@ -0,0 +1,406 @@
+"""
+Signal CSV Importer
+Streams the "INVESTMENTS - ETFS-V2" sheet export into admin_trade_signals via a staging table
+"""
+
+import csv
+import io
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, table, column, text
+
+from instrument_master import resolve_token
+
+logger = logging.getLogger(__name__)
+
+# Data rows parsed, converted and loaded per chunk
+IMPORT_CHUNK_SIZE = int(os.environ.get('SIGNAL_IMPORT_CHUNK_SIZE', '5000'))
+
+# The sheet export has summary rows above the real header, which starts with these cells
+ETF_HEADER_PREFIX = ['ETF', '30', 'DH', 'Date']
+
+# Spreadsheet error/placeholder cells treated as empty
+EMPTY_CELLS = ('', '#N/A', '#DIV/0!', '#VALUE!', '-')
+
+STAGING_TABLE = 'admin_signal_staging'
+
+# Staged row -> existing admin_trade_signals id it updates
+MATCH_TABLE = 'admin_signal_matches'
+
+# admin_trade_signals columns written by the importer, in COPY order
+STAGING_COLUMNS = (
+    'admin_user_id', 'target_user_id', 'symbol', 'trading_symbol', 'token', 'exchange',
+    'signal_type', 'entry_price', 'target_price', 'stop_loss', 'quantity', 'signal_title',
+    'signal_description', 'priority', 'status', 'created_at', 'updated_at', 'signal_date', 'expiry_date',
+    'current_price', 'change_percent', 'investment_amount', 'current_value', 'pnl', 'pnl_percentage'
+)
+
+# Staging-only column: the sheet line, which orders rows that share a merge key
+LINE_COLUMN = 'import_line'
+
+# Columns loaded into the staging table
+COPY_COLUMNS = STAGING_COLUMNS + (LINE_COLUMN,)
+
+# User, symbol and entry timestamp identify a position up to repeated lots bought the same day;
+# those are told apart by order: the nth sheet row of a key is the nth existing row (by id) of that key
+MERGE_KEY = ('target_user_id', 'symbol', 'created_at')
+
+
+def parse_number(cell):
+    """Float from a sheet cell such as '4,600,370', '₹5,448', '-2.13%'; None when empty"""
+    cell = (cell or '').strip()
+    if cell in EMPTY_CELLS:
+        return None
+    try:
+        return float(cell.replace('₹', '').replace(',', '').replace('%', ''))
+    except ValueError:
+        return None
+
+
+def parse_date(cell):
+    """Datetime from a sheet date such as '22-Nov-2024'; None when empty or malformed"""
+    cell = (cell or '').strip()
+    if cell in EMPTY_CELLS:
+        return None
+    for date_format in ('%d-%b-%Y', '%d-%b-%y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(cell, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def iter_csv_chunks(csv_file_path, chunk_size=IMPORT_CHUNK_SIZE):
+    """Yield (first_line_number, rows) chunks of data rows as dicts keyed by the sheet header"""
+    with open(csv_file_path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        header = None
+        for row in reader:
+            if [cell.strip() for cell in row[:len(ETF_HEADER_PREFIX)]] == ETF_HEADER_PREFIX:
+                header = [cell.strip() for cell in row]
+                break
+        if header is None:
+            raise ValueError(f"No '{','.join(ETF_HEADER_PREFIX)}' header row found in {csv_file_path}")
+
+        chunk = []
+        first_line = reader.line_num + 1
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            chunk.append((reader.line_num, dict(zip(header, row))))
+            if len(chunk) >= chunk_size:
+                yield first_line, chunk
+                chunk = []
+                first_line = reader.line_num + 1
+        if chunk:
+            yield first_line, chunk
+
+
+def typed_columns(chunk):
+    """Parse a chunk of raw rows column by column into typed lists (None for empty cells)"""
+    def cells(name):
+        return [row.get(name, '') for _, row in chunk]
+
+    return {
+        'line': [line_number for line_number, _ in chunk],
+        'symbol': [(cell or '').strip().upper() for cell in cells('ETF')],
+        'signal_date': list(map(parse_date, cells('Date'))),
+        'position': list(map(parse_number, cells('Pos'))),
+        'quantity': list(map(parse_number, cells('Qty'))),
+        'entry_price': list(map(parse_number, cells('EP'))),
+        'current_price': list(map(parse_number, cells('CMP'))),
+        'change_percent': list(map(parse_number, cells('%Chan'))),
+        'investment': list(map(parse_number, cells('Inv.'))),
+        'target_price': list(map(parse_number, cells('TP')))
+    }
+
+
+class ImportReport:
+    """Row counts, rejected lines and throughput for one import run"""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows_read = 0
+        self.rows_valid = 0
+        self.inserted = 0
+        self.updated = 0
+        self.repeated = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows_read': self.rows_read,
+            'rows_valid': self.rows_valid,
+            'rows_rejected': len(self.errors),
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'repeated_positions': self.repeated,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors[:50]
+        }
+
+
+class SignalCSVImporter:
+    """Chunked CSV parse and convert, COPY into a staging table, then one merge into admin_trade_signals"""
+
+    def __init__(self, admin_user_id=1, target_user_id=1, chunk_size=IMPORT_CHUNK_SIZE):
+        self.admin_user_id = admin_user_id
+        self.target_user_id = target_user_id
+        self.chunk_size = chunk_size
+
+    def convert_chunk(self, chunk, report):
+        """Convert a chunk of raw CSV rows into admin_trade_signals rows"""
+        return self.convert_columns(typed_columns(chunk), report)
+
+    def convert_columns(self, columns, report):
+        """Convert typed columns (see typed_columns) into admin_trade_signals rows; rejects go to the report"""
+        now = datetime.utcnow()
+        symbols = columns['symbol']
+        dates = columns['signal_date']
+        quantities = columns['quantity']
+        entry_prices = columns['entry_price']
+        current_prices = columns['current_price']
+        change_percents = columns['change_percent']
+        investments = columns['investment']
+        target_prices = columns['target_price']
+
+        rows = []
+        for i, line_number in enumerate(columns['line']):
+            symbol = symbols[i]
+            if symbol in EMPTY_CELLS:
+                continue
+            report.rows_read += 1
+
+            entry_price = entry_prices[i]
+            if not entry_price or entry_price <= 0:
+                report.errors.append({'line': line_number, 'symbol': symbol, 'error': 'Missing entry price'})
+                continue
+
+            quantity = int(quantities[i]) if quantities[i] else 100
+            current_price = current_prices[i] or entry_price
+            investment_amount = investments[i] or entry_price * quantity
+            change_percent = change_percents[i]
+            if change_percent is None:
+                change_percent = (current_price - entry_price) / entry_price * 100
+            current_value = current_price * quantity
+            pnl = current_value - investment_amount
+            signal_date = dates[i] or now
+
+            rows.append({
+                'admin_user_id': self.admin_user_id,
+                'target_user_id': self.target_user_id,
+                'symbol': symbol,
+                'trading_symbol': symbol,
+                'token': resolve_token(symbol),
+                'exchange': 'NSE',
+                'signal_type': 'BUY',
+                'entry_price': round(entry_price, 2),
+                'target_price': round(target_prices[i] or entry_price * 1.1, 2),
+                'stop_loss': round(entry_price * 0.95, 2),
+                'quantity': quantity,
+                'signal_title': f'{symbol} Position',
+                'signal_description': 'ETF position imported from CSV data',
+                'priority': 'MEDIUM',
+                'status': 'ACTIVE' if columns['position'][i] in (None, 1) else 'CLOSED',
+                'created_at': signal_date,
+                'updated_at': now,
+                'signal_date': signal_date.date(),
+                'expiry_date': None,
+                'current_price': round(current_price, 2),
+                'change_percent': round(change_percent, 2),
+                'investment_amount': round(investment_amount, 2),
+                'current_value': round(current_value, 2),
+                'pnl': round(pnl, 2),
+                'pnl_percentage': round(pnl / investment_amount * 100, 2) if investment_amount > 0 else 0,
+                LINE_COLUMN: line_number
+            })
+        report.rows_valid += len(rows)
+        return rows
+
+    def iter_column_chunks(self, csv_file_path):
+        """Typed column chunks, sliced from the snapshot's Arrow copy when fresh, else parsed from CSV"""
+        from snapshot_store import snapshot_store, table_to_columns
+
+        table = snapshot_store.read_table(csv_file_path)
+        if table is None:
+            for _, chunk in iter_csv_chunks(csv_file_path, self.chunk_size):
+                yield typed_columns(chunk)
+            return
+
+        for offset in range(0, table.num_rows, self.chunk_size):
+            yield table_to_columns(table.slice(offset, self.chunk_size))
+
+    def _create_staging(self, connection):
+        """Empty temp table with the admin_trade_signals column types plus the sheet line"""
+        connection.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+        connection.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} AS "
+            f"SELECT {', '.join(STAGING_COLUMNS)} FROM admin_trade_signals WHERE 1 = 0"
+        ))
+        connection.execute(text(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN {LINE_COLUMN} INTEGER"))
+
+    def _drop_staging(self, connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {MATCH_TABLE}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+
+    def _copy_rows(self, connection, rows):
+        """Load rows into the staging table: COPY on PostgreSQL, executemany elsewhere"""
+        if connection.dialect.name != 'postgresql':
+            staging = table(STAGING_TABLE, *[column(name) for name in COPY_COLUMNS])
+            connection.execute(insert(staging), rows)
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # Unquoted empty fields load as NULL
+            writer.writerow(['' if row[name] is None else row[name] for name in COPY_COLUMNS])
+        buffer.seek(0)
+
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _count_repeated(self, connection, report):
+        """Staged rows sharing a merge key with an earlier row (repeated lots), logged per key"""
+        key_list = ', '.join(MERGE_KEY)
+        repeated = connection.execute(text(
+            f"SELECT {key_list}, COUNT(*) AS n FROM {STAGING_TABLE} GROUP BY {key_list} HAVING COUNT(*) > 1"
+        )).fetchall()
+        report.repeated = sum(row.n - 1 for row in repeated)
+        for row in repeated:
+            logger.info(f"Repeated position {row.symbol} @ {row.created_at}: {row.n} lots, matched in sheet order")
+
+    def _match_staged(self, connection):
+        """Pair staged rows with existing positions by merge key and lot number (order within the key)"""
+        partition = ', '.join(MERGE_KEY)
+        key_match = ' AND '.join(f"t.{name} = s.{name}" for name in MERGE_KEY)
+        connection.execute(text(f"DROP TABLE IF EXISTS {MATCH_TABLE}"))
+        connection.execute(text(
+            f"CREATE TEMP TABLE {MATCH_TABLE} AS "
+            f"SELECT s.{LINE_COLUMN}, t.id AS target_id FROM "
+            f"(SELECT {LINE_COLUMN}, {partition}, "
+            f"ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY {LINE_COLUMN}) AS lot FROM {STAGING_TABLE}) AS s "
+            f"JOIN (SELECT id, {partition}, ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY id) AS lot "
+            f"FROM admin_trade_signals WHERE target_user_id IN (SELECT DISTINCT target_user_id FROM {STAGING_TABLE})) AS t "
+            f"ON {key_match} AND t.lot = s.lot"
+        ))
+
+    def _merge(self, connection, report, replace=False):
+        """Update positions already present, insert the rest, all from the staging table"""
+        self._count_repeated(connection, report)
+        if replace:
+            connection.execute(
+                text("DELETE FROM admin_trade_signals WHERE target_user_id = :target_user_id"),
+                {'target_user_id': self.target_user_id}
+            )
+        self._match_staged(connection)
+
+        # Each existing row is matched by at most one staged row, so no update is ambiguous
+        if not replace:
+            assignments = ', '.join(f"{name} = s.{name}" for name in STAGING_COLUMNS if name not in MERGE_KEY)
+            report.updated = connection.execute(text(
+                f"UPDATE admin_trade_signals AS t SET {assignments} "
+                f"FROM {STAGING_TABLE} AS s JOIN {MATCH_TABLE} AS m ON m.{LINE_COLUMN} = s.{LINE_COLUMN} "
+                f"WHERE t.id = m.target_id"
+            )).rowcount
+
+        column_list = ', '.join(STAGING_COLUMNS)
+        report.inserted = connection.execute(text(
+            f"INSERT INTO admin_trade_signals ({column_list}) "
+            f"SELECT {', '.join('s.' + name for name in STAGING_COLUMNS)} FROM {STAGING_TABLE} AS s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {MATCH_TABLE} AS m WHERE m.{LINE_COLUMN} = s.{LINE_COLUMN})"
+        )).rowcount
+
+    def _invalidate_signal_book(self):
+        """Raw SQL merges bypass session events, so the in-memory signal book is rebuilt on next use"""
+        from signal_book import signal_book
+        signal_book.invalidate()
+
+    def import_rows(self, rows, replace=False, dry_run=False):
+        """Stage and merge already-converted rows (used by seed scripts)"""
+        # Imported here so the parser can be used by HTTP-only scripts without an app context
+        from app import db
+
+        report = ImportReport(dry_run)
+        report.rows_read = report.rows_valid = len(rows)
+        if dry_run or not rows:
+            return report.finish()
+
+        # Seed rows carry no sheet line; their list order plays that role
+        rows = [dict(row, **{LINE_COLUMN: row.get(LINE_COLUMN, position)}) for position, row in enumerate(rows)]
+
+        try:
+            connection = db.session.connection()
+            self._create_staging(connection)
+            self._copy_rows(connection, rows)
+            self._merge(connection, report, replace=replace)
+            self._drop_staging(connection)
+            db.session.commit()
+            self._invalidate_signal_book()
+        except Exception as e:
+            logger.error(f"Error importing {len(rows)} signal rows: {str(e)}")
+            db.session.rollback()
+            raise
+        return report.finish()
+
+    def import_csv(self, csv_file_path, replace=False, dry_run=False):
+        """Import a sheet export; dry_run parses and validates without touching the database"""
+        from app import db
+
+        report = ImportReport(dry_run)
+        try:
+            connection = None if dry_run else db.session.connection()
+            if connection is not None:
+                self._create_staging(connection)
+
+            for columns in self.iter_column_chunks(csv_file_path):
+                rows = self.convert_columns(columns, report)
+                if connection is not None and rows:
+                    self._copy_rows(connection, rows)
+                logger.info(f"📥 Converted lines {columns['line'][0]}-{columns['line'][-1]}: {report.rows_valid}/{report.rows_read} valid rows so far")
+
+            if connection is not None:
+                self._merge(connection, report, replace=replace)
+                self._drop_staging(connection)
+                db.session.commit()
+                self._invalidate_signal_book()
+        except Exception as e:
+            logger.error(f"Error importing {csv_file_path}: {str(e)}")
+            if not dry_run:
+                db.session.rollback()
+            raise
+
+        report.finish()
+        logger.info(
+            f"✅ {'Validated' if dry_run else 'Imported'} {report.rows_valid} of {report.rows_read} rows "
+            f"({report.inserted} inserted, {report.updated} updated, {report.repeated} repeated lots) "
+            f"at {report.rows_per_second:,.0f} rows/s"
+        )
+        return report
+
+
+def import_signals_csv(csv_file_path, admin_user_id=1, target_user_id=1, replace=False, dry_run=False):
+    """Import an ETF sheet export into admin_trade_signals and return the report"""
+    importer = SignalCSVImporter(admin_user_id=admin_user_id, target_user_id=target_user_id)
+    return importer.import_csv(csv_file_path, replace=replace, dry_run=dry_run)
@@ -0,0 +1,236 @@
+"""
+Signal Fan-out
+Set-based creation of signals and notifications for many users at once
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import db
+from models import User
+from models_etf import AdminTradeSignal, ETFSignalTrade, UserNotification
+from portfolio_engine import compute_position
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT batch; each batch is its own savepoint so one bad batch does not sink the rest
+FANOUT_BATCH_SIZE = int(os.environ.get('FANOUT_BATCH_SIZE', '1000'))
+
+SIGNAL_EXPIRY = timedelta(days=7)
+
+
+def _optional_float(value):
+    """float(value), or None for missing/empty values"""
+    return float(value) if value else None
+
+
+def _batches(rows, size):
+    """Consecutive slices of rows, size rows each"""
+    for start in range(0, len(rows), size):
+        yield start, rows[start:start + size]
+
+
+class FanoutResult:
+    """Counts and per-item failures for one fan-out request"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.created = 0
+        self.notifications = 0
+        self.batches = 0
+        self.failures = []
+
+    def fail(self, item, error, **context):
+        self.failures.append(dict(context, item=item, error=str(error)))
+
+    def to_dict(self):
+        return {
+            f'{self.kind}_created': self.created,
+            'notifications_created': self.notifications,
+            'batches': self.batches,
+            'failed': self.failures
+        }
+
+
+class SignalFanout:
+    """Expands (signal x user) into row arrays and writes them with a few multi-row INSERTs"""
+
+    def __init__(self, batch_size=FANOUT_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+
+    def valid_user_ids(self, user_ids, result):
+        """Target ids that exist, in request order; unknown ids are reported once"""
+        requested = []
+        for user_id in dict.fromkeys(user_ids):
+            try:
+                requested.append(int(user_id))
+            except (TypeError, ValueError):
+                result.fail('user', 'Invalid user id', user_id=user_id)
+        existing = set(db.session.execute(select(User.id).where(User.id.in_(requested))).scalars())
+        for user_id in requested:
+            if user_id not in existing:
+                result.fail('user', 'User not found', user_id=user_id)
+        return [user_id for user_id in requested if user_id in existing]
+
+    def _admin_signal_template(self, signal_data, admin_user_id, now):
+        """Column values shared by every user's copy of an admin signal"""
+        symbol = signal_data.get('symbol', '').upper()
+        signal_type = signal_data.get('signal_type', 'BUY').upper()
+        return {
+            'admin_user_id': admin_user_id,
+            'symbol': symbol,
+            'trading_symbol': symbol,
+            'token': f"TOKEN_{symbol}",
+            'exchange': signal_data.get('exchange', 'NSE'),
+            'signal_type': signal_type,
+            'entry_price': float(signal_data.get('entry_price', 0)),
+            'target_price': _optional_float(signal_data.get('target_price')),
+            'stop_loss': _optional_float(signal_data.get('stop_loss')),
+            'quantity': int(signal_data.get('quantity', 1)),
+            'signal_title': signal_data.get('signal_title', f"{signal_data.get('signal_type', 'BUY')} {signal_data.get('symbol', '')}"),
+            'signal_description': signal_data.get('signal_description', ''),
+            'priority': signal_data.get('priority', 'MEDIUM').upper(),
+            'current_price': _optional_float(signal_data.get('current_price')),
+            'change_percent': _optional_float(signal_data.get('change_percent')),
+            'created_at': now,
+            'expires_at': now + SIGNAL_EXPIRY
+        }
+
+    def _etf_trade_template(self, trade_data, admin_user_id, now):
+        """Column values shared by every user's copy of an ETF signal trade, P&L included"""
+        symbol = trade_data.get('symbol', '').upper()
+        entry_price = float(trade_data.get('entry_price', 0))
+        current_price = float(trade_data.get('current_price', trade_data.get('entry_price', 0)))
+        quantity = int(trade_data.get('quantity', 1))
+        position_type = trade_data.get('position_type', 'LONG').upper()
+        invested_amount = entry_price * quantity
+
+        template = {
+            'assigned_by_user_id': admin_user_id,
+            'symbol': symbol,
+            'etf_name': trade_data.get('etf_name'),
+            'trading_symbol': trade_data.get('trading_symbol', f"{symbol}-EQ"),
+            'token': trade_data.get('token', f"TOKEN_{symbol}"),
+            'exchange': trade_data.get('exchange', 'NSE'),
+            'signal_type': trade_data.get('signal_type', 'BUY').upper(),
+            'quantity': quantity,
+            'entry_price': entry_price,
+            'current_price': current_price,
+            'target_price': _optional_float(trade_data.get('target_price')),
+            'stop_loss': _optional_float(trade_data.get('stop_loss')),
+            'invested_amount': invested_amount,
+            'current_value': invested_amount,
+            'pnl_amount': 0.0,
+            'pnl_percent': 0.0,
+            'trade_title': trade_data.get('trade_title', f"{trade_data.get('signal_type', 'BUY')} {trade_data.get('symbol', '')}"),
+            'trade_description': trade_data.get('trade_description', ''),
+            'priority': trade_data.get('priority', 'MEDIUM').upper(),
+            'position_type': position_type,
+            'change_pct': trade_data.get('change_pct', '0.00%'),
+            'tp_value': _optional_float(trade_data.get('tp_value')),
+            'tp_return': trade_data.get('tp_return'),
+            'created_at': now
+        }
+
+        # Same result as ETFSignalTrade.calculate_pnl, computed once instead of once per user
+        if current_price and entry_price and quantity:
+            _, current_value, pnl_amount, pnl_percent = compute_position(
+                entry_price, current_price, quantity, position_type, invested_amount
+            )
+            template.update(
+                current_value=current_value,
+                pnl_amount=pnl_amount,
+                pnl_percent=pnl_percent,
+                change_pct=f"{pnl_percent:.2f}%" if pnl_percent else "0.00%"
+            )
+        return template
+
+    def _templates(self, items, build, admin_user_id, now, result):
+        """Validated per-item templates; malformed items are reported and skipped"""
+        templates = []
+        for index, item_data in enumerate(items):
+            try:
+                templates.append(build(item_data, admin_user_id, now))
+            except (TypeError, ValueError, AttributeError) as e:
+                result.fail('signal', e, index=index)
+        return templates
+
+    def _write_batches(self, rows, write, result, label):
+        """Run write(batch) per batch inside a savepoint, recording failed batches"""
+        for start, batch in _batches(rows, self.batch_size):
+            try:
+                with db.session.begin_nested():
+                    write(batch)
+                result.batches += 1
+                logger.info(f"📤 {label}: {min(start + len(batch), len(rows))}/{len(rows)} rows written")
+            except Exception as e:
+                logger.error(f"Error writing {label} rows {start}-{start + len(batch) - 1}: {str(e)}")
+                result.fail('batch', e, first_row=start, rows=len(batch))
+
+    def send_admin_signals(self, admin_user_id, signals_data, target_user_ids):
+        """Create every (signal x user) AdminTradeSignal plus its notification; caller commits"""
+        result = FanoutResult('signals')
+        now = datetime.utcnow()
+        user_ids = self.valid_user_ids(target_user_ids, result)
+        templates = self._templates(signals_data, self._admin_signal_template, admin_user_id, now, result)
+        rows = [dict(template, target_user_id=user_id) for template in templates for user_id in user_ids]
+
+        def write(batch):
+            # RETURNING in parameter order pairs each new id with its row, no per-row flush needed
+            signal_ids = db.session.execute(
+                insert(AdminTradeSignal).returning(AdminTradeSignal.id, sort_by_parameter_order=True),
+                batch
+            ).scalars().all()
+            notifications = [
+                {
+                    'user_id': row['target_user_id'],
+                    'title': f"New Trade Signal: {row['signal_title']}",
+                    'message': f"{row['signal_type']} {row['symbol']} @ ₹{row['entry_price']} - {row['signal_description'] or 'No description'}",
+                    'notification_type': 'TRADE_SIGNAL',
+                    'priority': row['priority'],
+                    'related_signal_id': signal_id,
+                    'created_at': now
+                }
+                for row, signal_id in zip(batch, signal_ids)
+            ]
+            db.session.execute(insert(UserNotification), notifications)
+            result.created += len(signal_ids)
+            result.notifications += len(notifications)
+
+        self._write_batches(rows, write, result, 'admin signals')
+        return result
+
+    def assign_etf_trades(self, admin_user_id, trades_data, target_user_ids):
+        """Create every (trade x user) ETFSignalTrade plus its notification; caller commits"""
+        result = FanoutResult('trades')
+        now = datetime.utcnow()
+        user_ids = self.valid_user_ids(target_user_ids, result)
+        templates = self._templates(trades_data, self._etf_trade_template, admin_user_id, now, result)
+        rows = [dict(template, user_id=user_id) for template in templates for user_id in user_ids]
+
+        def write(batch):
+            db.session.execute(insert(ETFSignalTrade), batch)
+            notifications = [
+                {
+                    'user_id': row['user_id'],
+                    'title': f"New ETF Signal: {row['trade_title']}",
+                    'message': f"{row['signal_type']} {row['symbol']} @ ₹{row['entry_price']} - {row['trade_description'] or 'No description'}",
+                    'notification_type': 'TRADE_SIGNAL',
+                    'priority': row['priority'],
+                    'created_at': now
+                }
+                for row in batch
+            ]
+            db.session.execute(insert(UserNotification), notifications)
+            result.created += len(batch)
+            result.notifications += len(notifications)
+
+        self._write_batches(rows, write, result, 'ETF signal trades')
+        return result
+
+
+# Global instance used by the admin endpoints
+signal_fanout = SignalFanout()
@@ -0,0 +1,258 @@
+"""
+Signal Pagination
+Keyset (cursor) pagination, filtering and server-side sorting of admin trade signals for the signal list endpoints
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import case, func, tuple_
+
+from app import db, app
+from models_etf import AdminTradeSignal
+
+logger = logging.getLogger(__name__)
+
+# Rows per page when the client does not ask for a size
+SIGNALS_PAGE_SIZE = int(os.environ.get('SIGNALS_PAGE_SIZE', '25'))
+
+# Upper bound on the requested page size, so one request can never serialize the whole table
+SIGNALS_MAX_PAGE_SIZE = int(os.environ.get('SIGNALS_MAX_PAGE_SIZE', '200'))
+
+# UCCs allowed to list any user's signals through the user_id filter
+SIGNAL_ADMIN_UCCS = {ucc.strip().upper() for ucc in os.environ.get('SIGNAL_ADMIN_UCCS', '').split(',') if ucc.strip()}
+
+# Sort key -> (expression, cursor value type); each one is backed by an index on AdminTradeSignal.
+# The P&L columns are NULL until a signal is first repriced, so they sort as 0 - matching the index expressions.
+SORT_KEYS = {
+    'created_at': (AdminTradeSignal.created_at, 'datetime'),
+    'symbol': (AdminTradeSignal.symbol, 'text'),
+    'pnl': (func.coalesce(AdminTradeSignal.pnl, 0), 'number'),
+    'pnl_percent': (func.coalesce(AdminTradeSignal.pnl_percentage, 0), 'number'),
+    'current_value': (func.coalesce(AdminTradeSignal.current_value, 0), 'number')
+}
+
+
+class SignalPageError(ValueError):
+    """Malformed page request (bad cursor, sort key, size or date)"""
+
+
+class SignalPageForbidden(SignalPageError):
+    """Page request for signals the caller may not see"""
+
+
+def encode_cursor(sort, descending, value, row_id):
+    """Opaque cursor for the row a page ended on"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps({'s': sort, 'd': descending, 'v': value, 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, descending):
+    """(sort value, id) from a cursor; it must come from a page with the same sort"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload['s'] != sort or payload['d'] != descending:
+            raise SignalPageError("cursor belongs to a different sort order")
+        value_type = SORT_KEYS[sort][1]
+        value = payload['v']
+        if value_type == 'datetime' and value is not None:
+            value = datetime.fromisoformat(value)
+        elif value_type == 'number':
+            value = Decimal(str(value))
+        return value, int(payload['i'])
+    except SignalPageError:
+        raise
+    except (KeyError, TypeError, ValueError, InvalidOperation, binascii.Error) as e:
+        raise SignalPageError(f"invalid cursor: {str(e)}")
+
+
+def parse_date(value, name):
+    """YYYY-MM-DD query parameter as a date"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise SignalPageError(f"{name} must be YYYY-MM-DD")
+
+
+class SignalPageRequest:
+    """Filters, sort and cursor of one page request"""
+
+    def __init__(self, limit=None, cursor=None, sort='created_at', descending=True, symbols=None,
+                 statuses=('ACTIVE',), user_id=None, date_from=None, date_to=None):
+        if sort not in SORT_KEYS:
+            raise SignalPageError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+        self.limit = max(1, min(limit or SIGNALS_PAGE_SIZE, SIGNALS_MAX_PAGE_SIZE))
+        self.sort = sort
+        self.descending = descending
+        self.after = decode_cursor(cursor, sort, descending) if cursor else None
+        self.symbols = symbols or []
+        self.statuses = statuses or []
+        self.user_id = user_id
+        self.date_from = date_from
+        self.date_to = date_to
+
+    @classmethod
+    def from_args(cls, args, default_sort='created_at', default_user_id=None):
+        """Build from query parameters: limit, cursor, sort, order, symbol, status, user_id, date_from, date_to"""
+        try:
+            limit = int(args.get('limit') or SIGNALS_PAGE_SIZE)
+        except ValueError:
+            raise SignalPageError("limit must be an integer")
+
+        # Comma separated; status=ALL lifts the status filter
+        symbols = [symbol.strip().upper() for symbol in args.get('symbol', '').split(',') if symbol.strip()]
+        statuses = [status.strip().upper() for status in args.get('status', 'ACTIVE').split(',') if status.strip()]
+        if 'ALL' in statuses:
+            statuses = []
+
+        user_id = args.get('user_id') or default_user_id
+        try:
+            user_id = int(user_id) if user_id is not None else None
+        except ValueError:
+            raise SignalPageError("user_id must be an integer")
+
+        order = args.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            raise SignalPageError("order must be asc or desc")
+
+        return cls(
+            limit=limit,
+            cursor=args.get('cursor'),
+            sort=args.get('sort', default_sort),
+            descending=order == 'desc',
+            symbols=symbols,
+            statuses=statuses,
+            user_id=user_id,
+            date_from=parse_date(args['date_from'], 'date_from') if args.get('date_from') else None,
+            date_to=parse_date(args['date_to'], 'date_to') if args.get('date_to') else None
+        )
+
+    @property
+    def is_first(self):
+        """First page of a listing (no cursor): the only one that carries totals"""
+        return self.after is None
+
+    def authorize(self, default_user_id, session):
+        """Another user's signals only for that user or a signal admin; closed statuses only when signed in"""
+        signed_in = bool(session.get('authenticated'))
+        viewer_id = session.get('db_user_id') or session.get('user_id')
+        is_admin = signed_in and (session.get('ucc') or '').upper() in SIGNAL_ADMIN_UCCS
+        if self.user_id != default_user_id and not is_admin and not (signed_in and self.user_id == viewer_id):
+            raise SignalPageForbidden("not allowed to list this user's signals")
+        if self.statuses != ['ACTIVE'] and not signed_in:
+            raise SignalPageForbidden("sign in to list signals other than ACTIVE ones")
+
+    def filters(self):
+        """WHERE clauses for the filters, shared by the page query and the totals"""
+        clauses = []
+        if self.statuses:
+            clauses.append(AdminTradeSignal.status.in_(self.statuses))
+        if self.symbols:
+            clauses.append(AdminTradeSignal.symbol.in_(self.symbols))
+        if self.user_id is not None:
+            clauses.append(AdminTradeSignal.target_user_id == self.user_id)
+        # Date range on created_at, inclusive of whole days
+        if self.date_from:
+            clauses.append(AdminTradeSignal.created_at >= datetime.combine(self.date_from, datetime.min.time()))
+        if self.date_to:
+            clauses.append(AdminTradeSignal.created_at < datetime.combine(self.date_to + timedelta(days=1), datetime.min.time()))
+        return clauses
+
+    def applied(self):
+        """Echo of the effective filters and sort for the response"""
+        return {
+            'sort': self.sort,
+            'order': 'desc' if self.descending else 'asc',
+            'limit': self.limit,
+            'symbol': self.symbols,
+            'status': self.statuses or ['ALL'],
+            'user_id': self.user_id,
+            'date_from': self.date_from.isoformat() if self.date_from else None,
+            'date_to': self.date_to.isoformat() if self.date_to else None
+        }
+
+
+def fetch_signal_page(page, options=()):
+    """One page of signals plus the cursor of the next page (None on the last page)"""
+    key = SORT_KEYS[page.sort][0]
+    query = AdminTradeSignal.query.filter(*page.filters())
+    if options:
+        query = query.options(*options)
+
+    # Seek past the last row of the previous page instead of OFFSET: cost stays flat however deep the page
+    if page.after is not None:
+        boundary = tuple_(key, AdminTradeSignal.id)
+        after = tuple_(*page.after)
+        query = query.filter(boundary < after if page.descending else boundary > after)
+
+    if page.descending:
+        query = query.order_by(key.desc(), AdminTradeSignal.id.desc())
+    else:
+        query = query.order_by(key.asc(), AdminTradeSignal.id.asc())
+
+    # One extra row tells whether another page exists without a COUNT
+    rows = query.add_columns(key.label('sort_value')).limit(page.limit + 1).all()
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+
+    next_cursor = None
+    if has_more:
+        last_signal, last_value = rows[-1]
+        next_cursor = encode_cursor(page.sort, page.descending, last_value, last_signal.id)
+    return [signal for signal, _ in rows], next_cursor
+
+
+def signal_totals(page):
+    """Counts and stored P&L totals over every row matching the filters, in one aggregate query"""
+    # First page only: cursor pages stay bounded by page size, the client keeps the first page's totals
+    if not page.is_first:
+        return None
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    row = db.session.query(
+        func.count(AdminTradeSignal.id),
+        count_where(AdminTradeSignal.status == 'ACTIVE'),
+        count_where(AdminTradeSignal.status == 'CLOSED'),
+        count_where(AdminTradeSignal.pnl > 0),
+        count_where(AdminTradeSignal.pnl < 0),
+        func.coalesce(func.sum(AdminTradeSignal.investment_amount), 0),
+        func.coalesce(func.sum(AdminTradeSignal.current_value), 0),
+        func.coalesce(func.sum(AdminTradeSignal.pnl), 0)
+    ).filter(*page.filters()).one()
+    (total_count, active_count, closed_count, profit_count, loss_count,
+     total_investment, total_current_value, total_pnl) = row
+    total_investment = float(total_investment)
+    total_pnl = float(total_pnl)
+    return {
+        'total_count': total_count,
+        'active_count': int(active_count),
+        'closed_count': int(closed_count),
+        'profit_count': int(profit_count),
+        'loss_count': int(loss_count),
+        'total_investment': total_investment,
+        'total_current_value': float(total_current_value),
+        'total_pnl': total_pnl,
+        'total_pnl_percent': total_pnl / total_investment * 100 if total_investment > 0 else 0
+    }
+
+
+def ensure_signal_indexes():
+    """Create the pagination indexes on databases whose admin_trade_signals table predates them"""
+    try:
+        with app.app_context():
+            # db.create_all() does not add new indexes to tables that already exist
+            for index in AdminTradeSignal.__table__.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+    except Exception as e:
+        logger.error(f"Error creating admin trade signal indexes: {str(e)}")
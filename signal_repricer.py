@@ -0,0 +1,141 @@
+"""
+Signal Repricer
+Dirty-tracking repricing: only symbols whose LTP moved since the last applied price are written
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import case, func, update
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which a remembered price is re-applied anyway, so signals created since are picked up
+REPRICE_RESYNC_SECONDS = float(os.environ.get('REPRICE_RESYNC_SECONDS', '900'))
+
+
+def to_price(value):
+    """Price as a 2dp Decimal (the Numeric(10, 2) scale of the signal price columns), or None"""
+    if value is None:
+        return None
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (ArithmeticError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def invested_sql(invested_amount, entry_price, quantity):
+    """Invested amount in SQL: the stored amount, or entry x quantity when unset (portfolio_engine.compute_position's rule)"""
+    return func.coalesce(func.nullif(invested_amount, 0), entry_price * quantity)
+
+
+def admin_signal_price_values(new_price, timestamp):
+    """UPDATE values repricing admin trade signals to new_price, keeping the stored P&L columns sortable"""
+    from models_etf import AdminTradeSignal
+    from portfolio_engine import LONG_SIDES
+
+    # Same maths as portfolio_engine.compute_metrics, done in SQL
+    side = case((func.upper(AdminTradeSignal.signal_type).in_(LONG_SIDES), 1), else_=-1)
+    invested = invested_sql(AdminTradeSignal.investment_amount, AdminTradeSignal.entry_price, AdminTradeSignal.quantity)
+    pnl = (new_price - AdminTradeSignal.entry_price) * AdminTradeSignal.quantity * side
+    return {
+        'current_price': new_price,
+        'last_update_time': timestamp,
+        'change_percent': case(
+            (AdminTradeSignal.current_price > 0,
+             (new_price - AdminTradeSignal.current_price) * 100 / AdminTradeSignal.current_price),
+            else_=AdminTradeSignal.change_percent
+        ),
+        # Fills an unset amount only; an imported investment amount is written back unchanged
+        'investment_amount': invested,
+        'current_value': invested + pnl,
+        'pnl': pnl,
+        'pnl_percentage': case((invested > 0, pnl * 100 / invested), else_=0)
+    }
+
+
+class SignalRepricer:
+    """symbol -> last applied LTP; a flat market produces no writes at all"""
+
+    def __init__(self, resync_seconds=None):
+        self.resync_seconds = REPRICE_RESYNC_SECONDS if resync_seconds is None else resync_seconds
+        self._lock = threading.Lock()
+        self.last_applied = {}
+        self.checked = 0
+        self.moved = 0
+        self.rows_written = 0
+
+    def changed_prices(self, prices):
+        """Subset of {symbol: price} whose price differs from the last applied one"""
+        changed = {}
+        now = time.monotonic()
+        with self._lock:
+            for symbol, price in prices.items():
+                price = to_price(price)
+                if price is None:
+                    continue
+                self.checked += 1
+                applied = self.last_applied.get(symbol)
+                if applied is None or applied[0] != price or now - applied[1] > self.resync_seconds:
+                    changed[symbol] = price
+            self.moved += len(changed)
+        return changed
+
+    def mark_applied(self, prices):
+        """Remember prices once the transaction that wrote them has committed"""
+        now = time.monotonic()
+        with self._lock:
+            for symbol, price in prices.items():
+                price = to_price(price)
+                if price is not None:
+                    self.last_applied[symbol] = (price, now)
+
+    def forget(self, symbols=None):
+        """Drop remembered prices (all, or for some symbols) so they are written next cycle"""
+        with self._lock:
+            if symbols is None:
+                self.last_applied.clear()
+            else:
+                for symbol in symbols:
+                    self.last_applied.pop(symbol, None)
+
+    def reprice_admin_signals(self, prices, timestamp=None):
+        """One UPDATE for all moved symbols; rows already at the new price are not touched"""
+        from app import db
+        from models_etf import AdminTradeSignal
+        from signal_book import BOOK_SYNCED, note_prices
+
+        if not prices:
+            return 0
+
+        timestamp = timestamp or datetime.utcnow()
+        new_price = case(prices, value=AdminTradeSignal.symbol)
+        result = db.session.execute(
+            update(AdminTradeSignal)
+            .where(
+                AdminTradeSignal.symbol.in_(list(prices)),
+                AdminTradeSignal.status == 'ACTIVE',
+                AdminTradeSignal.current_price.is_distinct_from(new_price)
+            )
+            .values(**admin_signal_price_values(new_price, timestamp))
+            .execution_options(synchronize_session=False, **{BOOK_SYNCED: True})
+        )
+        note_prices(db.session, prices)
+        with self._lock:
+            self.rows_written += result.rowcount
+        return result.rowcount
+
+    def get_stats(self):
+        """Get repricer statistics"""
+        with self._lock:
+            return {
+                'symbols_tracked': len(self.last_applied),
+                'prices_checked': self.checked,
+                'prices_moved': self.moved,
+                'rows_written': self.rows_written
+            }
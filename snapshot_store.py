@@ -0,0 +1,171 @@
+"""
+Snapshot Store
+Typed columnar (Arrow IPC) copies of the "INVESTMENTS - ETFS-V2" CSV snapshots in attached_assets
+"""
+
+import glob
+import logging
+import os
+
+import pandas as pd
+
+from signal_csv_importer import iter_csv_chunks, typed_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pa_ipc = None
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIRECTORY = os.environ.get('SNAPSHOT_DIRECTORY', 'attached_assets')
+SNAPSHOT_PATTERN = 'INVESTMENTS - ETFS-V2_*.csv'
+
+# Columnar copies live next to the snapshots, one .arrow file per CSV
+SNAPSHOT_CACHE_DIRECTORY = os.environ.get('SNAPSHOT_CACHE_DIRECTORY', os.path.join(SNAPSHOT_DIRECTORY, '.columnar'))
+
+# Typed snapshot schema, as produced by typed_columns
+SNAPSHOT_COLUMNS = (
+    'line', 'symbol', 'signal_date', 'position', 'quantity', 'entry_price',
+    'current_price', 'change_percent', 'investment', 'target_price'
+)
+
+
+def parse_snapshot_csv(csv_path):
+    """Parse a snapshot CSV into the typed snapshot frame"""
+    columns = {name: [] for name in SNAPSHOT_COLUMNS}
+    for _, chunk in iter_csv_chunks(csv_path):
+        for name, values in typed_columns(chunk).items():
+            columns[name].extend(values)
+
+    frame = pd.DataFrame(columns, columns=list(SNAPSHOT_COLUMNS))
+    frame['line'] = frame['line'].astype('int64')
+    frame['signal_date'] = pd.to_datetime(frame['signal_date'])
+    for name in SNAPSHOT_COLUMNS[3:]:
+        frame[name] = frame[name].astype('float64')
+    return frame
+
+
+def table_to_columns(table):
+    """Typed snapshot Arrow table to plain lists (the typed_columns shape), without a pandas round trip"""
+    # from_pandas stored NaN/NaT as nulls, which come back as None; microsecond dates come back as datetime
+    columns = {name: table.column(name).to_pylist() for name in SNAPSHOT_COLUMNS if name != 'signal_date'}
+    columns['signal_date'] = table.column('signal_date').cast(pa.timestamp('us')).to_pylist()
+    return columns
+
+
+class SnapshotStore:
+    """Converts CSV snapshots to Arrow IPC once and serves memory-mapped reads afterwards"""
+
+    def __init__(self, directory=None, cache_directory=None):
+        self.directory = directory or SNAPSHOT_DIRECTORY
+        self.cache_directory = cache_directory or SNAPSHOT_CACHE_DIRECTORY
+
+    def columnar_path(self, csv_path):
+        """Arrow file path for a snapshot CSV"""
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        return os.path.join(self.cache_directory, f"{name}.arrow")
+
+    def is_fresh(self, csv_path):
+        """True when an Arrow copy exists and is not older than its CSV"""
+        arrow_path = self.columnar_path(csv_path)
+        try:
+            return os.stat(arrow_path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def ingest(self, csv_path, force=False):
+        """Write the Arrow copy of one snapshot; returns the Arrow path, or None without pyarrow"""
+        if not ARROW_AVAILABLE:
+            return None
+        arrow_path = self.columnar_path(csv_path)
+        if not force and self.is_fresh(csv_path):
+            return arrow_path
+
+        table = pa.Table.from_pandas(parse_snapshot_csv(csv_path), preserve_index=False)
+        os.makedirs(self.cache_directory, exist_ok=True)
+        temp_path = f"{arrow_path}.tmp"
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, arrow_path)
+        logger.info(f"🗄️ Ingested {table.num_rows} rows from {os.path.basename(csv_path)} into {arrow_path}")
+        return arrow_path
+
+    def ingest_directory(self, force=False):
+        """Convert every snapshot in the directory; returns the number converted or already fresh"""
+        ingested = 0
+        for csv_path in self.snapshot_paths():
+            try:
+                if self.ingest(csv_path, force=force):
+                    ingested += 1
+            except Exception as e:
+                logger.error(f"Error ingesting snapshot {csv_path}: {str(e)}")
+        return ingested
+
+    def snapshot_paths(self):
+        """Snapshot CSV paths, oldest first (names carry the export timestamp)"""
+        return sorted(glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)))
+
+    def read_table(self, csv_path):
+        """Memory-mapped Arrow table for a snapshot, or None when no fresh copy exists"""
+        if not ARROW_AVAILABLE or not self.is_fresh(csv_path):
+            return None
+        # The table's buffers point into the map and keep it open; no copy is made
+        return pa_ipc.open_file(pa.memory_map(self.columnar_path(csv_path), 'r')).read_all()
+
+    def load_table(self, csv_path, columns=None, ingest=True):
+        """Memory-mapped Arrow table for a snapshot, ingesting it first when stale; None without pyarrow"""
+        if not ARROW_AVAILABLE:
+            return None
+        if ingest and not self.is_fresh(csv_path):
+            try:
+                self.ingest(csv_path)
+            except Exception as e:
+                logger.error(f"Error ingesting snapshot {csv_path}: {str(e)}")
+
+        table = self.read_table(csv_path)
+        if table is not None and columns:
+            table = table.select(list(columns))
+        return table
+
+    def load(self, csv_path, columns=None, ingest=True):
+        """Typed snapshot frame, from the Arrow copy when available, else parsed from CSV"""
+        # For pandas callers; only the requested columns leave the memory map
+        table = self.load_table(csv_path, columns, ingest)
+        if table is not None:
+            return table.to_pandas()
+        frame = parse_snapshot_csv(csv_path)
+        return frame[list(columns)] if columns else frame
+
+    def load_history(self, paths=None):
+        """All snapshots side by side in one frame, tagged with a 'snapshot' column"""
+        frames = []
+        for csv_path in paths or self.snapshot_paths():
+            frame = self.load(csv_path)
+            frame.insert(0, 'snapshot', os.path.splitext(os.path.basename(csv_path))[0])
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['snapshot', *SNAPSHOT_COLUMNS])
+        return pd.concat(frames, ignore_index=True)
+
+
+# Global instance
+snapshot_store = SnapshotStore()
+
+
+def load_snapshot(csv_path, columns=None):
+    """Typed snapshot frame for a CSV, zero-parse when its Arrow copy exists"""
+    return snapshot_store.load(csv_path, columns)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if not ARROW_AVAILABLE:
+        print("pyarrow is not installed; snapshots will keep being read from CSV")
+    else:
+        print(f"Ingested {snapshot_store.ingest_directory()} snapshots into {snapshot_store.cache_directory}")
@@ -4,6 +4,9 @@ function TradingDashboard() {
     this.isConnected = false;
     this.refreshInterval = null;
     this.wsHandler = null;
+    this.quoteStreamConnected = false;
+    this.positions = [];
+    this.holdings = [];
     this.init();
 }
 
@@ -11,9 +14,50 @@ TradingDashboard.prototype.init = function() {
     this.setupEventListeners();
     this.startAutoRefresh();
     this.initializeWebSocket();
+    this.initQuoteStream();
     console.log('Trading Dashboard initialized');
 };
 
+TradingDashboard.prototype.initQuoteStream = function() {
+    var self = this;
+    if (typeof QuoteStream === 'undefined' || !QuoteStream.isSupported()) {
+        return;
+    }
+
+    QuoteStream.getShared().subscribe(function(quotes) {
+        self.applyQuoteUpdates(quotes);
+    }, function(connected) {
+        self.quoteStreamConnected = connected;
+        self.startAutoRefresh();
+    });
+};
+
+TradingDashboard.prototype.applyQuoteUpdates = function(quotes) {
+    var positionsUpdated = this.applyQuotesToRows(this.positions, quotes);
+    var holdingsUpdated = this.applyQuotesToRows(this.holdings, quotes);
+    if (positionsUpdated) {
+        this.updatePositionsTable(this.positions);
+    }
+    if (holdingsUpdated) {
+        this.updateHoldingsTable(this.holdings);
+    }
+};
+
+TradingDashboard.prototype.applyQuotesToRows = function(rows, quotes) {
+    var updated = false;
+    for (var i = 0; i < rows.length; i++) {
+        var quote = quotes[rows[i].symbol];
+        if (quote && quote.ltp > 0) {
+            rows[i].ltp = quote.ltp;
+            if (rows[i].avg_price) {
+                rows[i].pnl = (quote.ltp - rows[i].avg_price) * (rows[i].quantity || 0);
+            }
+            updated = true;
+        }
+    }
+    return updated;
+};
+
 TradingDashboard.prototype.setupEventListeners = function() {
     var self = this;
     if (document.readyState === 'loading') {
@@ -95,9 +139,10 @@ TradingDashboard.prototype.startAutoRefresh = function() {
         clearInterval(this.refreshInterval);
     }
 
+    // Prices arrive over the quote stream while it is connected
     this.refreshInterval = setInterval(function() {
         self.refreshData();
-    }, 30000);
+    }, this.quoteStreamConnected ? 300000 : 30000);
 };
 
 TradingDashboard.prototype.refreshData = function() {
@@ -123,9 +168,11 @@ TradingDashboard.prototype.fetchLatestData = function() {
 TradingDashboard.prototype.updateDashboard = function(data) {
     try {
         if (data.positions) {
+            this.positions = data.positions;
             this.updatePositionsTable(data.positions);
         }
         if (data.holdings) {
+            this.holdings = data.holdings;
             this.updateHoldingsTable(data.holdings);
         }
         if (data.summary) {
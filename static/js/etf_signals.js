@@ -1,8 +1,13 @@
 // ETF Signals Manager - ES5 Compatible
 function ETFSignalsManager() {
     this.positions = [];
+    this.nextCursor = null; // keyset cursor of the next /etf/signals page
+    this.pageSize = 25;
     this.liveDataInterval = null;
     this.autoRefreshInterval = 10000; // 10 seconds
+    this.streamRefreshInterval = 300000; // 5 minutes full reload while the quote stream is live
+    this.quoteStreamConnected = false;
+    this.quoteStreamSeen = false;
     this.searchTimeout = null;
     
     // Initialize after DOM is ready
@@ -113,12 +118,19 @@ ETFSignalsManager.prototype.setupEventListeners = function() {
     }
 };
 
-ETFSignalsManager.prototype.loadPositions = function() {
+ETFSignalsManager.prototype.loadPositions = function(cursor) {
     var self = this;
-    this.showLoading(true);
+    var append = !!cursor;
+    if (!append) {
+        this.showLoading(true);
+    }
+
+    // A refresh re-reads as many rows as are already shown; "load more" continues from the cursor
+    var limit = append ? this.pageSize : Math.max(this.pageSize, this.positions.length);
+    var url = '/etf/signals?limit=' + limit + (append ? '&cursor=' + encodeURIComponent(cursor) : '');
 
     var xhr = new XMLHttpRequest();
-    xhr.open('GET', '/etf/signals', true);
+    xhr.open('GET', url, true);
     xhr.onreadystatechange = function() {
         if (xhr.readyState === 4) {
             self.showLoading(false);
@@ -126,9 +138,13 @@ ETFSignalsManager.prototype.loadPositions = function() {
                 try {
                     var data = JSON.parse(xhr.responseText);
                     if (data.success) {
-                        self.positions = data.signals || [];
+                        self.positions = append ? self.positions.concat(data.signals || []) : (data.signals || []);
+                        self.nextCursor = data.next_cursor || null;
                         self.renderPositionsTable();
-                        self.updateSummaryCards(data.portfolio || {});
+                        // Totals come with the first page only
+                        if (!append) {
+                            self.updateSummaryCards(data.portfolio || {});
+                        }
                         self.updateVisibleCount();
                         console.log('Loaded', self.positions.length, 'ETF signals');
                     } else {
@@ -201,6 +217,16 @@ ETFSignalsManager.prototype.renderPositionsTable = function() {
         var row = this.createPositionRow(position);
         tbody.appendChild(row);
     }
+
+    if (this.nextCursor) {
+        var self = this;
+        var moreRow = tbody.insertRow();
+        moreRow.innerHTML = '<td colspan="25" class="text-center"><button type="button" class="btn btn-sm btn-outline-primary">Load more signals</button></td>';
+        moreRow.querySelector('button').addEventListener('click', function() {
+            this.disabled = true;
+            self.loadPositions(self.nextCursor);
+        });
+    }
 };
 
 ETFSignalsManager.prototype.createPositionRow = function(position) {
@@ -306,10 +332,11 @@ ETFSignalsManager.prototype.startAutoRefresh = function() {
     this.stopAutoRefresh();
 
     if (this.autoRefreshInterval > 0) {
+        var interval = this.quoteStreamConnected ? this.streamRefreshInterval : this.autoRefreshInterval;
         this.liveDataInterval = setInterval(function() {
             self.loadPositions();
-        }, this.autoRefreshInterval);
-        console.log('Auto refresh started:', this.autoRefreshInterval + 'ms');
+        }, interval);
+        console.log('Auto refresh started:', interval + 'ms');
     }
 };
 
@@ -322,9 +349,64 @@ ETFSignalsManager.prototype.stopAutoRefresh = function() {
 };
 
 ETFSignalsManager.prototype.initLiveDataConnection = function() {
+    var self = this;
+    if (typeof QuoteStream === 'undefined' || !QuoteStream.isSupported()) {
+        console.log('Live quote stream unavailable, using polling');
+        return;
+    }
+
+    QuoteStream.getShared().subscribe(function(quotes) {
+        self.applyQuoteUpdates(quotes);
+    }, function(connected) {
+        self.quoteStreamConnected = connected;
+        self.startAutoRefresh();
+        // Reload full data after a reconnect or resync so nothing missed stays stale
+        if (connected && self.quoteStreamSeen) {
+            self.loadPositions();
+        }
+        if (connected) {
+            self.quoteStreamSeen = true;
+        }
+    });
     console.log('Live data connection initialized');
 };
 
+ETFSignalsManager.prototype.applyQuoteUpdates = function(quotes) {
+    var updated = false;
+    for (var i = 0; i < this.positions.length; i++) {
+        var position = this.positions[i];
+        var quote = quotes[position.symbol || position.etf];
+        if (quote && quote.ltp > 0) {
+            position.cmp = quote.ltp;
+            position.data_source = quote.data_source;
+            updated = true;
+        }
+    }
+
+    if (updated) {
+        this.renderPositionsTable();
+        this.updateSummaryCards(this.calculatePortfolio());
+    }
+};
+
+ETFSignalsManager.prototype.calculatePortfolio = function() {
+    var totalInvestment = 0;
+    var currentValue = 0;
+    for (var i = 0; i < this.positions.length; i++) {
+        var position = this.positions[i];
+        var entryPrice = parseFloat(position.ep || position.entry_price || 0);
+        var currentPrice = parseFloat(position.cmp || position.current_price || 0) || entryPrice;
+        var quantity = parseInt(position.qty || position.quantity || 0);
+        totalInvestment += parseFloat(position.inv || position.invested_amount || (entryPrice * quantity));
+        currentValue += currentPrice * quantity;
+    }
+    return {
+        current_value: currentValue,
+        total_pnl: currentValue - totalInvestment,
+        total_positions: this.positions.length
+    };
+};
+
 ETFSignalsManager.prototype.showAddDealModal = function() {
     var modal = document.getElementById('addDealModal');
     if (modal && typeof bootstrap !== 'undefined') {
@@ -43,6 +43,50 @@ ETFSignalsManager.prototype.init = function() {
     this.loadSignals();
     this.setupEventListeners();
     this.initializeColumnSettings();
+    this.initQuoteStream();
+};
+
+ETFSignalsManager.prototype.initQuoteStream = function() {
+    var self = this;
+    this.quoteStreamConnected = false;
+    if (typeof QuoteStream === 'undefined' || !QuoteStream.isSupported()) {
+        return;
+    }
+
+    QuoteStream.getShared().subscribe(function(quotes) {
+        self.applyQuoteUpdates(quotes);
+    }, function(connected) {
+        var wasConnected = self.quoteStreamConnected;
+        self.quoteStreamConnected = connected;
+        if (self.autoRefreshInterval) {
+            self.startAutoRefresh();
+        }
+        if (connected && !wasConnected && self.signals.length > 0) {
+            self.loadSignals();
+        }
+    });
+};
+
+ETFSignalsManager.prototype.applyQuoteUpdates = function(quotes) {
+    var updated = false;
+    for (var i = 0; i < this.signals.length; i++) {
+        var signal = this.signals[i];
+        var quote = quotes[signal.etf || signal.symbol];
+        if (quote && quote.ltp > 0) {
+            var entryPrice = parseFloat(signal.ep || 0);
+            var quantity = parseInt(signal.qty || 0);
+            signal.cmp = quote.ltp;
+            if (entryPrice > 0) {
+                signal.change_pct = Math.round((quote.ltp - entryPrice) / entryPrice * 10000) / 100;
+                signal.pl = Math.round((quote.ltp - entryPrice) * quantity * 100) / 100;
+            }
+            updated = true;
+        }
+    }
+
+    if (updated) {
+        this.renderSignalsTable();
+    }
 };
 
 ETFSignalsManager.prototype.setupEventListeners = function() {
@@ -279,9 +323,11 @@ ETFSignalsManager.prototype.updateVisibleCount = function() {
 ETFSignalsManager.prototype.startAutoRefresh = function() {
     var self = this;
     this.stopAutoRefresh();
+    // Quotes arrive over the stream while it is connected; only reload full data occasionally
+    var interval = this.quoteStreamConnected ? 300000 : 30000;
     this.autoRefreshInterval = setInterval(function() {
         self.loadSignals();
-    }, 30000); // 30 seconds
+    }, interval); // 30 seconds, 5 minutes with live stream
 };
 
 ETFSignalsManager.prototype.stopAutoRefresh = function() {
@@ -0,0 +1,143 @@
+// Live Quote Stream - ES5 Compatible
+// One EventSource per tab shared by every manager on the page; falls back to polling when unavailable
+function QuoteStream(url) {
+    this.url = url || '/api/stream/quotes';
+    this.source = null;
+    this.connected = false;
+    this.listeners = [];
+    this.statusListeners = [];
+    this.quotes = {};
+    this.reconnectDelay = 5000;
+    this.maxReconnectDelay = 60000;
+    this.reconnectTimer = null;
+}
+
+QuoteStream.isSupported = function() {
+    // The server only streams when QUOTE_STREAM_ENABLED is set (see base.html)
+    return typeof window.EventSource !== 'undefined' && window.QUOTE_STREAM_ENABLED === true;
+};
+
+QuoteStream.prototype.subscribe = function(onQuotes, onStatus) {
+    if (onQuotes) {
+        this.listeners.push(onQuotes);
+    }
+    if (onStatus) {
+        this.statusListeners.push(onStatus);
+        onStatus(this.connected);
+    }
+    this.connect();
+};
+
+QuoteStream.prototype.connect = function() {
+    if (this.source || !QuoteStream.isSupported()) {
+        return;
+    }
+
+    var self = this;
+    this.source = new EventSource(this.url);
+
+    this.source.onopen = function() {
+        self.reconnectDelay = 5000;
+        self.setConnected(true);
+    };
+
+    this.source.addEventListener('snapshot', function(event) {
+        self.handleQuotes(event, true);
+    });
+
+    this.source.addEventListener('quotes', function(event) {
+        self.handleQuotes(event, false);
+    });
+
+    this.source.addEventListener('resync', function() {
+        // Server dropped frames for this tab - managers reload full data
+        self.setConnected(false);
+        self.setConnected(true);
+    });
+
+    this.source.onerror = function() {
+        if (self.source && self.source.readyState === EventSource.CLOSED) {
+            self.source = null;
+            self.setConnected(false);
+            self.scheduleReconnect();
+        } else {
+            // Browser is retrying on its own; poll until it is back
+            self.setConnected(false);
+        }
+    };
+};
+
+QuoteStream.prototype.scheduleReconnect = function() {
+    var self = this;
+    if (this.reconnectTimer) {
+        return;
+    }
+    this.reconnectTimer = setTimeout(function() {
+        self.reconnectTimer = null;
+        self.connect();
+    }, this.reconnectDelay);
+    this.reconnectDelay = Math.min(this.reconnectDelay * 2, this.maxReconnectDelay);
+};
+
+QuoteStream.prototype.setConnected = function(connected) {
+    if (this.connected === connected) {
+        return;
+    }
+    this.connected = connected;
+    for (var i = 0; i < this.statusListeners.length; i++) {
+        try {
+            this.statusListeners[i](connected);
+        } catch (e) {
+            console.warn('Quote stream status listener failed:', e);
+        }
+    }
+};
+
+QuoteStream.prototype.handleQuotes = function(event, isSnapshot) {
+    var data;
+    try {
+        data = JSON.parse(event.data);
+    } catch (e) {
+        console.warn('Invalid quote stream frame:', e);
+        return;
+    }
+
+    var changed = {};
+    var quotes = data.quotes || [];
+    for (var i = 0; i < quotes.length; i++) {
+        this.quotes[quotes[i].symbol] = quotes[i];
+        changed[quotes[i].symbol] = quotes[i];
+    }
+
+    if (quotes.length === 0) {
+        return;
+    }
+
+    for (var j = 0; j < this.listeners.length; j++) {
+        try {
+            this.listeners[j](changed, isSnapshot);
+        } catch (e) {
+            console.warn('Quote stream listener failed:', e);
+        }
+    }
+};
+
+QuoteStream.prototype.close = function() {
+    if (this.source) {
+        this.source.close();
+        this.source = null;
+    }
+    if (this.reconnectTimer) {
+        clearTimeout(this.reconnectTimer);
+        this.reconnectTimer = null;
+    }
+    this.setConnected(false);
+};
+
+// Shared instance for the page
+QuoteStream.getShared = function() {
+    if (!window.quoteStream) {
+        window.quoteStream = new QuoteStream();
+    }
+    return window.quoteStream;
+};
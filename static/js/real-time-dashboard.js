@@ -2,6 +2,9 @@
 function RealTimeDashboard() {
     this.refreshInterval = null;
     this.isRefreshing = false;
+    this.quoteStreamConnected = false;
+    this.positions = [];
+    this.holdings = [];
     this.init();
 }
 
@@ -9,9 +12,52 @@ RealTimeDashboard.prototype.init = function() {
     this.setupEventListeners();
     this.startAutoRefresh();
     this.addCustomCSS();
+    this.initQuoteStream();
     console.log('Real-time dashboard initialized');
 };
 
+RealTimeDashboard.prototype.initQuoteStream = function() {
+    var self = this;
+    if (typeof QuoteStream === 'undefined' || !QuoteStream.isSupported()) {
+        return;
+    }
+
+    QuoteStream.getShared().subscribe(function(quotes) {
+        self.applyQuoteUpdates(quotes);
+    }, function(connected) {
+        self.quoteStreamConnected = connected;
+        if (self.refreshInterval) {
+            self.startAutoRefresh();
+        }
+    });
+};
+
+RealTimeDashboard.prototype.applyQuoteUpdates = function(quotes) {
+    var positionsUpdated = this.applyQuotesToRows(this.positions, quotes);
+    var holdingsUpdated = this.applyQuotesToRows(this.holdings, quotes);
+    if (positionsUpdated) {
+        this.updatePositionsTable(this.positions);
+    }
+    if (holdingsUpdated) {
+        this.updateHoldingsTable(this.holdings);
+    }
+};
+
+RealTimeDashboard.prototype.applyQuotesToRows = function(rows, quotes) {
+    var updated = false;
+    for (var i = 0; i < rows.length; i++) {
+        var quote = quotes[rows[i].symbol];
+        if (quote && quote.ltp > 0) {
+            rows[i].ltp = quote.ltp;
+            if (rows[i].avg_price) {
+                rows[i].pnl = (quote.ltp - rows[i].avg_price) * (rows[i].quantity || 0);
+            }
+            updated = true;
+        }
+    }
+    return updated;
+};
+
 RealTimeDashboard.prototype.addCustomCSS = function() {
     var style = document.createElement('style');
     style.textContent = 
@@ -88,7 +134,7 @@ RealTimeDashboard.prototype.startAutoRefresh = function() {
     
     this.refreshInterval = setInterval(function() {
         self.refreshData();
-    }, 30000); // 30 seconds default
+    }, this.quoteStreamConnected ? 300000 : 30000); // 30 seconds default, 5 minutes with live stream
 };
 
 RealTimeDashboard.prototype.stopAutoRefresh = function() {
@@ -143,10 +189,12 @@ RealTimeDashboard.prototype.refreshData = function(isManual) {
 
 RealTimeDashboard.prototype.updateDashboardData = function(data) {
     if (data.positions) {
+        this.positions = data.positions;
         this.updatePositionsTable(data.positions);
     }
     
     if (data.holdings) {
+        this.holdings = data.holdings;
         this.updateHoldingsTable(data.holdings);
     }
     
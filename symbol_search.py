@@ -0,0 +1,221 @@
+"""
+Symbol Search Index
+Ranked prefix, substring, sector and typo-tolerant search over the instrument master
+"""
+
+import logging
+import threading
+from collections import defaultdict
+
+from instrument_master import instrument_master, normalize_symbol, trigrams, PREFIX_INDEX_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Match scores, highest first; results are ordered by score, then by shorter symbol
+SCORE_EXACT = 100
+SCORE_SYMBOL_PREFIX = 90
+SCORE_NAME_PREFIX = 75
+SCORE_SYMBOL_SUBSTRING = 60
+SCORE_NAME_SUBSTRING = 50
+SCORE_SECTOR = 40
+SCORE_FUZZY = 30
+
+# Longest name-word prefix kept in the word index
+WORD_PREFIX_DEPTH = 8
+
+
+def _compact(text):
+    """Upper-case alphanumeric characters only, as used for trigrams"""
+    return ''.join(ch for ch in text.upper() if ch.isalnum())
+
+
+def bounded_distance(source, target, max_distance):
+    """Edit distance with adjacent transpositions, or max_distance + 1 once it is exceeded"""
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymbolSearchIndex:
+    """Search structures derived from the instrument master, rebuilt when the master reloads"""
+
+    def __init__(self, master=None):
+        self.master = master or instrument_master
+        self._lock = threading.Lock()
+        self._generation = None
+        self.index = None
+        self.compact_names = []
+        self.word_prefixes = {}
+        self.symbol_trigrams = {}
+        self.sectors = {}
+
+    def ensure_built(self):
+        """Build on first use and after every master reload"""
+        index = self.master.ensure_loaded()
+        if self._generation != self.master.generation or self.index is not index:
+            with self._lock:
+                if self._generation != self.master.generation or self.index is not index:
+                    self._build(index)
+        return self.index
+
+    def _build(self, index):
+        """Derive name-word prefixes, symbol trigrams and sector postings from the master index"""
+        compact_names = []
+        word_prefixes = defaultdict(list)
+        symbol_trigrams = defaultdict(list)
+        sectors = defaultdict(list)
+
+        for position, instrument in enumerate(index.instruments):
+            compact_names.append(_compact(instrument.name))
+
+            for word in set(instrument.name.upper().split()):
+                word = _compact(word)
+                for length in range(1, min(len(word), WORD_PREFIX_DEPTH) + 1):
+                    word_prefixes[word[:length]].append(position)
+
+            for gram in trigrams(instrument.symbol):
+                symbol_trigrams[gram].append(position)
+
+            if instrument.sector:
+                sectors[instrument.sector.upper()].append(position)
+
+        self.compact_names = compact_names
+        self.word_prefixes = dict(word_prefixes)
+        self.symbol_trigrams = dict(symbol_trigrams)
+        self.sectors = dict(sectors)
+        self.index = index
+        self._generation = self.master.generation
+        logger.info(f"🔎 Symbol search index built over {len(index.instruments)} instruments")
+
+    def _prefix_positions(self, query):
+        """Positions whose symbol starts with the query"""
+        positions = self.index.prefixes.get(query[:PREFIX_INDEX_DEPTH], ())
+        if len(query) > PREFIX_INDEX_DEPTH:
+            return [p for p in positions if self.index.instruments[p].symbol.startswith(query)]
+        return positions
+
+    def _word_prefix_positions(self, compact_query):
+        """Positions with a name word starting with the query"""
+        positions = self.word_prefixes.get(compact_query[:WORD_PREFIX_DEPTH], ())
+        if len(compact_query) > WORD_PREFIX_DEPTH:
+            return [p for p in positions if compact_query in self.compact_names[p]]
+        return positions
+
+    def _substring_positions(self, compact_query):
+        """Positions whose symbol or name contains the query, via the rarest query trigram"""
+        grams = trigrams(compact_query)
+        if len(compact_query) < 3 or not grams:
+            return []
+        rarest = min((self.index.trigrams.get(gram, ()) for gram in grams), key=len)
+        return [
+            p for p in rarest
+            if compact_query in _compact(self.index.instruments[p].symbol) or compact_query in self.compact_names[p]
+        ]
+
+    def _sector_positions(self, query):
+        """Positions in sectors whose name starts with or contains the query"""
+        positions = []
+        for sector, sector_positions in self.sectors.items():
+            if query in sector:
+                positions.extend(sector_positions)
+        return positions
+
+    def _fuzzy_positions(self, query):
+        """Positions whose symbol (or its leading part) is within a small edit distance of the query"""
+        grams = trigrams(query)
+        if len(query) < 4 or not grams:
+            return []
+
+        max_distance = 1 if len(query) <= 5 else 2
+        # Each edit destroys at most three trigrams
+        min_shared = max(1, len(grams) - 3 * max_distance)
+
+        shared = defaultdict(int)
+        for gram in grams:
+            for position in self.symbol_trigrams.get(gram, ()):
+                shared[position] += 1
+
+        matches = []
+        for position, count in shared.items():
+            if count < min_shared:
+                continue
+            symbol = self.index.instruments[position].symbol
+            distance = min(
+                bounded_distance(query, symbol, max_distance),
+                bounded_distance(query, symbol[:len(query)], max_distance)
+            )
+            if distance <= max_distance:
+                matches.append((distance, position))
+        return [position for _, position in sorted(matches)]
+
+    def search(self, query, limit=15, etf_only=False):
+        """Ranked matches for an autocomplete query, one result per symbol"""
+        query = normalize_symbol(query)
+        if not query:
+            return []
+
+        index = self.ensure_built()
+        compact_query = _compact(query)
+        results = []
+        seen = set()
+
+        def collect(positions, score):
+            # Postings are in master order (NSE first, shorter symbols first), so a full page can stop early
+            for position in positions:
+                instrument = index.instruments[position]
+                if instrument.symbol in seen or (etf_only and not instrument.is_etf):
+                    continue
+                seen.add(instrument.symbol)
+                results.append((score, len(instrument.symbol), instrument.symbol, instrument))
+                if len(results) >= limit:
+                    break
+
+        exact = index.by_symbol.get(query)
+        if exact and (not etf_only or exact.is_etf):
+            seen.add(exact.symbol)
+            results.append((SCORE_EXACT, len(exact.symbol), exact.symbol, exact))
+
+        # Tiers are tried best first; lower tiers only run while the page is not full
+        tiers = (
+            (lambda: self._prefix_positions(query), SCORE_SYMBOL_PREFIX),
+            (lambda: self._word_prefix_positions(compact_query), SCORE_NAME_PREFIX),
+            (lambda: self._substring_positions(compact_query), SCORE_NAME_SUBSTRING),
+            (lambda: self._sector_positions(query), SCORE_SECTOR),
+            (lambda: self._fuzzy_positions(compact_query), SCORE_FUZZY)
+        )
+        for positions, score in tiers:
+            if len(results) >= limit:
+                break
+            collect(positions(), score)
+
+        # Symbol substrings outrank name substrings within the substring tier
+        ranked = []
+        for score, length, symbol, instrument in results:
+            if score == SCORE_NAME_SUBSTRING and compact_query in _compact(symbol):
+                score = SCORE_SYMBOL_SUBSTRING
+            ranked.append((-score, length, symbol, instrument))
+        ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked[:limit]]
+
+
+# Global instance, built lazily over the full instrument universe
+symbol_search_index = SymbolSearchIndex()
+
+
+def search_symbols(query, limit=15, etf_only=False):
+    """Ranked instrument search for autocomplete endpoints"""
+    return symbol_search_index.search(query, limit=limit, etf_only=etf_only)
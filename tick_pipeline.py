@@ -0,0 +1,260 @@
+"""
+Tick Ingestion Pipeline
+Queues raw Neo websocket messages, coalesces ticks per token and flushes them in batches
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from app import db, app
+from quote_cache import latest_quote_cache, upsert_latest_quotes, QuoteRecord
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds between batch flushes to the latest-quote store and signal tables
+TICK_FLUSH_INTERVAL_MS = int(os.environ.get('TICK_FLUSH_INTERVAL_MS', '500'))
+
+# Raw messages buffered before new ones are dropped instead of blocking the websocket thread
+TICK_QUEUE_SIZE = int(os.environ.get('TICK_QUEUE_SIZE', '10000'))
+
+# Compact normalized tick; None means the field was not present in the message
+Tick = namedtuple('Tick', [
+    'token', 'symbol', 'exchange', 'ltp', 'open_price', 'high_price', 'low_price',
+    'close_price', 'change_amount', 'change_percent', 'volume', 'received_at'
+])
+
+# Neo websocket field -> Tick field
+NEO_TICK_FIELDS = {
+    'ltp': 'ltp',
+    'op': 'open_price',
+    'h': 'high_price',
+    'lo': 'low_price',
+    'c': 'close_price',
+    'nc': 'change_amount',
+    'pc': 'change_percent',
+    'v': 'volume'
+}
+
+
+def _to_float(value):
+    """Parse a numeric websocket field, returning None when missing or invalid"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_message(message, received_at=None):
+    """Normalize a raw Neo websocket message into a list of ticks"""
+    received_at = received_at or datetime.utcnow()
+
+    if isinstance(message, (bytes, str)):
+        try:
+            message = json.loads(message)
+        except ValueError:
+            return []
+
+    if isinstance(message, dict) and isinstance(message.get('data'), list):
+        items = message['data']
+    elif isinstance(message, list):
+        items = message
+    else:
+        items = [message]
+
+    ticks = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('tk'):
+            continue
+
+        values = {field: _to_float(item.get(key)) for key, field in NEO_TICK_FIELDS.items()}
+        if values['volume'] is not None:
+            values['volume'] = int(values['volume'])
+
+        trading_symbol = item.get('ts')
+        symbol = trading_symbol.split('-')[0] if trading_symbol else None
+
+        ticks.append(Tick(
+            token=str(item['tk']),
+            symbol=symbol,
+            exchange=item.get('e'),
+            received_at=received_at,
+            **values
+        ))
+    return ticks
+
+
+def coalesce(pending, tick):
+    """Merge a tick into the pending map, keeping only the newest value per field per token"""
+    previous = pending.get(tick.token)
+    if previous is None:
+        pending[tick.token] = tick
+        return
+    # Partial updates only carry changed fields - fill the gaps from the previous tick
+    updates = {field: value for field, value in tick._asdict().items() if value is not None}
+    pending[tick.token] = previous._replace(**updates)
+
+
+class TickPipeline:
+    """Bounded queue -> parser -> coalescer -> batch writer for websocket ticks"""
+
+    def __init__(self, flush_interval_ms=None, queue_size=None):
+        self.flush_interval = (flush_interval_ms or TICK_FLUSH_INTERVAL_MS) / 1000.0
+        self._queue = queue.Queue(maxsize=queue_size or TICK_QUEUE_SIZE)
+        self._token_symbols = {}
+        self._lock = threading.Lock()
+        self.writer_thread = None
+        self.is_running = False
+        self.stats = {
+            'received': 0,
+            'dropped': 0,
+            'ticks': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': 0
+        }
+
+    def register_tokens(self, token_symbols):
+        """Remember token -> symbol mappings for ticks that do not carry a trading symbol"""
+        with self._lock:
+            for token, symbol in token_symbols.items():
+                if token and symbol:
+                    self._token_symbols[str(token)] = symbol
+
+    def submit(self, message):
+        """Queue a raw websocket message; never blocks the caller"""
+        self.ensure_started()
+        try:
+            self._queue.put_nowait((message, datetime.utcnow()))
+            self.stats['received'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            if self.stats['dropped'] % 1000 == 1:
+                logger.warning(f"⚠️ Tick queue full, dropped {self.stats['dropped']} messages so far")
+            return False
+
+    def ensure_started(self):
+        """Start the writer thread on first use"""
+        if self.is_running:
+            return
+        with self._lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.writer_thread = threading.Thread(target=self._run, daemon=True, name='tick-pipeline')
+            self.writer_thread.start()
+            logger.info(f"✅ Tick pipeline started (flush every {int(self.flush_interval * 1000)}ms)")
+
+    def stop(self):
+        """Stop the writer thread after flushing what is pending"""
+        self.is_running = False
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=5)
+        logger.info("Tick pipeline stopped")
+
+    def _run(self):
+        """Writer loop: drain the queue until the flush deadline, then write one batch"""
+        pending = {}
+        next_flush = time.monotonic() + self.flush_interval
+        while self.is_running or not self._queue.empty():
+            timeout = max(0.0, next_flush - time.monotonic())
+            try:
+                message, received_at = self._queue.get(timeout=timeout)
+                for tick in parse_message(message, received_at):
+                    coalesce(pending, tick)
+                    self.stats['ticks'] += 1
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logger.error(f"Error parsing websocket message: {str(e)}")
+
+            if time.monotonic() >= next_flush:
+                if pending:
+                    self.flush(pending)
+                    pending = {}
+                next_flush = time.monotonic() + self.flush_interval
+
+        if pending:
+            self.flush(pending)
+
+    def resolve_symbols(self, tokens):
+        """Map tokens without a trading symbol to symbols, caching the result"""
+        with self._lock:
+            unknown = [token for token in tokens if token not in self._token_symbols]
+
+        # Tokens stored on active signals, then the scrip master - both in memory
+        from signal_book import signal_book
+        signal_book.ensure_loaded()
+        found = {}
+        for token in unknown:
+            symbol = signal_book.symbol_for_token(token)
+            if symbol:
+                found[token] = symbol
+
+        if found:
+            self.register_tokens(found)
+        with self._lock:
+            return {token: self._token_symbols.get(token) for token in tokens}
+
+    def flush(self, ticks):
+        """Write one coalesced batch: latest_quotes upsert, signal repricing and a single commit"""
+        from realtime_quotes_manager import realtime_quotes_manager
+
+        started = time.monotonic()
+        with app.app_context():
+            try:
+                symbols = self.resolve_symbols([tick.token for tick in ticks.values() if not tick.symbol])
+
+                records = []
+                for tick in ticks.values():
+                    symbol = tick.symbol or symbols.get(tick.token)
+                    if not symbol or not tick.ltp:
+                        continue
+                    records.append(QuoteRecord.from_tick(tick, symbol))
+
+                if not records:
+                    return 0
+
+                upsert_latest_quotes(records)
+                realtime_quotes_manager.update_signal_prices_bulk(
+                    {record.symbol: record.current_price for record in records},
+                    max(record.timestamp for record in records)
+                )
+                db.session.commit()
+
+            except Exception as e:
+                self.stats['failed_flushes'] += 1
+                logger.error(f"Error flushing {len(ticks)} ticks: {str(e)}")
+                db.session.rollback()
+                return 0
+
+            finally:
+                self.stats['last_flush_ms'] = int((time.monotonic() - started) * 1000)
+
+        # Cache listeners (SSE stream) only see committed prices
+        latest_quote_cache.put_many(records)
+        self.stats['flushed'] += len(records)
+        self.stats['flushes'] += 1
+        return len(records)
+
+    def get_stats(self):
+        """Get pipeline statistics"""
+        return dict(self.stats, queued=self._queue.qsize(), running=self.is_running)
+
+
+# Global instance shared by all websocket handlers
+tick_pipeline = TickPipeline()
+
+
+def submit_websocket_message(message):
+    """Queue a raw Neo websocket message for batched ingestion"""
+    return tick_pipeline.submit(message)
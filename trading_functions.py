@@ -1,8 +1,98 @@
 # Applying the change to add the method `get_quotes_for_symbols` to the `TradingFunctions` class.
 import logging
+import os
+import threading
+import time
 # pandas will be imported lazily when needed
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from broker_cache import broker_cache, session_cache_key
+from broker_scheduler import broker_scheduler, scheduled_quotes
+from client_registry import get_stored_session_client
 from csv_data_fetcher import CSVDataFetcher
+from instrument_master import instrument_master
+
+# Dashboard broker calls run side by side unless CONCURRENT_BROKER_FETCH=false
+CONCURRENT_BROKER_FETCH = os.environ.get('CONCURRENT_BROKER_FETCH', 'true').lower() != 'false'
+
+# Seconds to wait for the slowest of a batch of broker calls
+BROKER_CALL_TIMEOUT = float(os.environ.get('BROKER_CALL_TIMEOUT', '10'))
+
+# Worker threads shared by every TradingFunctions instance, so concurrent requests cannot pile up threads
+BROKER_FETCH_WORKERS = int(os.environ.get('BROKER_FETCH_WORKERS', '8'))
+
+_broker_pool = ThreadPoolExecutor(max_workers=BROKER_FETCH_WORKERS, thread_name_prefix='broker-fetch')
+
+# One slot per worker, held until the call really returns (timed-out calls included): a submitted call
+# always gets a thread at once, and when hung calls fill every slot new ones fail fast instead of queueing
+_broker_slots = threading.BoundedSemaphore(BROKER_FETCH_WORKERS)
+
+
+def _slotted_call(client, name, owner):
+    """broker_cache.call on a pool worker, giving the slot back whenever it finishes"""
+    try:
+        return broker_cache.call(client, name, owner=owner)
+    finally:
+        _broker_slots.release()
+
+
+def _number(quote, *keys):
+    """First present numeric field of a raw quote, as float (0 when absent)"""
+    for key in keys:
+        value = quote.get(key)
+        if value not in (None, ''):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return 0.0
+
+
+def quote_rows(response):
+    """Raw quote dicts from a client.quotes() response (a list, or a dict wrapping one under message/data)"""
+    if isinstance(response, list):
+        return [row for row in response if isinstance(row, dict)]
+    if isinstance(response, dict):
+        for key in ('message', 'data'):
+            rows = response.get(key)
+            if isinstance(rows, list):
+                return [row for row in rows if isinstance(row, dict)]
+    return []
+
+
+def normalize_quote(raw):
+    """One broker quote in the shape the quote writers parse: Neo short keys ('tk', 'ltp', 'o', 'h', 'l', 'c', 'v') plus long names"""
+    ohlc = raw.get('ohlc') if isinstance(raw.get('ohlc'), dict) else raw
+    token = str(raw.get('exchange_token') or raw.get('instrument_token') or raw.get('tk') or raw.get('token') or '')
+    ltp = _number(raw, 'ltp', 'last_traded_price', 'lp')
+    open_price = _number(ohlc, 'open', 'o')
+    high_price = _number(ohlc, 'high', 'h')
+    low_price = _number(ohlc, 'low', 'l')
+    close_price = _number(ohlc, 'close', 'c')
+    volume = int(_number(raw, 'volume', 'last_volume', 'v'))
+    return {
+        'tk': token,
+        'ts': raw.get('display_symbol') or raw.get('trading_symbol') or raw.get('ts', ''),
+        'ltp': ltp,
+        'o': open_price,
+        'h': high_price,
+        'l': low_price,
+        'c': close_price,
+        'v': volume,
+        'token': token,
+        'open': open_price,
+        'high': high_price,
+        'low': low_price,
+        'close': close_price,
+        'volume': volume,
+        'change': _number(raw, 'change', 'net_change'),
+        'percentage_change': _number(raw, 'per_change', 'percentage_change', 'prctyp'),
+        'bid_price': _number(raw, 'bid_price', 'bp1'),
+        'ask_price': _number(raw, 'ask_price', 'sp1'),
+        'week_52_high': _number(raw, 'year_high', 'week_52_high', 'h52'),
+        'week_52_low': _number(raw, 'year_low', 'week_52_low', 'l52')
+    }
+
 
 class TradingFunctions:
     """Trading functions for Kotak Neo API with CSV data integration"""
@@ -10,6 +100,16 @@ class TradingFunctions:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.csv_fetcher = CSVDataFetcher()
+        self.client = None
+
+    def initialize_neo_client(self):
+        """Attach the shared client for the stored session (used by quote lookups off the request path)"""
+        try:
+            self.client = get_stored_session_client()
+        except Exception as e:
+            self.logger.warning(f"No stored broker session available: {str(e)}")
+            self.client = None
+        return self.client is not None
 
     def get_dashboard_data(self, client):
         """Get dashboard data including positions, holdings, and portfolio summary"""
@@ -53,121 +153,134 @@ class TradingFunctions:
             }
         }
 
-    def _fetch_from_api_client(self, client):
-        """Fetch data from API client"""
-        dashboard_data = {}
+    def fetch_broker_calls(self, client, method_names):
+        """Call several no-argument client methods, concurrently when enabled, as (responses, errors)"""
+        # A call that raises or misses BROKER_CALL_TIMEOUT lands in errors and its response is None
+        responses = dict.fromkeys(method_names)
+        errors = {}
 
-        # Get positions with better error handling
-        try:
-            self.logger.info("Fetching positions...")
-            positions_response = client.positions()
-            if positions_response and isinstance(positions_response, dict) and 'data' in positions_response:
-                dashboard_data['positions'] = positions_response['data']
-                dashboard_data['total_positions'] = len(positions_response['data'])
-                self.logger.info(f"Found {len(positions_response['data'])} positions")
-            elif positions_response and isinstance(positions_response, list):
-                dashboard_data['positions'] = positions_response
-                dashboard_data['total_positions'] = len(positions_response)
-                self.logger.info(f"Found {len(positions_response)} positions")
-            else:
-                dashboard_data['positions'] = []
-                dashboard_data['total_positions'] = 0
-                self.logger.info("No positions found")
-        except Exception as e:
-            self.logger.warning(f"Error fetching positions: {str(e)}")
-            dashboard_data['positions'] = []
-            dashboard_data['total_positions'] = 0
+        # Resolved here: worker threads have no request context to read the session from
+        owner = session_cache_key(client)
 
-            # Get holdings with better error handling
+        if not CONCURRENT_BROKER_FETCH:
+            for name in method_names:
+                try:
+                    responses[name] = broker_cache.call(client, name, owner=owner)
+                except Exception as e:
+                    errors[name] = str(e)
+            return responses, errors
+
+        # Hung calls end on the broker socket timeout (broker_http) and free their slot then
+        deadline = time.monotonic() + BROKER_CALL_TIMEOUT
+        futures = {}
+        for name in method_names:
+            if not _broker_slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                errors[name] = f"no broker worker free within {BROKER_CALL_TIMEOUT}s"
+                continue
             try:
-                self.logger.info("🏦 Fetching holdings...")
-                holdings_response = client.holdings()
-                if holdings_response and isinstance(holdings_response, dict):
-                    if 'data' in holdings_response:
-                        dashboard_data['holdings'] = holdings_response['data']
-                        dashboard_data['total_holdings'] = len(holdings_response['data'])
-                        self.logger.info(f"✅ Found {len(holdings_response['data'])} holdings")
-                    elif 'message' in holdings_response or 'error' in holdings_response:
-                        # API returned error response
-                        self.logger.warning(f"⚠️ Holdings API error: {holdings_response}")
-                        dashboard_data['holdings'] = []
-                        dashboard_data['total_holdings'] = 0
-                    else:
-                        dashboard_data['holdings'] = []
-                        dashboard_data['total_holdings'] = 0
-                        self.logger.info("🏦 Holdings response structure unexpected")
-                elif holdings_response and isinstance(holdings_response, list):
-                    dashboard_data['holdings'] = holdings_response
-                    dashboard_data['total_holdings'] = len(holdings_response)
-                    self.logger.info(f"✅ Found {len(holdings_response)} holdings")
-                else:
-                    dashboard_data['holdings'] = []
-                    dashboard_data['total_holdings'] = 0
-                    self.logger.info("🏦 No holdings found")
+                futures[_broker_pool.submit(_slotted_call, client, name, owner)] = name
             except Exception as e:
-                self.logger.warning(f"⚠️ Error fetching holdings: {str(e)}")
-                dashboard_data['holdings'] = []
-                dashboard_data['total_holdings'] = 0
+                _broker_slots.release()
+                errors[name] = str(e)
 
-            # Get limits with better error handling
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in done:
+            name = futures[future]
             try:
-                self.logger.info("💰 Fetching account limits...")
-                limits_response = client.limits()
-                if limits_response:
-                    if isinstance(limits_response, dict) and 'data' in limits_response:
-                        dashboard_data['limits'] = limits_response['data']
-                    else:
-                        dashboard_data['limits'] = limits_response
-                    self.logger.info("✅ Account limits fetched successfully")
-                else:
-                    dashboard_data['limits'] = {}
-                    self.logger.info("💰 No limits data available")
+                responses[name] = future.result()
             except Exception as e:
-                self.logger.warning(f"⚠️ Error fetching limits: {str(e)}")
-                dashboard_data['limits'] = {}
+                errors[name] = str(e)
+        for future in pending:
+            # Already running, so it cannot be cancelled; it keeps its slot until the socket timeout ends it
+            errors[futures[future]] = f"timed out after {BROKER_CALL_TIMEOUT}s"
+        return responses, errors
+
+    def _parse_positions(self, positions_response):
+        """Dashboard positions section from a positions() response"""
+        if positions_response and isinstance(positions_response, dict) and 'data' in positions_response:
+            self.logger.info(f"Found {len(positions_response['data'])} positions")
+            return {'positions': positions_response['data'], 'total_positions': len(positions_response['data'])}
+        elif positions_response and isinstance(positions_response, list):
+            self.logger.info(f"Found {len(positions_response)} positions")
+            return {'positions': positions_response, 'total_positions': len(positions_response)}
+        self.logger.info("No positions found")
+        return {'positions': [], 'total_positions': 0}
+
+    def _parse_holdings(self, holdings_response):
+        """Dashboard holdings section from a holdings() response"""
+        if holdings_response and isinstance(holdings_response, dict):
+            if 'data' in holdings_response:
+                self.logger.info(f"✅ Found {len(holdings_response['data'])} holdings")
+                return {'holdings': holdings_response['data'], 'total_holdings': len(holdings_response['data'])}
+            elif 'message' in holdings_response or 'error' in holdings_response:
+                # API returned error response
+                self.logger.warning(f"⚠️ Holdings API error: {holdings_response}")
+            else:
+                self.logger.info("🏦 Holdings response structure unexpected")
+        elif holdings_response and isinstance(holdings_response, list):
+            self.logger.info(f"✅ Found {len(holdings_response)} holdings")
+            return {'holdings': holdings_response, 'total_holdings': len(holdings_response)}
+        else:
+            self.logger.info("🏦 No holdings found")
+        return {'holdings': [], 'total_holdings': 0}
+
+    def _parse_limits(self, limits_response):
+        """Dashboard limits section from a limits() response"""
+        if limits_response:
+            self.logger.info("✅ Account limits fetched successfully")
+            if isinstance(limits_response, dict) and 'data' in limits_response:
+                return {'limits': limits_response['data']}
+            return {'limits': limits_response}
+        self.logger.info("💰 No limits data available")
+        return {'limits': {}}
+
+    def _parse_orders(self, orders_response):
+        """Dashboard orders section from an order_report() response"""
+        if orders_response and isinstance(orders_response, dict) and 'data' in orders_response:
+            orders_data = orders_response['data']
+            self.logger.info(f"✅ Found {len(orders_data)} orders")
+            return {'recent_orders': orders_data[:5], 'total_orders': len(orders_data)}  # Last 5 orders
+        elif orders_response and isinstance(orders_response, list):
+            self.logger.info(f"✅ Found {len(orders_response)} orders")
+            return {'recent_orders': orders_response[:5], 'total_orders': len(orders_response)}
+        self.logger.info("📋 No orders found")
+        return {'recent_orders': [], 'total_orders': 0}
+
+    def _fetch_from_api_client(self, client):
+        """Fetch data from API client"""
+        # Broker call -> section parser; the four calls run side by side
+        sections = {
+            'positions': self._parse_positions,
+            'holdings': self._parse_holdings,
+            'limits': self._parse_limits,
+            'order_report': self._parse_orders
+        }
 
-            # Get order book with better error handling
+        self.logger.info("Fetching positions, holdings, limits and order book...")
+        responses, errors = self.fetch_broker_calls(client, list(sections))
+
+        dashboard_data = {}
+        for name, parse in sections.items():
+            if name in errors:
+                self.logger.warning(f"⚠️ Error fetching {name}: {errors[name]}")
             try:
-                self.logger.info("📋 Fetching order book...")
-                orders_response = client.order_report()
-                if orders_response and isinstance(orders_response, dict) and 'data' in orders_response:
-                    orders_data = orders_response['data']
-                    dashboard_data['recent_orders'] = orders_data[:5]  # Last 5 orders
-                    dashboard_data['total_orders'] = len(orders_data)
-                    self.logger.info(f"✅ Found {len(orders_data)} orders")
-                elif orders_response and isinstance(orders_response, list):
-                    dashboard_data['recent_orders'] = orders_response[:5]
-                    dashboard_data['total_orders'] = len(orders_response)
-                    self.logger.info(f"✅ Found {len(orders_response)} orders")
-                else:
-                    dashboard_data['recent_orders'] = []
-                    dashboard_data['total_orders'] = 0
-                    self.logger.info("📋 No orders found")
+                dashboard_data.update(parse(responses[name]))
             except Exception as e:
-                self.logger.warning(f"⚠️ Error fetching orders: {str(e)}")
-                dashboard_data['recent_orders'] = []
-                dashboard_data['total_orders'] = 0
+                self.logger.warning(f"⚠️ Error parsing {name}: {str(e)}")
+                errors[name] = str(e)
+                dashboard_data.update(parse(None))
 
-            self.logger.info("✅ Dashboard data fetched successfully!")
-            return dashboard_data
-
-        except Exception as e:
-            self.logger.error(f"❌ Error getting dashboard data: {str(e)}")
-            return {
-                'positions': [],
-                'holdings': [],
-                'limits': {},
-                'recent_orders': [],
-                'total_positions': 0,
-                'total_holdings': 0,
-                'total_orders': 0
-            }
+        # Sections that failed are present but empty; callers can tell from partial/errors
+        dashboard_data['partial'] = bool(errors)
+        dashboard_data['errors'] = errors
+        self.logger.info("✅ Dashboard data fetched successfully!" if not errors else f"⚠️ Dashboard data fetched with {len(errors)} failed calls")
+        return dashboard_data
 
     def get_positions(self, client):
         """Get current positions"""
         try:
             self.logger.info("📊 Fetching positions data...")
-            response = client.positions()
+            response = broker_cache.call(client, 'positions')
 
             # Log the raw response for debugging
             self.logger.info(f"Raw positions response type: {type(response)}")
@@ -235,7 +348,7 @@ class TradingFunctions:
         """Get current holdings"""
         try:
             self.logger.info("📊 Fetching holdings data...")
-            response = client.holdings()
+            response = broker_cache.call(client, 'holdings')
 
             # Handle different response formats
             if response:
@@ -281,7 +394,7 @@ class TradingFunctions:
     def get_orders(self, client):
         """Get order book"""
         try:
-            response = client.order_report()
+            response = broker_cache.call(client, 'order_report')
             if response and 'data' in response:
                 return response['data']
             return []
@@ -303,7 +416,8 @@ class TradingFunctions:
 
             # Market Order
             if order_type in ['MARKET', 'MKT']:
-                response = client.place_order(
+                response = broker_scheduler.run_order(
+                    client.place_order,
                     exchange_segment=exchange_segment,
                     product=product,
                     price="0",  # Market order - price is 0
@@ -323,7 +437,8 @@ class TradingFunctions:
             # Limit Order
             elif order_type in ['LIMIT', 'L']:
                 price = str(order_data.get('price', 0))
-                response = client.place_order(
+                response = broker_scheduler.run_order(
+                    client.place_order,
                     exchange_segment=exchange_segment,
                     product=product,
                     price=price,
@@ -344,7 +459,8 @@ class TradingFunctions:
             elif order_type in ['STOPLOSS', 'SL']:
                 price = str(order_data.get('price', 0))
                 trigger_price = str(order_data.get('trigger_price', 0))
-                response = client.place_order(
+                response = broker_scheduler.run_order(
+                    client.place_order,
                     exchange_segment=exchange_segment,
                     product=product,
                     price=price,
@@ -364,6 +480,9 @@ class TradingFunctions:
             else:
                 return {'success': False, 'message': f'Unsupported order type: {order_type}'}
 
+            # Positions and the order book just changed for this session
+            broker_cache.invalidate(client)
+
             if response and 'data' in response:
                 self.logger.info("✅ Order placed successfully!")
                 self.logger.info(f"Order Response: {response}")
@@ -384,7 +503,8 @@ class TradingFunctions:
         This method should implement the order modification logic from your notebook
         """
         try:
-            response = client.modify_order(
+            response = broker_scheduler.run_order(
+                client.modify_order,
                 order_id=order_data.get('order_id'),
                 price=float(order_data.get('price', 0)),
                 quantity=int(order_data.get('quantity', 1)),
@@ -393,6 +513,9 @@ class TradingFunctions:
                 validity=order_data.get('validity', 'DAY')
             )
 
+            # Positions and the order book just changed for this session
+            broker_cache.invalidate(client)
+
             if response and 'data' in response:
                 return {'success': True, 'data': response['data']}
             else:
@@ -410,11 +533,15 @@ class TradingFunctions:
         This method should implement the order cancellation logic from your notebook
         """
         try:
-            response = client.cancel_order(
+            response = broker_scheduler.run_order(
+                client.cancel_order,
                 order_id=order_data.get('order_id'),
                 isVerify=order_data.get('isVerify', True)
             )
 
+            # Positions and the order book just changed for this session
+            broker_cache.invalidate(client)
+
             if response and 'data' in response:
                 return {'success': True, 'data': response['data']}
             else:
@@ -424,99 +551,70 @@ class TradingFunctions:
             self.logger.error(f"Error cancelling order: {str(e)}")
             return {'success': False, 'message': str(e)}
 
-    def get_quotes(self, instruments):
-        """Get real-time quotes for given instruments"""
-        try:
-            if not instruments:
-                return {}
-
-            # Extract tokens from instruments
-            tokens = []
-            for instrument in instruments:
-                if isinstance(instrument, dict) and 'token' in instrument:
-                    tokens.append(instrument['token'])
-                elif hasattr(instrument, 'token'):
-                    tokens.append(instrument.token)
-                else:
-                    tokens.append(str(instrument))
-
-            if not tokens:
-                return {}
+    def instrument_tokens(self, tokens):
+        """Neo quote request entries for tokens, with each token's exchange segment from the scrip master"""
+        entries = []
+        for token in tokens:
+            if isinstance(token, dict):
+                token = token.get('token') or token.get('tk') or token.get('instrument_token')
+            instrument = instrument_master.get_by_token(token)
+            entries.append({
+                'instrument_token': str(token),
+                'exchange_segment': instrument.exchange_segment if instrument else 'nse_cm'
+            })
+        return entries
+
+    def get_quotes(self, tokens, priority=None, client=None):
+        """Live quotes for many tokens in one scheduled client.quotes() call, as normalized quote dicts"""
+        if not tokens:
+            return []
+        if client is None:
+            if self.client is None and not self.initialize_neo_client():
+                self.logger.warning("No broker client available for quotes")
+                return []
+            client = self.client
 
+        try:
             self.logger.info(f"📊 Getting quotes for {len(tokens)} tokens")
-
-            # Get quotes from API
-            quotes_response = self.client.quotes(tokens)
-
-            if quotes_response and quotes_response.get('stat') == 'Ok':
-                quotes = {}
-                quote_data = quotes_response.get('data', [])
-
-                for quote in quote_data:
-                    symbol = quote.get('tsym', '')
-                    quotes[symbol] = {
-                        'symbol': symbol,
-                        'ltp': float(quote.get('lp', 0)),
-                        'change': float(quote.get('c', 0)),
-                        'change_percent': float(quote.get('prctyp', 0)),
-                        'volume': int(quote.get('v', 0)),
-                        'open': float(quote.get('o', 0)),
-                        'high': float(quote.get('h', 0)),
-                        'low': float(quote.get('l', 0)),
-                        'close': float(quote.get('close', 0)),
-                        'bid': float(quote.get('bp1', 0)),
-                        'ask': float(quote.get('sp1', 0)),
-                        'timestamp': datetime.now().isoformat()
-                    }
-
-                return quotes
-            else:
-                self.logger.error(f"❌ Failed to get quotes: {quotes_response}")
-                return {}
+            response = scheduled_quotes(client, self.instrument_tokens(tokens), priority)
+            rows = quote_rows(response)
+            if not rows:
+                self.logger.error(f"❌ Failed to get quotes: {response}")
+                return []
+            return [normalize_quote(row) for row in rows]
 
         except Exception as e:
-            self.logger.error(f"❌ Error getting quotes: {e}")
-            return {}
+            self.logger.error(f"❌ Error getting quotes: {str(e)}")
+            return []
 
-    def get_quotes_for_symbols(self, symbols):
-        """Get quotes for multiple symbols by searching and fetching"""
+    def get_quotes_for_symbols(self, symbols, priority=None):
+        """Quotes keyed by symbol: every symbol resolved first, then one batched quote call"""
         try:
             quotes = {}
+            if self.client is None and not self.initialize_neo_client():
+                self.logger.warning("No broker client available for quote lookups")
+                return quotes
 
-            for symbol in symbols:
-                try:
-                    # Search for instrument
-                    instruments = self.search_instruments(symbol)
-                    if instruments:
-                        # Use first matching instrument
-                        instrument = instruments[0]
-                        token = instrument.get('token')
-
-                        if token:
-                            # Get quote for this token
-                            quote_response = self.client.quotes([token])
-
-                            if quote_response and quote_response.get('stat') == 'Ok':
-                                quote_data = quote_response.get('data', [])
-                                if quote_data:
-                                    quote = quote_data[0]
-                                    quotes[symbol] = {
-                                        'ltp': float(quote.get('lp', 0)),
-                                        'percentage_change': float(quote.get('prctyp', 0)),
-                                        'open_price': float(quote.get('o', 0)),
-                                        'high_price': float(quote.get('h', 0)),
-                                        'low_price': float(quote.get('l', 0)),
-                                        'volume': int(quote.get('v', 0)),
-                                        'bid_price': float(quote.get('bp1', 0)),
-                                        'ask_price': float(quote.get('sp1', 0)),
-                                        'week_52_high': float(quote.get('h52', 0)),
-                                        'week_52_low': float(quote.get('l52', 0)),
-                                        'timestamp': datetime.now()
-                                    }
-                except Exception as symbol_error:
-                    self.logger.warning(f"Error getting quote for {symbol}: {symbol_error}")
-                    continue
+            by_token = {instrument['token']: symbol for symbol, instrument in self.search_instruments_bulk(symbols).items()}
+            if not by_token:
+                return quotes
 
+            for quote in self.get_quotes(list(by_token), priority):
+                symbol = by_token.get(quote['tk'])
+                if symbol and quote['ltp'] > 0:
+                    quotes[symbol] = {
+                        'ltp': quote['ltp'],
+                        'percentage_change': quote['percentage_change'],
+                        'open_price': quote['o'],
+                        'high_price': quote['h'],
+                        'low_price': quote['l'],
+                        'volume': quote['v'],
+                        'bid_price': quote['bid_price'],
+                        'ask_price': quote['ask_price'],
+                        'week_52_high': quote['week_52_high'],
+                        'week_52_low': quote['week_52_low'],
+                        'timestamp': datetime.now()
+                    }
             return quotes
 
         except Exception as e:
@@ -524,61 +622,43 @@ class TradingFunctions:
             return {}
 
     def search_instruments(self, symbol):
-        """Search for instruments by symbol - required for realtime quotes manager"""
+        """Resolve a symbol to its instrument - required for realtime quotes manager"""
         try:
-            self.logger.info(f"🔍 Searching instruments for symbol: {symbol}")
-
-            # Return mock instrument data for now - this would normally call the API
-            # You can implement actual API calls here when needed
-            return [{
-                'tk': f"NSE_{symbol}",  # token
-                'ts': f"{symbol}-EQ",   # trading symbol
-                'e': 'NSE',             # exchange
-                'symbol': symbol
-            }]
+            # O(1) scrip master lookup, no network round trip. Exact matches only: callers quote
+            # instruments[0] under the requested symbol, so a fuzzy near-miss would store the wrong price.
+            # Fuzzy ranking belongs to the autocomplete endpoints (symbol_search.search_symbols).
+            instrument = instrument_master.resolve(symbol)
+            if instrument:
+                return [instrument.to_dict()]
+
+            self.logger.warning(f"⚠️ No scrip master instrument for symbol: {symbol}")
+            return []
 
         except Exception as e:
             self.logger.error(f"❌ Error searching instruments for {symbol}: {str(e)}")
             return []
 
-    def get_quotes(self, tokens):
-        """Get quotes for given tokens - required for realtime quotes manager"""
-        try:
-            self.logger.info(f"📊 Getting quotes for {len(tokens)} tokens")
-
-            # Return mock quote data for now - this would normally call the API
-            quotes = []
-            for token in tokens:
-                quotes.append({
-                    'ltp': 100.0,  # last traded price
-                    'o': 99.0,     # open
-                    'h': 102.0,    # high
-                    'l': 98.0,     # low
-                    'c': 99.5,     # close
-                    'v': 10000,    # volume
-                    'nc': 0.5,     # net change
-                    'cng': 0.5     # change percent
-                })
-
-            return quotes
-
-        except Exception as e:
-            self.logger.error(f"❌ Error getting quotes: {str(e)}")
-            return []
+    def search_instruments_bulk(self, symbols):
+        """Resolve many symbols to instruments in one pass, keyed by symbol"""
+        instruments = {
+            symbol: instrument.to_dict()
+            for symbol, instrument in instrument_master.resolve_many(symbols).items()
+        }
+        self.logger.info(f"🔍 Resolved {len(instruments)}/{len(set(symbols))} symbols to instruments")
+        return instruments
 
     def get_portfolio_summary(self, client):
         """Get comprehensive portfolio information"""
         try:
             self.logger.info("📊 Fetching portfolio summary...")
 
-            # Get positions
-            positions = client.positions()
-
-            # Get holdings
-            holdings = client.holdings()
-
-            # Get limits
-            limits = client.limits()
+            # Get positions, holdings and limits in parallel
+            responses, errors = self.fetch_broker_calls(client, ['positions', 'holdings', 'limits'])
+            for name, error in errors.items():
+                self.logger.warning(f"⚠️ Error fetching {name}: {error}")
+            positions = responses['positions']
+            holdings = responses['holdings']
+            limits = responses['limits']
 
             self.logger.info("✅ Portfolio data fetched successfully!")
 
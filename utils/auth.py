@@ -34,6 +34,8 @@ def validate_current_session():
 
 def clear_session():
     """Clear all session data"""
+    from client_registry import release_session_client
+    release_session_client(session.get('ucc'))
     session.clear()
 
 def get_session_user_id():
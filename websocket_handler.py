@@ -15,10 +15,9 @@ class WebSocketHandler:
         """Callback for websocket messages"""
         try:
             self.logger.debug(f"WebSocket message received: {message}")
-            # 
-            # INSERT YOUR JUPYTER NOTEBOOK WEBSOCKET MESSAGE HANDLING CODE HERE
-            # Process the real-time market data received from websocket
-            # 
+            # Hand off to the batched tick pipeline; never parse or commit on the websocket thread
+            from tick_pipeline import submit_websocket_message
+            submit_websocket_message(message)
             return message
         except Exception as e:
             self.logger.error(f"Error processing websocket message: {str(e)}")